@@ -0,0 +1,31 @@
+"""add pipeline step depends_on
+
+init_db only creates missing tables, so databases created before the column
+existed need this revision. It is skipped when the column is already there,
+as it is on databases init_db created with the current models.
+
+Revision ID: 5c1e8a3f9b27
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5c1e8a3f9b27"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "depends_on" not in {column["name"] for column in inspector.get_columns("pipeline_step")}:
+        op.add_column("pipeline_step", sa.Column("depends_on", sa.JSON()))
+
+
+def downgrade():
+    with op.batch_alter_table("pipeline_step") as batch:
+        batch.drop_column("depends_on")
@@ -0,0 +1,68 @@
+"""add execution checkpoints
+
+Adds the execution_checkpoint table and pipeline_execution.kind. Existing
+tables and columns are left alone.
+
+Revision ID: f4d15e99f0dd
+Revises: 5c1e8a3f9b27
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f4d15e99f0dd"
+down_revision = "5c1e8a3f9b27"
+branch_labels = None
+depends_on = None
+
+# Enums are stored by member name
+execution_kind = sa.Enum("RECORD", "STREAM", name="executionkind")
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    execution_kind.create(bind, checkfirst=True)
+    if "kind" not in {column["name"] for column in inspector.get_columns("pipeline_execution")}:
+        with op.batch_alter_table("pipeline_execution") as batch:
+            batch.add_column(
+                sa.Column("kind", execution_kind, nullable=False, server_default="RECORD")
+            )
+
+    if not inspector.has_table("execution_checkpoint"):
+        op.create_table(
+            "execution_checkpoint",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column(
+                "execution_id",
+                sa.Integer(),
+                sa.ForeignKey("pipeline_execution.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column(
+                "step_id",
+                sa.Integer(),
+                sa.ForeignKey("pipeline_step.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("fingerprint", sa.String(64), nullable=False),
+            sa.Column("output_data", sa.JSON()),
+            sa.UniqueConstraint("execution_id", "step_id"),
+        )
+        op.create_index("ix_execution_checkpoint_id", "execution_checkpoint", ["id"])
+        op.create_index(
+            "ix_execution_checkpoint_execution_id", "execution_checkpoint", ["execution_id"]
+        )
+
+
+def downgrade():
+    op.drop_table("execution_checkpoint")
+    with op.batch_alter_table("pipeline_execution") as batch:
+        batch.drop_column("kind")
+    execution_kind.drop(op.get_bind(), checkfirst=True)
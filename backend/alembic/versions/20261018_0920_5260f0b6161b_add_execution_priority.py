@@ -0,0 +1,74 @@
+"""add execution priority
+
+Adds pipeline_execution.priority and submitted_by with the indexes the
+scheduler reads. Existing columns and indexes are left alone.
+
+Revision ID: 5260f0b6161b
+Revises: f4d15e99f0dd
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5260f0b6161b"
+down_revision = "f4d15e99f0dd"
+branch_labels = None
+depends_on = None
+
+# Enums are stored by member name
+execution_priority = sa.Enum("INTERACTIVE", "BATCH", "BACKFILL", name="executionpriority")
+
+INDEXES = (
+    ("ix_pipeline_execution_submitted_by", ["submitted_by"]),
+    ("ix_pipeline_execution_status_priority", ["status", "priority"]),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    execution_priority.create(bind, checkfirst=True)
+    existing = {column["name"] for column in inspector.get_columns("pipeline_execution")}
+    columns = [
+        column
+        for column in (
+            sa.Column("priority", execution_priority, nullable=False, server_default="INTERACTIVE"),
+            sa.Column(
+                "submitted_by",
+                sa.Integer(),
+                sa.ForeignKey("user.id", name="fk_pipeline_execution_submitted_by_user"),
+            ),
+        )
+        if column.name not in existing
+    ]
+    if columns:
+        # Batch mode, as SQLite cannot add foreign keys with ALTER TABLE
+        with op.batch_alter_table("pipeline_execution") as batch:
+            for column in columns:
+                batch.add_column(column)
+
+    indexes = {index["name"] for index in inspector.get_indexes("pipeline_execution")}
+    for name, index_columns in INDEXES:
+        if name not in indexes:
+            op.create_index(name, "pipeline_execution", index_columns)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    indexes = {index["name"] for index in inspector.get_indexes("pipeline_execution")}
+    for name, _ in INDEXES:
+        if name in indexes:
+            op.drop_index(name, table_name="pipeline_execution")
+    foreign_keys = {key["name"] for key in inspector.get_foreign_keys("pipeline_execution")}
+    with op.batch_alter_table("pipeline_execution") as batch:
+        if "fk_pipeline_execution_submitted_by_user" in foreign_keys:
+            batch.drop_constraint("fk_pipeline_execution_submitted_by_user", type_="foreignkey")
+        batch.drop_column("submitted_by")
+        batch.drop_column("priority")
+    execution_priority.drop(bind, checkfirst=True)
@@ -0,0 +1,63 @@
+"""add step trace
+
+Adds the step_trace table when it does not exist yet.
+
+Revision ID: 0cf81c2d7ed6
+Revises: 5260f0b6161b
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0cf81c2d7ed6"
+down_revision = "5260f0b6161b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("step_trace"):
+        return
+    op.create_table(
+        "step_trace",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column(
+            "pipeline_id",
+            sa.Integer(),
+            sa.ForeignKey("pipeline.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "step_id",
+            sa.Integer(),
+            sa.ForeignKey("pipeline_step.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "execution_id",
+            sa.Integer(),
+            sa.ForeignKey("pipeline_execution.id", ondelete="CASCADE"),
+        ),
+        sa.Column("agent", sa.String(100), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=False),
+        sa.Column("duration_ms", sa.Float(), nullable=False),
+        sa.Column("records", sa.Integer(), nullable=False),
+        sa.Column("input_bytes", sa.Integer()),
+        sa.Column("output_bytes", sa.Integer()),
+        sa.Column("cache_hits", sa.Integer(), nullable=False),
+        sa.Column("errors", sa.Integer(), nullable=False),
+        sa.Column("error_message", sa.String(1000)),
+    )
+    op.create_index("ix_step_trace_id", "step_trace", ["id"])
+    op.create_index("ix_step_trace_execution_id", "step_trace", ["execution_id"])
+    op.create_index("ix_step_trace_pipeline_started", "step_trace", ["pipeline_id", "started_at"])
+
+
+def downgrade():
+    op.drop_table("step_trace")
@@ -0,0 +1,117 @@
+"""add retention archive
+
+Adds pipeline.retention_days, the execution index retention scans, and the
+retention_archive and archive_member tables. Step traces now outlive their
+executions, so step_trace.execution_id is set to null on delete. Existing
+tables, columns and indexes are left alone.
+
+Revision ID: e71c3cdeba28
+Revises: 0cf81c2d7ed6
+Create Date: 2026-10-18 09:40:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e71c3cdeba28"
+down_revision = "0cf81c2d7ed6"
+branch_labels = None
+depends_on = None
+
+# Names the unnamed foreign keys SQLite reflects, so batch mode can replace them
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _replace_trace_execution_key(inspector, ondelete):
+    (key,) = [
+        key
+        for key in inspector.get_foreign_keys("step_trace")
+        if key["constrained_columns"] == ["execution_id"]
+    ]
+    if (key["options"].get("ondelete") or "").upper() == ondelete:
+        return
+    name = key["name"] or "fk_step_trace_execution_id_pipeline_execution"
+    with op.batch_alter_table("step_trace", naming_convention=NAMING_CONVENTION) as batch:
+        batch.drop_constraint(name, type_="foreignkey")
+        batch.create_foreign_key(
+            name, "pipeline_execution", ["execution_id"], ["id"], ondelete=ondelete
+        )
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if "retention_days" not in {column["name"] for column in inspector.get_columns("pipeline")}:
+        op.add_column("pipeline", sa.Column("retention_days", sa.Integer()))
+    indexes = {index["name"] for index in inspector.get_indexes("pipeline_execution")}
+    if "ix_pipeline_execution_pipeline_created" not in indexes:
+        op.create_index(
+            "ix_pipeline_execution_pipeline_created",
+            "pipeline_execution",
+            ["pipeline_id", "created_at"],
+        )
+    _replace_trace_execution_key(inspector, "SET NULL")
+
+    if not inspector.has_table("retention_archive"):
+        op.create_table(
+            "retention_archive",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column("kind", sa.String(20), nullable=False),
+            sa.Column(
+                "pipeline_id", sa.Integer(), sa.ForeignKey("pipeline.id", ondelete="SET NULL")
+            ),
+            sa.Column("partition_date", sa.Date(), nullable=False),
+            sa.Column("path", sa.String(500), nullable=False),
+            sa.Column("first_id", sa.Integer(), nullable=False),
+            sa.Column("last_id", sa.Integer(), nullable=False),
+            sa.Column("rows", sa.Integer(), nullable=False),
+            sa.Column("status_counts", sa.JSON()),
+            sa.Column("oldest_at", sa.DateTime(), nullable=False),
+            sa.Column("newest_at", sa.DateTime(), nullable=False),
+            sa.Column("size_bytes", sa.Integer(), nullable=False),
+        )
+        op.create_index("ix_retention_archive_id", "retention_archive", ["id"])
+        op.create_index(
+            "ix_retention_archive_kind_ids", "retention_archive", ["kind", "first_id", "last_id"]
+        )
+        op.create_index(
+            "ix_retention_archive_pipeline_date",
+            "retention_archive",
+            ["pipeline_id", "partition_date"],
+        )
+
+    if not inspector.has_table("archive_member"):
+        op.create_table(
+            "archive_member",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column(
+                "archive_id",
+                sa.Integer(),
+                sa.ForeignKey("retention_archive.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("kind", sa.String(20), nullable=False),
+            sa.Column("first_id", sa.Integer(), nullable=False),
+            sa.Column("last_id", sa.Integer(), nullable=False),
+            sa.Column("offset", sa.Integer(), nullable=False),
+        )
+        op.create_index("ix_archive_member_id", "archive_member", ["id"])
+        op.create_index("ix_archive_member_archive_id", "archive_member", ["archive_id"])
+        op.create_index(
+            "ix_archive_member_kind_ids", "archive_member", ["kind", "first_id", "last_id"]
+        )
+
+
+def downgrade():
+    op.drop_table("archive_member")
+    op.drop_table("retention_archive")
+    _replace_trace_execution_key(sa.inspect(op.get_bind()), "CASCADE")
+    op.drop_index("ix_pipeline_execution_pipeline_created", table_name="pipeline_execution")
+    with op.batch_alter_table("pipeline") as batch:
+        batch.drop_column("retention_days")
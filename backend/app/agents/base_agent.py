@@ -2,14 +2,41 @@
 Base Agent class for modular agent system.
 """
 
+import hashlib
+import json
 from abc import ABC, abstractmethod
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from app.agents.columnar import COLUMNAR_MIN_BATCH, ColumnarValidator
+from app.agents.record import Record, materialize
+from app.agents.statistics import DEFAULT_QUANTILES, batch_statistics
+from app.agents.transform import compile_transform
+from app.agents.validation import compile_rules, run_checks
+from app.core.sizing import estimate_size
+
+if TYPE_CHECKING:
+    from app.services.sketch_store import SketchStream
 
 
 class BaseAgent(ABC):
     """Base class for all agents in the system."""
 
+    # CPU-bound agents are run in a shared process pool instead of on the event loop.
+    # Their class must be importable and their config picklable.
+    cpu_bound: bool = False
+
+    # Deterministic agents always map the same input and config to the same output,
+    # so the executor may reuse their cached outputs instead of running them. The flag
+    # is not inherited; see is_deterministic.
+    deterministic: bool = False
+
+    # Copy-on-write agents accept Record inputs and never mutate their input, so the
+    # executor hands them records as they are, and may return Records from
+    # execute_overlays. Other agents get private plain copies.
+    copy_on_write: bool = False
+
     def __init__(self, config: Dict[str, Any] = None):
         """
         Initialize agent with configuration.
@@ -35,6 +62,47 @@ class BaseAgent(ABC):
         """
         pass
 
+    def is_deterministic(self) -> bool:
+        """
+        Whether outputs of this agent may be reused for equal inputs and config.
+
+        Only a flag set on the agent or on its own class counts: a subclass,
+        such as a plugin extending a built-in agent, may compute something
+        else, so it has to declare itself deterministic again.
+        """
+        return vars(self).get("deterministic", vars(type(self)).get("deterministic", False))
+
+    async def execute_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Execute the agent's main logic over a batch of records.
+
+        The default implementation calls execute once per record. Agents
+        should override it when work such as parsing configuration or
+        generating timestamps can be done once per batch instead.
+
+        Args:
+            records: Input records
+
+        Returns:
+            One output per input record, in the same order
+        """
+        return [await self.execute(record) for record in records]
+
+    async def execute_overlays(self, records: List[Mapping]) -> List[Mapping]:
+        """
+        Execute over a batch for the pipeline executor, which accepts Record outputs.
+
+        Copy-on-write agents may return Records overlaying their inputs here
+        instead of plain dicts. The default implementation calls execute_batch.
+
+        Args:
+            records: Input records, possibly Records
+
+        Returns:
+            One output per input record, in the same order
+        """
+        return await self.execute_batch(records)
+
     async def validate_input(self, data: Dict[str, Any]) -> bool:
         """
         Validate input data before processing.
@@ -81,61 +149,170 @@ class BaseAgent(ABC):
 
 
 class ValidatorAgent(BaseAgent):
-    """Agent for validating data against schemas or rules."""
+    """
+    Agent for validating data against schemas or rules.
+
+    Rules are compiled into checks once, when the agent is created; see
+    app.agents.validation for the rule types. Batches of at least
+    COLUMNAR_MIN_BATCH records are validated column by column with NumPy,
+    with the same results, unless the config sets "columnar" to false.
+    """
+
+    deterministic = True
+    copy_on_write = True
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self._compile()
+
+    def _compile(self):
+        rules = self.config.get("rules", [])
+        self._checks = compile_rules(rules)
+        self._columnar = (
+            ColumnarValidator(rules, self._checks) if self.config.get("columnar", True) else None
+        )
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Checks are closures, so the agent travels to worker processes without them
+        state = self.__dict__.copy()
+        del state["_checks"], state["_columnar"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._compile()
 
     async def execute(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate data against configured rules."""
-        validation_rules = self.config.get("rules", [])
-        errors = []
-
-        for rule in validation_rules:
-            field = rule.get("field")
-            rule_type = rule.get("type")
-
-            if field not in data:
-                errors.append(f"Missing required field: {field}")
-                continue
-
-            value = data[field]
-
-            if rule_type == "required" and not value:
-                errors.append(f"Field {field} is required")
-            elif rule_type == "type":
-                expected_type = rule.get("expected")
-                if expected_type == "string" and not isinstance(value, str):
-                    errors.append(f"Field {field} must be a string")
-                elif expected_type == "number" and not isinstance(value, (int, float)):
-                    errors.append(f"Field {field} must be a number")
-            elif rule_type == "range":
-                min_val = rule.get("min")
-                max_val = rule.get("max")
-                if isinstance(value, (int, float)):
-                    if min_val is not None and value < min_val:
-                        errors.append(f"Field {field} must be >= {min_val}")
-                    if max_val is not None and value > max_val:
-                        errors.append(f"Field {field} must be <= {max_val}")
-
+        return self._validate(data)
+
+    async def execute_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Validate a batch of records, by columns if it is large enough."""
+        if self._columnar is None or len(records) < COLUMNAR_MIN_BATCH:
+            return [self._validate(data) for data in records]
+        errors = self._columnar.validate(records)
+        return [
+            {"valid": not record_errors, "errors": record_errors, "data": data}
+            for data, record_errors in zip(records, errors)
+        ]
+
+    def _validate(self, data: Mapping) -> Dict[str, Any]:
+        """Validate a single record against the compiled rules."""
+        errors = run_checks(data, self._checks)
         return {
-            "valid": len(errors) == 0,
+            "valid": not errors,
             "errors": errors,
             "data": data,
         }
 
 
 class AnalyzerAgent(BaseAgent):
-    """Agent for analyzing data and extracting insights."""
+    """
+    Agent for analyzing data and extracting insights.
+
+    With "batch_statistics" set in the config, every result of a batch also
+    carries per-field statistics of the whole batch, computed in one pass
+    with NumPy; "quantiles" chooses the quantiles reported.
+
+    With "streaming" set, each record is also compared with every record
+    analyzed before it, by all instances sharing the stream: the analysis
+    gets, per scalar field, the values seen, their distinct count, the
+    frequency of the record's value and, for numbers, its rank. State is
+    kept in mergeable sketches and shared through Redis; see
+    app.services.sketch_store. "streaming" may be an object naming the
+    stream, which otherwise is the same for agents of the same config.
+    """
+
+    copy_on_write = True
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self._quantiles = tuple(self.config.get("quantiles", DEFAULT_QUANTILES))
+        if any(not isinstance(q, (int, float)) or not 0 <= q <= 1 for q in self._quantiles):
+            raise ValueError("Analyzer quantiles must be numbers between 0 and 1")
+        self._sketches = self._sketch_stream()
+
+    def _sketch_stream(self) -> Optional["SketchStream"]:
+        streaming = self.config.get("streaming")
+        if not streaming:
+            return None
+        # Imported here so agents do not need settings unless they stream
+        from app.services.sketch_store import SketchStream
+
+        stream = streaming.get("stream") if isinstance(streaming, dict) else None
+        if stream is None:
+            config = json.dumps(self.config, sort_keys=True, default=str)
+            stream = "analyzer:" + hashlib.sha256(config.encode()).hexdigest()[:16]
+        return SketchStream(str(stream))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # A copy starts its own view, so its records are not merged twice
+        state = self.__dict__.copy()
+        del state["_sketches"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._sketches = self._sketch_stream()
 
     async def execute(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze data and extract insights."""
+        result = self._analyze(data, datetime.utcnow().isoformat())
+        if self._sketches is not None:
+            await self._sketches.sync()
+            self._compare(result)
+        return result
+
+    async def execute_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Analyze a batch of records sharing one timestamp, and its statistics if configured."""
+        timestamp = datetime.utcnow().isoformat()
+        results = [self._analyze(data, timestamp) for data in records]
+        if self.config.get("batch_statistics", False):
+            # One summary of the batch, shared by the results
+            statistics = batch_statistics(records, self._quantiles)
+            for result in results:
+                result["analysis"]["batch_statistics"] = statistics
+        if self._sketches is not None:
+            await self._sketches.sync()
+            for result in results:
+                self._compare(result)
+        return results
+
+    async def on_stop(self):
+        """Merge sketched records into the shared sketches when due."""
+        await super().on_stop()
+        if self._sketches is not None:
+            await self._sketches.sync()
+
+    def _compare(self, result: Dict[str, Any]):
+        """Compare a record with those before it, in order, then add it to the sketches."""
+        if isinstance(result["data"], Mapping):
+            result["analysis"]["streaming"] = self._sketches.observe(result["data"])
+
+    def streaming_summary(self) -> Optional[Dict[str, Any]]:
+        """
+        Summarize the records seen by the stream, as far as this instance knows.
+
+        Returns:
+            Counts, distinct values, quantiles and heavy hitters of each field,
+            or None if the agent is not streaming
+        """
+        if self._sketches is None:
+            return None
+        return self._sketches.view.summary(self._quantiles)
+
+    @staticmethod
+    def _analyze(data: Mapping, timestamp: str) -> Dict[str, Any]:
+        """Analyze a single record."""
         analysis = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "data_size": len(str(data)),
-            "fields_count": len(data.keys()) if isinstance(data, dict) else 0,
+            "timestamp": timestamp,
+            "data_size": estimate_size(data),
+            "fields_count": len(data.keys()) if isinstance(data, Mapping) else 0,
             "insights": [],
         }
 
         # Example analysis logic
-        if isinstance(data, dict):
+        if isinstance(data, Mapping):
             # Check for missing values
             missing_fields = [k for k, v in data.items() if v is None or v == ""]
             if missing_fields:
@@ -166,45 +343,109 @@ class AnalyzerAgent(BaseAgent):
 class EnricherAgent(BaseAgent):
     """Agent for enriching data with additional information."""
 
+    copy_on_write = True
+
     async def execute(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Enrich data with additional information."""
-        enriched_data = data.copy()
-
-        # Add metadata
-        enriched_data["_enrichment"] = {
+        return materialize(self._enrich(data, self._metadata(), self._parse_rules()))
+
+    async def execute_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Enrich a batch of records, building metadata and rules once."""
+        return [materialize(result) for result in self._enrich_batch(records)]
+
+    async def execute_overlays(self, records: List[Mapping]) -> List[Mapping]:
+        """Enrich a batch of records into Records overlaying them."""
+        if type(self).execute_batch is not EnricherAgent.execute_batch:
+            # Subclasses replacing execute_batch are still run through it
+            return await self.execute_batch(records)
+        return self._enrich_batch(records)
+
+    def _enrich_batch(self, records: List[Mapping]) -> List[Record]:
+        metadata = self._metadata()
+        rules = self._parse_rules()
+        return [self._enrich(data, metadata, rules) for data in records]
+
+    def _metadata(self) -> Dict[str, Any]:
+        """Build the enrichment metadata block."""
+        return {
             "timestamp": datetime.utcnow().isoformat(),
             "agent": self.name,
             "version": self.version,
         }
 
-        # Apply custom enrichment rules from config
-        enrichment_rules = self.config.get("rules", [])
-        for rule in enrichment_rules:
+    def _parse_rules(self) -> List[Tuple[str, Any]]:
+        """Read the configured rules as (field, value) pairs, skipping empty ones."""
+        rules = []
+        for rule in self.config.get("rules", []):
             field = rule.get("add_field")
             value = rule.get("value")
             if field and value:
-                enriched_data[field] = value
+                rules.append((field, value))
+        return rules
+
+    @staticmethod
+    def _enrich(data: Mapping, metadata: Dict[str, Any], rules: List[Tuple[str, Any]]) -> Record:
+        """Enrich a single record, writing only the added fields."""
+        # Add metadata, then apply custom enrichment rules from config
+        changes = {"_enrichment": dict(metadata)}
+        for field, value in rules:
+            changes[field] = value
 
-        return enriched_data
+        return Record.overlay(data, changes)
 
 
 class TransformerAgent(BaseAgent):
-    """Agent for transforming data structure or format."""
+    """
+    Agent for transforming data structure or format.
+
+    "mappings" renames top-level fields and "fields" computes fields from
+    nested paths and expressions, with defaults; see app.agents.transform.
+    Both are compiled into one function when the agent is created.
+    """
+
+    deterministic = True
+    copy_on_write = True
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self._compile()
+
+    def _compile(self):
+        self._mappings = self.config.get("mappings", {})
+        self._copy_unmapped = self.config.get("copy_unmapped", False)
+        self._function = compile_transform(self._mappings, self.config.get("fields", {}))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The compiled function is generated code, so it is rebuilt after unpickling
+        state = self.__dict__.copy()
+        del state["_function"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._compile()
 
     async def execute(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Transform data according to configured rules."""
-        transformed_data = {}
-
-        # Apply field mappings
-        mappings = self.config.get("mappings", {})
-        for source_field, target_field in mappings.items():
-            if source_field in data:
-                transformed_data[target_field] = data[source_field]
-
-        # Copy unmapped fields if configured
-        if self.config.get("copy_unmapped", False):
-            for key, value in data.items():
-                if key not in mappings and key not in transformed_data:
-                    transformed_data[key] = value
+        return materialize(self._transform(data))
+
+    async def execute_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Transform a batch of records."""
+        return [materialize(self._transform(data)) for data in records]
+
+    async def execute_overlays(self, records: List[Mapping]) -> List[Mapping]:
+        """Transform a batch of records, keeping unmapped fields as Records overlaying them."""
+        if type(self).execute_batch is not TransformerAgent.execute_batch:
+            # Subclasses replacing execute_batch are still run through it
+            return await self.execute_batch(records)
+        return [self._transform(data) for data in records]
+
+    def _transform(self, data: Mapping) -> Mapping:
+        """Transform a single record."""
+        transformed_data = self._function(data)
+
+        # Keep unmapped fields if configured, renaming in place instead of copying
+        if self._copy_unmapped:
+            return Record.overlay(data, transformed_data, removed=self._mappings)
 
         return transformed_data
@@ -0,0 +1,271 @@
+"""
+Columnar validation of record batches with NumPy.
+
+A batch is pivoted into one column per field that a rule reads, in a
+single pass when every record has every field. Required,
+type, range and enum rules on top-level fields are then evaluated as
+boolean masks over whole columns, and only the failures are turned back
+into per-record error messages. Other rules run their compiled checks
+record by record. Errors come out in rule order, exactly as the per-record
+checks report them.
+"""
+
+import math
+import operator
+from collections.abc import Mapping
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.agents.validation import Check
+
+# Kinds of column values, by exact type; subclasses are classified with isinstance
+MISSING, STRING, NUMBER, OTHER = range(4)
+KINDS = {str: STRING, int: NUMBER, float: NUMBER, bool: NUMBER, type(None): OTHER}
+
+# Smallest batch worth pivoting into columns
+COLUMNAR_MIN_BATCH = 64
+
+# Integers beyond this do not convert to float64 exactly
+EXACT_INT = 2**53
+
+_ABSENT = object()
+
+# Builds the failure masks of a rule, each with its message, in reporting order
+MaskRule = Callable[["Column"], List[Tuple[np.ndarray, str]]]
+
+
+def _kind(value: Any) -> int:
+    if value is _ABSENT:
+        return MISSING
+    if isinstance(value, str):
+        return STRING
+    if isinstance(value, (int, float)):
+        return NUMBER
+    return OTHER
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+
+
+def _exact_bound(bound: Any) -> bool:
+    return bound is None or (
+        isinstance(bound, (int, float)) and (isinstance(bound, float) or abs(bound) <= EXACT_INT)
+    )
+
+
+class Column:
+    """Values of one field across a batch, with masks computed on first use."""
+
+    def __init__(self, values: List[Any]):
+        self.values = values
+
+    @cached_property
+    def kinds(self) -> np.ndarray:
+        """Kind of each value by its exact type, -1 for types to classify with isinstance."""
+        # Types are compared by identity, as integers
+        types = np.fromiter(map(id, map(type, self.values)), np.intp, len(self.values))
+        kinds = np.full(len(self.values), -1, np.int8)
+        for value_type, kind in KINDS.items():
+            kinds[types == id(value_type)] = kind
+        return kinds
+
+    @cached_property
+    def classified(self) -> np.ndarray:
+        kinds = self.kinds.copy()
+        for index in np.flatnonzero(kinds < 0):
+            kinds[index] = _kind(self.values[index])
+        return kinds
+
+    @cached_property
+    def missing(self) -> np.ndarray:
+        return self.classified == MISSING
+
+    @cached_property
+    def objects(self) -> np.ndarray:
+        return np.fromiter(self.values, object, len(self.values))
+
+    @cached_property
+    def falsy(self) -> np.ndarray:
+        return ~self.objects.astype(bool)
+
+    @cached_property
+    def numbers(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Numeric values as float64, and the numbers that only Python compares exactly."""
+        indices = np.flatnonzero(self.classified == NUMBER)
+        numbers = np.zeros(len(self.values))
+        try:
+            numbers[indices] = self.objects[indices].astype(float)
+        except OverflowError:
+            numbers[indices] = [_to_float(self.values[index]) for index in indices]
+        return numbers, np.abs(numbers) > EXACT_INT
+
+
+def pivot(records: Sequence[Mapping], fields: Sequence[Any]) -> Dict[Any, Column]:
+    """
+    Pivot records into one column per field.
+
+    Args:
+        records: Records of the batch
+        fields: Fields to read, without duplicates
+
+    Returns:
+        Column of each field
+    """
+    if not fields:
+        return {}
+    try:
+        # One pass over the records while every record has every field
+        rows = list(map(operator.itemgetter(*fields), records))
+    except KeyError:
+        return {
+            field: Column(list(map(operator.methodcaller("get", field, _ABSENT), records)))
+            for field in fields
+        }
+    if len(fields) == 1:
+        return {fields[0]: Column(rows)}
+    return {field: Column(list(values)) for field, values in zip(fields, zip(*rows))}
+
+
+def _required(name: str) -> MaskRule:
+    message = f"Field {name} is required"
+
+    def masks(column: Column) -> List[Tuple[np.ndarray, str]]:
+        return [(column.falsy & ~column.missing, message)]
+
+    return masks
+
+
+def _type(name: str, expected: Any) -> MaskRule:
+    kind = {"string": STRING, "number": NUMBER}.get(expected)
+    message = f"Field {name} must be a {expected}"
+
+    def masks(column: Column) -> List[Tuple[np.ndarray, str]]:
+        if kind is None:
+            return []
+        return [((column.classified != kind) & ~column.missing, message)]
+
+    return masks
+
+
+def _range(name: str, low: Any, high: Any) -> MaskRule:
+    bounds = [
+        (bound, compare, message)
+        for bound, compare, message in (
+            (low, np.less, f"Field {name} must be >= {low}"),
+            (high, np.greater, f"Field {name} must be <= {high}"),
+        )
+        if bound is not None
+    ]
+
+    def masks(column: Column) -> List[Tuple[np.ndarray, str]]:
+        numbers, inexact = column.numbers
+        is_number = column.classified == NUMBER
+        result = []
+        for bound, compare, message in bounds:
+            failed = compare(numbers, bound) & is_number
+            for index in np.flatnonzero(inexact):
+                value = column.values[index]
+                failed[index] = value < bound if compare is np.less else value > bound
+            result.append((failed, message))
+        return result
+
+    return masks
+
+
+def _enum(name: str, values: List[str]) -> MaskRule:
+    message = f"Field {name} must be one of {values}"
+    allowed = np.array(values, dtype=object)
+
+    def masks(column: Column) -> List[Tuple[np.ndarray, str]]:
+        # Only exact strings can match, so True is never taken for a string
+        failed = ~column.missing
+        strings = np.flatnonzero(column.kinds == STRING)
+        failed[strings] = ~np.isin(column.objects[strings], allowed)
+        return [(failed, message)]
+
+    return masks
+
+
+def compile_mask_rule(rule: Dict[str, Any]) -> Optional[MaskRule]:
+    """
+    Compile a rule into column masks, if it can be evaluated on columns.
+
+    Args:
+        rule: Rule configuration
+
+    Returns:
+        Mask builder, or None if the rule must run record by record
+    """
+    if rule.get("path") is not None:
+        return None
+    rule_type, name = rule.get("type"), rule.get("field")
+    if rule_type == "required":
+        return _required(name)
+    if rule_type == "type":
+        return _type(name, rule.get("expected"))
+    if rule_type == "range" and _exact_bound(rule.get("min")) and _exact_bound(rule.get("max")):
+        return _range(name, rule.get("min"), rule.get("max"))
+    if rule_type == "enum":
+        values = rule.get("values")
+        if isinstance(values, list) and all(type(value) is str for value in values):
+            return _enum(name, values)
+    return None
+
+
+class ColumnarValidator:
+    """
+    Validates batches of records column by column.
+
+    Args:
+        rules: Rule configurations
+        checks: The same rules compiled into per-record checks
+    """
+
+    def __init__(self, rules: Sequence[Dict[str, Any]], checks: Sequence[Check]):
+        self.steps: List[Tuple[Any, str, Optional[MaskRule], Check]] = [
+            (
+                rule.get("field"),
+                f"Missing required field: {rule.get('field')}",
+                compile_mask_rule(rule),
+                check,
+            )
+            for rule, check in zip(rules, checks)
+        ]
+        self.fields = list(
+            dict.fromkeys(field for field, _, mask_rule, _ in self.steps if mask_rule is not None)
+        )
+
+    def validate(self, records: Sequence[Mapping]) -> List[List[str]]:
+        """
+        Validate a batch of records.
+
+        Args:
+            records: Records to validate
+
+        Returns:
+            Errors of each record, in rule order
+        """
+        errors: List[List[str]] = [[] for _ in records]
+        columns = pivot(records, self.fields)
+
+        for field, missing, mask_rule, check in self.steps:
+            if mask_rule is None:
+                for record, record_errors in zip(records, errors):
+                    check(record, record_errors)
+                continue
+
+            column = columns[field]
+            failures = [(column.missing, missing)]
+            failures.extend(mask_rule(column))
+            # A record fails a rule's masks in order, so its messages stay in order
+            for mask, message in failures:
+                for index in np.flatnonzero(mask):
+                    errors[index].append(message)
+
+        return errors
@@ -0,0 +1,131 @@
+"""
+Copy-on-write records passed between pipeline steps.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, Optional
+
+
+class Record(Mapping):
+    """
+    Read-only view of a record as a set of changes over an immutable base.
+
+    Agents return a Record instead of copying their input, so a step only
+    allocates the fields it writes. Overlaying a Record merges the changes
+    instead of stacking another layer, so lookups stay one level deep and
+    the base is never copied however many steps a record passes through.
+
+    Neither the base nor values read from a Record may be mutated; call
+    materialize with copy set to get a plain dict that can be.
+    """
+
+    __slots__ = ("_base", "_changes", "_removed")
+
+    def __init__(
+        self,
+        base: Mapping,
+        changes: Optional[Dict[str, Any]] = None,
+        removed: FrozenSet[str] = frozenset(),
+    ):
+        self._base = base
+        self._changes = changes or {}
+        # Only hides keys of the base; a key in changes is always present
+        self._removed = removed
+
+    @classmethod
+    def overlay(
+        cls, data: Mapping, changes: Dict[str, Any], removed: Iterable[str] = ()
+    ) -> "Record":
+        """
+        Describe data with some fields removed and others set, without copying it.
+
+        Args:
+            data: Plain mapping or Record to start from
+            changes: Fields to set
+            removed: Fields to drop, applied before changes
+
+        Returns:
+            Record sharing the base of data
+        """
+        if isinstance(data, Record):
+            base = data._base
+            merged = dict(data._changes)
+            hidden = set(data._removed)
+        else:
+            base = data
+            merged = {}
+            hidden = set()
+
+        for key in removed:
+            merged.pop(key, None)
+            if key in base:
+                hidden.add(key)
+        merged.update(changes)
+        return cls(base, merged, frozenset(hidden))
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._changes:
+            return self._changes[key]
+        if key in self._removed:
+            raise KeyError(key)
+        return self._base[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._changes or (key in self._base and key not in self._removed)
+
+    def __iter__(self) -> Iterator[str]:
+        # Same order as copying the base into a dict and applying the changes
+        for key in self._base:
+            if key not in self._removed:
+                yield key
+        for key in self._changes:
+            if key not in self._base or key in self._removed:
+                yield key
+
+    def __len__(self) -> int:
+        added = sum(1 for key in self._changes if key not in self._base or key in self._removed)
+        return len(self._base) - len(self._removed) + added
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def __reduce__(self):
+        # Records cross process boundaries as plain dicts
+        return (dict, (materialize(self),))
+
+
+def materialize(value: Any, copy: bool = False) -> Any:
+    """
+    Replace the Records in a value with plain dicts.
+
+    Containers without a Record inside are returned as they are, so a value
+    that never went through a Record is not copied, unless copy is set.
+
+    Args:
+        value: Step output or any JSON-like value
+        copy: Also copy the dicts and lists without a Record inside, so the
+            result shares no container with value and can be mutated
+
+    Returns:
+        Value made only of plain dicts, lists and scalars
+    """
+    if isinstance(value, Record):
+        return {key: materialize(item, copy) for key, item in value.items()}
+    if isinstance(value, dict):
+        items = {key: materialize(item, copy) for key, item in value.items()}
+        if copy or any(items[key] is not item for key, item in value.items()):
+            return items
+        return value
+    if isinstance(value, list):
+        items = [materialize(item, copy) for item in value]
+        if copy or any(new is not old for new, old in zip(items, value)):
+            return items
+        return value
+    return value
+
+
+def json_default(value: Any) -> Any:
+    """json.dumps default that encodes Records as objects."""
+    if isinstance(value, Record):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,503 @@
+"""
+Mergeable streaming sketches of record fields.
+
+Each field seen by a stream keeps, in bounded memory:
+
+    HyperLogLog     distinct count of its values
+    KLL             quantiles and ranks of its numeric values
+    Count-min       frequency of each value, with the most frequent values
+                    kept as heavy-hitter candidates
+
+All three merge: the sketch of two streams merged is the sketch of the
+streams concatenated, within the usual error bounds, so instances can
+sketch their own records and combine the results. Values are hashed with
+BLAKE2b rather than hash(), which differs between processes.
+
+Sketches serialize to compressed JSON, never pickle, since they are
+shared through Redis.
+"""
+
+import base64
+import bisect
+import hashlib
+import json
+import math
+import random
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# HyperLogLog registers are 2**HLL_PRECISION bytes; standard error 1.04 / sqrt(2**p)
+HLL_PRECISION = 11
+
+# KLL accuracy; rank error is about 1.7 / KLL_K
+KLL_K = 200
+
+# Count-min size; a frequency is overestimated by at most e / width of the total
+# with probability 1 - exp(-depth)
+CMS_WIDTH = 512
+CMS_DEPTH = 4
+
+# Heavy-hitter candidates kept per field
+TOP_VALUES = 16
+
+_MASK64 = (1 << 64) - 1
+
+
+def token(value: Any) -> str:
+    """Canonical text of a value, distinguishing strings from other JSON values."""
+    kind = type(value)
+    if kind is str:
+        return value
+    if kind is int or (kind is float and math.isfinite(value)):
+        # What json.dumps gives, without its overhead
+        return "\x1f" + repr(value)
+    return "\x1f" + json.dumps(value, sort_keys=True, default=str)
+
+
+def untoken(text: str) -> Any:
+    """Value of a token."""
+    return json.loads(text[1:]) if text.startswith("\x1f") else text
+
+
+def hash64(text: str) -> int:
+    """Stable 64-bit hash of a token."""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def _encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _decode(text: str) -> bytes:
+    return base64.b64decode(text)
+
+
+class HyperLogLog:
+    """Distinct count estimator."""
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[bytearray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+        self._estimate: Optional[int] = None
+
+    def add(self, hashed: int):
+        index = hashed >> (64 - self.precision)
+        rest = (hashed << self.precision) & _MASK64
+        # Position of the first set bit after the index bits
+        rank = 65 - rest.bit_length() if rest else 65 - self.precision
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            self._estimate = None
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLog precisions differ")
+        merged = np.maximum(
+            np.frombuffer(self.registers, np.uint8), np.frombuffer(other.registers, np.uint8)
+        )
+        self.registers = bytearray(merged.tobytes())
+        self._estimate = None
+
+    def estimate(self) -> int:
+        if self._estimate is None:
+            self._estimate = self._compute_estimate()
+        return self._estimate
+
+    def _compute_estimate(self) -> int:
+        registers = np.frombuffer(self.registers, np.uint8)
+        size = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / float(np.sum(np.ldexp(1.0, -registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            # Linear counting is more accurate while few registers are set
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"precision": self.precision, "registers": _encode(bytes(self.registers))}
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "HyperLogLog":
+        registers = bytearray(_decode(data["registers"]))
+        if len(registers) != 1 << data["precision"]:
+            raise ValueError("HyperLogLog registers do not match its precision")
+        return cls(data["precision"], registers)
+
+
+class KLLSketch:
+    """
+    Quantile sketch of Karnin, Lang and Liberty.
+
+    Level h holds items standing for 2**h values each. A full level is
+    sorted and every other item, from a random offset, is promoted to the
+    next level, so memory stays around 3 * k items. The first level is kept
+    sorted, and the higher levels, which change only on compaction, are
+    cached as one sorted array, so a rank costs two binary searches.
+    """
+
+    def __init__(self, k: int = KLL_K, levels: Optional[List[List[float]]] = None):
+        self.k = k
+        self.levels: List[List[float]] = levels if levels is not None else [[]]
+        self.levels[0].sort()
+        self._random = random.Random()
+        self._size = sum(len(level) for level in self.levels)
+        self._upper: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._count: Optional[int] = None
+        self._update_capacity()
+
+    def _level_capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _update_capacity(self):
+        self._capacity = sum(self._level_capacity(level) for level in range(len(self.levels)))
+
+    @property
+    def count(self) -> int:
+        """Number of values the sketch stands for."""
+        if self._count is None:
+            self._count = sum(len(level) << height for height, level in enumerate(self.levels))
+        return self._count
+
+    def add(self, value: float):
+        bisect.insort(self.levels[0], value)
+        self._size += 1
+        if self._count is not None:
+            self._count += 1
+        if self._size >= self._capacity:
+            self._compress()
+
+    def _compress(self):
+        self._upper = self._count = None
+        while self._size >= self._capacity:
+            for height, level in enumerate(self.levels):
+                if len(level) >= self._level_capacity(height):
+                    if height + 1 == len(self.levels):
+                        self.levels.append([])
+                        self._update_capacity()
+                    level.sort()
+                    # An odd item out stays at its level
+                    kept = [level.pop()] if len(level) % 2 else []
+                    self.levels[height + 1].extend(level[self._random.randint(0, 1) :: 2])
+                    self._size -= len(level) // 2
+                    level[:] = kept
+                    break
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, other_level in zip(self.levels, other.levels):
+            level.extend(other_level)
+        self.levels[0].sort()
+        self._size = sum(len(level) for level in self.levels)
+        self._update_capacity()
+        self._compress()
+
+    def _weighted(self, levels: Sequence[List[float]], first: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted items of levels from height first, with the cumulative weight up to each."""
+        items = np.fromiter(
+            (item for level in levels for item in level), float, sum(map(len, levels))
+        )
+        weights = np.repeat(
+            [1 << height for height in range(first, first + len(levels))], list(map(len, levels))
+        )
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def rank(self, value: float) -> float:
+        """Estimated fraction of values <= value."""
+        total = self.count
+        if not total:
+            return 0.0
+        if self._upper is None:
+            self._upper = self._weighted(self.levels[1:], 1)
+        items, cumulative = self._upper
+        below = bisect.bisect_right(self.levels[0], value)
+        position = int(np.searchsorted(items, value, side="right"))
+        if position:
+            below += int(cumulative[position - 1])
+        return below / total
+
+    def quantiles(self, fractions: Iterable[float]) -> List[Optional[float]]:
+        """Estimated values at each fraction, None when empty."""
+        items, cumulative = self._weighted(self.levels, 0)
+        if not len(items):
+            return [None for _ in fractions]
+        positions = np.searchsorted(cumulative, [f * cumulative[-1] for f in fractions])
+        return [float(items[min(position, len(items) - 1)]) for position in positions]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "KLLSketch":
+        return cls(data["k"], [[float(item) for item in level] for level in data["levels"]])
+
+
+class CountMinSketch:
+    """Frequency estimator, with the most frequent values kept as candidates."""
+
+    def __init__(
+        self,
+        width: int = CMS_WIDTH,
+        depth: int = CMS_DEPTH,
+        counts: Optional[array] = None,
+        top: Optional[Dict[str, int]] = None,
+    ):
+        self.width = width
+        self.depth = depth
+        self.counts = counts if counts is not None else array("q", bytes(8 * width * depth))
+        self.top: Dict[str, int] = top if top is not None else {}
+        self._offsets = range(0, width * depth, width)
+
+    def _cells(self, hashed: int) -> List[int]:
+        # Row hashes derived from two halves of one hash (Kirsch and Mitzenmacher)
+        low, high, width = hashed & 0xFFFFFFFF, (hashed >> 32) | 1, self.width
+        return [offset + (low + row * high) % width for row, offset in enumerate(self._offsets)]
+
+    def estimate(self, hashed: int) -> int:
+        counts = self.counts
+        return min([counts[cell] for cell in self._cells(hashed)])
+
+    def add(self, text: str, hashed: int):
+        counts = self.counts
+        cells = self._cells(hashed)
+        for cell in cells:
+            counts[cell] += 1
+        self._offer(text, min([counts[cell] for cell in cells]))
+
+    def _offer(self, text: str, estimate: int):
+        top = self.top
+        if text in top or len(top) < TOP_VALUES:
+            top[text] = estimate
+            return
+        smallest = min(top, key=top.__getitem__)
+        if estimate > top[smallest]:
+            del top[smallest]
+            top[text] = estimate
+
+    def merge(self, other: "CountMinSketch"):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Count-min sketch sizes differ")
+        merged = np.frombuffer(self.counts, np.int64) + np.frombuffer(other.counts, np.int64)
+        self.counts = array("q", merged.tobytes())
+        candidates = set(self.top) | set(other.top)
+        self.top = {}
+        for text in candidates:
+            self._offer(text, self.estimate(hash64(text)))
+
+    def heavy_hitters(self) -> List[Tuple[Any, int]]:
+        """Candidate values with their estimated counts, most frequent first."""
+        ranked = sorted(self.top.items(), key=lambda item: -item[1])
+        return [(untoken(text), count) for text, count in ranked]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "counts": _encode(self.counts.tobytes()),
+            "top": self.top,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "CountMinSketch":
+        counts = array("q")
+        counts.frombytes(_decode(data["counts"]))
+        if len(counts) != data["width"] * data["depth"]:
+            raise ValueError("Count-min counts do not match its size")
+        return cls(data["width"], data["depth"], counts, dict(data["top"]))
+
+
+class FieldSketch:
+    """Sketches of one field: values seen, nulls, distinct values, quantiles and frequencies."""
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.distinct = HyperLogLog()
+        self.numbers = KLLSketch()
+        self.frequencies = CountMinSketch()
+
+    def compare(self, value: Any, hashed: int, number: Optional[float]) -> Dict[str, Any]:
+        """
+        Describe a value against the values added so far, without adding it.
+
+        Args:
+            value: The value
+            hashed: hash64 of its token
+            number: The value as a number for quantiles, or None
+
+        Returns:
+            Values seen so far, their estimated distinct count, the estimated
+            fraction of them equal to this value and, for numbers, the
+            estimated fraction of earlier numbers <= it
+        """
+        comparison: Dict[str, Any] = {"seen": self.count, "distinct": self.distinct.estimate()}
+        if value is None:
+            return comparison
+        comparison["frequency"] = (
+            self.frequencies.estimate(hashed) / self.count if self.count else 0.0
+        )
+        if number is not None and self.numbers.count:
+            comparison["rank"] = self.numbers.rank(number)
+        return comparison
+
+    def add(self, value: Any, text: str, hashed: int, number: Optional[float]):
+        self.count += 1
+        if value is None:
+            self.nulls += 1
+            return
+        self.distinct.add(hashed)
+        self.frequencies.add(text, hashed)
+        if number is not None:
+            self.numbers.add(number)
+
+    def merge(self, other: "FieldSketch"):
+        self.count += other.count
+        self.nulls += other.nulls
+        self.distinct.merge(other.distinct)
+        self.numbers.merge(other.numbers)
+        self.frequencies.merge(other.frequencies)
+
+    def summary(self, quantiles: Sequence[float]) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "null_ratio": self.nulls / self.count if self.count else 0.0,
+            "distinct": self.distinct.estimate(),
+            "quantiles": dict(zip(map(str, quantiles), self.numbers.quantiles(quantiles))),
+            "heavy_hitters": self.frequencies.heavy_hitters(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "nulls": self.nulls,
+            "distinct": self.distinct.to_dict(),
+            "numbers": self.numbers.to_dict(),
+            "frequencies": self.frequencies.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "FieldSketch":
+        sketch = cls()
+        sketch.count = data["count"]
+        sketch.nulls = data["nulls"]
+        sketch.distinct = HyperLogLog.from_dict(data["distinct"])
+        sketch.numbers = KLLSketch.from_dict(data["numbers"])
+        sketch.frequencies = CountMinSketch.from_dict(data["frequencies"])
+        return sketch
+
+
+def _number(value: Any) -> Optional[float]:
+    # Booleans and NaN have no place among quantiles
+    if type(value) is bool or not isinstance(value, (int, float)):
+        return None
+    try:
+        number = float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+    return None if math.isnan(number) else number
+
+
+def _scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float))
+
+
+class StreamSketches:
+    """
+    Field sketches of one stream of records.
+
+    Only scalar values are sketched: strings, numbers, booleans and None.
+
+    Args:
+        max_fields: Most fields sketched; fields first seen beyond it are ignored
+    """
+
+    def __init__(self, max_fields: int):
+        self.max_fields = max_fields
+        self.fields: Dict[str, FieldSketch] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.fields)
+
+    def _sketch(self, field: str) -> Optional[FieldSketch]:
+        sketch = self.fields.get(field)
+        if sketch is None and len(self.fields) < self.max_fields:
+            sketch = self.fields[field] = FieldSketch()
+        return sketch
+
+    def observe(
+        self, record: Mapping, delta: Optional["StreamSketches"] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Compare a record with the records added before it, then add it.
+
+        Args:
+            record: The record
+            delta: Other sketches that also receive the record, without comparing
+
+        Returns:
+            Comparison of each sketched field, as FieldSketch.compare
+        """
+        comparisons = {}
+        for field, value in record.items():
+            if not _scalar(value):
+                continue
+            field = str(field)
+            text = token(value)
+            hashed = hash64(text)
+            number = _number(value)
+            sketch = self._sketch(field)
+            if sketch is not None:
+                comparisons[field] = sketch.compare(value, hashed, number)
+                sketch.add(value, text, hashed, number)
+            if delta is not None:
+                other = delta._sketch(field)
+                if other is not None:
+                    other.add(value, text, hashed, number)
+        return comparisons
+
+    def merge(self, other: "StreamSketches"):
+        for field, sketch in other.fields.items():
+            mine = self.fields.get(field)
+            if mine is not None:
+                mine.merge(sketch)
+            elif len(self.fields) < self.max_fields:
+                self.fields[field] = FieldSketch.from_dict(sketch.to_dict())
+
+    def summary(self, quantiles: Sequence[float] = (0.25, 0.5, 0.75)) -> Dict[str, Any]:
+        """Counts, distinct values, quantiles and heavy hitters of every field."""
+        return {field: sketch.summary(quantiles) for field, sketch in self.fields.items()}
+
+    def dumps(self) -> bytes:
+        """Serialize to compressed JSON."""
+        data = {field: sketch.to_dict() for field, sketch in self.fields.items()}
+        return zlib.compress(json.dumps(data, separators=(",", ":")).encode())
+
+    @classmethod
+    def loads(cls, data: bytes, max_fields: int) -> "StreamSketches":
+        """
+        Deserialize sketches made by dumps.
+
+        Args:
+            data: Serialized sketches
+            max_fields: Most fields kept
+
+        Returns:
+            The sketches
+
+        Raises:
+            ValueError: If the data is not serialized sketches
+        """
+        try:
+            fields = json.loads(zlib.decompress(data))
+            sketches = cls(max_fields)
+            for field, sketch in list(fields.items())[:max_fields]:
+                sketches.fields[field] = FieldSketch.from_dict(sketch)
+        except (zlib.error, LookupError, TypeError, AttributeError, ValueError) as e:
+            raise ValueError(f"Invalid sketch data: {e}") from None
+        return sketches
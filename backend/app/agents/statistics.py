@@ -0,0 +1,96 @@
+"""
+Per-field statistics of record batches with NumPy.
+
+A batch is pivoted into columns as for columnar validation, and the
+numeric values of every field are stacked into one matrix with NaN for
+values that are missing or not numbers, so each statistic is a single
+vectorized reduction over all fields at once.
+"""
+
+import math
+from collections.abc import Mapping
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from app.agents.columnar import NUMBER, pivot
+
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _number(value: float) -> Any:
+    # Non-finite results would not survive JSON columns
+    return value if math.isfinite(value) else None
+
+
+def batch_statistics(
+    records: Sequence[Any], quantiles: Sequence[float] = DEFAULT_QUANTILES
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Compute statistics of every field of a batch.
+
+    Every field gets the number of records that have it and the ratio of
+    records where it is missing, None or "". Fields with numeric values
+    also get the min, max, mean, population std and quantiles of those
+    values; NaN counts as null and booleans count as numbers.
+
+    Args:
+        records: Records of the batch; values that are not mappings are skipped
+        quantiles: Quantiles to report, between 0 and 1
+
+    Returns:
+        Statistics of each field, in order of first appearance
+
+    Raises:
+        ValueError: If a quantile is outside [0, 1]
+    """
+    if any(not 0 <= q <= 1 for q in quantiles):
+        raise ValueError("Quantiles must be between 0 and 1")
+    mappings = [record for record in records if isinstance(record, Mapping)]
+    if not mappings:
+        return {}
+
+    fields = list(dict.fromkeys(field for record in mappings for field in record))
+    columns = pivot(mappings, fields)
+    total = len(mappings)
+
+    statistics: Dict[str, Dict[str, Any]] = {}
+    numeric_fields: List[Any] = []
+    numeric_columns: List[np.ndarray] = []
+    for field, column in columns.items():
+        present = ~column.missing
+        values = column.objects
+        nulls = column.missing | (values == None) | (values == "")  # noqa: E711
+        is_number = column.classified == NUMBER
+        numbers = np.where(is_number, column.numbers[0], np.nan)
+        nulls |= is_number & np.isnan(numbers)
+
+        statistics[str(field)] = {
+            "count": int(present.sum()),
+            "null_ratio": float(nulls.sum()) / total,
+        }
+        if not np.isnan(numbers).all():
+            numeric_fields.append(field)
+            numeric_columns.append(numbers)
+
+    if numeric_columns:
+        matrix = np.column_stack(numeric_columns)
+        reductions = {
+            "numeric_count": (~np.isnan(matrix)).sum(axis=0),
+            "min": np.nanmin(matrix, axis=0),
+            "max": np.nanmax(matrix, axis=0),
+            "mean": np.nanmean(matrix, axis=0),
+            "std": np.nanstd(matrix, axis=0),
+        }
+        quantile_values = np.nanquantile(matrix, list(quantiles), axis=0) if quantiles else []
+        for index, field in enumerate(numeric_fields):
+            field_statistics = statistics[str(field)]
+            field_statistics["numeric_count"] = int(reductions["numeric_count"][index])
+            for name in ("min", "max", "mean", "std"):
+                field_statistics[name] = _number(float(reductions[name][index]))
+            field_statistics["quantiles"] = {
+                str(q): _number(float(quantile_values[position][index]))
+                for position, q in enumerate(quantiles)
+            }
+
+    return statistics
@@ -0,0 +1,379 @@
+"""
+Compilation of transformer configurations into generated Python functions.
+
+A transformer config has two parts, both optional:
+
+    mappings    {source_field: target_field} renames of top-level fields;
+                a target is only written when its source is present
+    fields      {target_field: spec} computed fields, where spec is
+                - a path string such as "a.b[0].c" into nested objects and lists
+                - {"path": ..., "default": ...}
+                - {"expr": ..., "default": ...}, an expression over top-level
+                  fields such as "price * qty if qty else 0"
+
+A path or expression that cannot be evaluated for a record, for example
+because a key is missing, writes its default, or leaves the target out
+when there is no default.
+
+Expressions are Python expressions limited to literals, field names,
+subscripts, arithmetic other than powers, comparisons, boolean logic,
+conditional expressions and calls of the functions in FUNCTIONS. Bare
+names are top-level fields of the record; names of FUNCTIONS can only be
+called. Building a string, list or tuple with *, +, % formatting or sum()
+fails when the result would hold more than MAX_SEQUENCE_LENGTH items,
+counting the items of nested containers and the characters of strings.
+
+The whole config is compiled into one function taking a record and
+returning the written fields, cached by the JSON encoding of the config.
+"""
+
+import ast
+import copy
+import functools
+import json
+import math
+import re
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+# Calls allowed in expressions
+FUNCTIONS: Dict[str, Callable] = {
+    "abs": abs,
+    "bool": bool,
+    "float": float,
+    "int": int,
+    "len": len,
+    "max": max,
+    "min": min,
+    "round": round,
+    "str": str,
+    "sum": sum,
+}
+
+ALLOWED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.BoolOp,
+    ast.Compare,
+    ast.IfExp,
+    ast.Call,
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.Subscript,
+    ast.Slice,
+    ast.List,
+    ast.Tuple,
+    ast.Dict,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.UAdd,
+    ast.USub,
+    ast.Not,
+    ast.And,
+    ast.Or,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.In,
+    ast.NotIn,
+    ast.Is,
+    ast.IsNot,
+)
+
+# Failures of a path or expression that fall back to the default
+PATH_ERRORS = (KeyError, IndexError, TypeError)
+EXPRESSION_ERRORS = (LookupError, TypeError, ValueError, ArithmeticError)
+
+# Most items a string, list or tuple built by an expression may hold, nested items included
+MAX_SEQUENCE_LENGTH = 100_000
+
+SEQUENCES = (str, bytes, list, tuple)
+
+# Conversion specifiers of % formatting, with their width and precision
+FORMAT_SPEC = re.compile(r"%(?:%|(?:\([^)]*\))?[-#0 +]*(\*|\d*)(?:\.(\*|\d*))?)")
+
+PATH_PART = re.compile(r"\.?([^.\[\]]+)|\[(-?\d+)\]")
+
+# Produces the written fields of a record
+TransformFunction = Callable[[Mapping], Dict[str, Any]]
+
+
+def parse_path(path: str) -> List[Any]:
+    """
+    Split a path such as "a.b[0].c" into keys and list indices.
+
+    Args:
+        path: Dotted path with optional [index] parts
+
+    Returns:
+        Keys as strings and indices as integers
+
+    Raises:
+        ValueError: If the path is malformed
+    """
+    parts: List[Any] = []
+    position = 0
+    while position < len(path):
+        match = PATH_PART.match(path, position)
+        if match is None or (position == 0 and path.startswith(".")):
+            raise ValueError(f"Invalid path: {path!r}")
+        key, index = match.groups()
+        parts.append(key if key is not None else int(index))
+        position = match.end()
+    if not parts:
+        raise ValueError("Empty path")
+    return parts
+
+
+def _sequence_size(value: Any, limit: int) -> int:
+    """Count the items and characters a value holds, stopping once past limit."""
+    # Shared references count every time, as the output encodes every copy
+    size = 0
+    stack = [value]
+    while stack and size <= limit:
+        item = stack.pop()
+        if isinstance(item, (str, bytes)):
+            size += len(item)
+        elif isinstance(item, (list, tuple)):
+            size += len(item)
+            stack.extend(item)
+        elif isinstance(item, Mapping):
+            size += len(item)
+            stack.extend(item.keys())
+            stack.extend(item.values())
+    return size
+
+
+def _too_long() -> ValueError:
+    return ValueError(f"Sequence longer than {MAX_SEQUENCE_LENGTH} items")
+
+
+def _multiply(left: Any, right: Any) -> Any:
+    """Multiply, refusing to repeat a sequence beyond MAX_SEQUENCE_LENGTH."""
+    for sequence, count in ((left, right), (right, left)):
+        if isinstance(sequence, SEQUENCES) and isinstance(count, int) and count > 0:
+            if _sequence_size(sequence, MAX_SEQUENCE_LENGTH // count) * count > MAX_SEQUENCE_LENGTH:
+                raise _too_long()
+    return left * right
+
+
+def _add(left: Any, right: Any) -> Any:
+    """Add, refusing to concatenate sequences beyond MAX_SEQUENCE_LENGTH."""
+    if isinstance(left, SEQUENCES) and isinstance(right, SEQUENCES):
+        size = _sequence_size(left, MAX_SEQUENCE_LENGTH)
+        if size + _sequence_size(right, MAX_SEQUENCE_LENGTH - size) > MAX_SEQUENCE_LENGTH:
+            raise _too_long()
+    return left + right
+
+
+def _modulo(left: Any, right: Any) -> Any:
+    """Take a remainder or format a string, refusing widths beyond MAX_SEQUENCE_LENGTH."""
+    if isinstance(left, (str, bytes)):
+        specs = FORMAT_SPEC.findall(left if isinstance(left, str) else left.decode("latin-1"))
+        for width, precision in specs:
+            for number in (width, precision):
+                if number == "*" or (number and int(number) > MAX_SEQUENCE_LENGTH):
+                    raise _too_long()
+    return left % right
+
+
+def _sum(values: Any, start: Any = 0) -> Any:
+    """Sum, concatenating lists and tuples in place and up to MAX_SEQUENCE_LENGTH."""
+    if not isinstance(start, (list, tuple)):
+        return sum(values, start)
+    # sum() would copy the whole result again for every item
+    total = list(start)
+    size = _sequence_size(start, MAX_SEQUENCE_LENGTH)
+    for value in values:
+        if type(value) is not type(start):
+            raise TypeError(
+                f"can only concatenate {type(start).__name__}, not {type(value).__name__}"
+            )
+        total.extend(value)
+        size += _sequence_size(value, MAX_SEQUENCE_LENGTH - size)
+        if size > MAX_SEQUENCE_LENGTH:
+            raise _too_long()
+    return total if isinstance(start, list) else tuple(total)
+
+
+# Operators checked at run time, since operands are only known then
+_CHECKED_OPERATORS = {ast.Mult: "_multiply", ast.Add: "_add", ast.Mod: "_modulo"}
+
+
+class _FieldReads(ast.NodeTransformer):
+    """Checks an expression and turns its field names into reads of the record."""
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(f"{type(node).__name__} is not allowed in expressions")
+        return super().generic_visit(node)
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        node = self.generic_visit(node)
+        checked = _CHECKED_OPERATORS.get(type(node.op))
+        if checked is not None:
+            return ast.Call(
+                func=ast.Name(id=checked, ctx=ast.Load()),
+                args=[node.left, node.right],
+                keywords=[],
+            )
+        return node
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise ValueError("Only calls of " + ", ".join(sorted(FUNCTIONS)) + " are allowed")
+        if node.keywords:
+            raise ValueError("Keyword arguments are not allowed in expressions")
+        node.args = [self.visit(arg) for arg in node.args]
+        node.func = ast.Name(id=f"_fn_{node.func.id}", ctx=ast.Load())
+        return node
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in FUNCTIONS:
+            raise ValueError(f"{node.id} can only be called")
+        return ast.Subscript(
+            value=ast.Name(id="data", ctx=ast.Load()), slice=ast.Constant(node.id), ctx=ast.Load()
+        )
+
+
+def compile_expression(expression: str) -> str:
+    """
+    Check an expression and translate it into Python source reading the record.
+
+    Args:
+        expression: Expression over top-level fields
+
+    Returns:
+        Source of an equivalent expression over the variable "data"
+
+    Raises:
+        ValueError: If the expression is invalid or uses anything not allowed
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression {expression!r}: {e.msg}") from None
+    return ast.unparse(ast.fix_missing_locations(_FieldReads().visit(tree)))
+
+
+class _Source:
+    """Lines of a generated function, with the constants they refer to."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.constants: Dict[str, Any] = {}
+
+    def literal(self, value: Any) -> str:
+        """Source for a value, inline when it has an exact literal form."""
+        if value is None or isinstance(value, (bool, int, str)):
+            return repr(value)
+        if isinstance(value, float) and math.isfinite(value):
+            return repr(value)
+        name = f"_const_{len(self.constants)}"
+        self.constants[name] = value
+        if isinstance(value, (dict, list)):
+            # Compiled functions are cached and shared, so each output gets its own copy
+            return f"_deepcopy({name})"
+        return name
+
+    def guarded(self, target: str, value: str, errors: str, default: Any, has_default: bool):
+        self.lines.append("    try:")
+        self.lines.append(f"        out[{target}] = {value}")
+        self.lines.append(f"    except {errors}:")
+        self.lines.append(
+            f"        out[{target}] = {self.literal(default)}" if has_default else "        pass"
+        )
+
+
+def _generate(mappings: Dict[Any, Any], fields: Dict[str, Any]) -> TransformFunction:
+    source = _Source()
+    for source_field, target_field in mappings.items():
+        key = source.literal(source_field)
+        source.lines.append(f"    if {key} in data:")
+        source.lines.append(f"        out[{source.literal(target_field)}] = data[{key}]")
+
+    for target_field, spec in fields.items():
+        if isinstance(spec, str):
+            spec = {"path": spec}
+        if not isinstance(spec, dict) or ("path" in spec) == ("expr" in spec):
+            raise ValueError(f"Field {target_field!r} needs exactly one of a path or an expr")
+        target = source.literal(target_field)
+        if "path" in spec:
+            reads = "".join(f"[{source.literal(part)}]" for part in parse_path(spec["path"]))
+            value, errors = f"data{reads}", "_PATH_ERRORS"
+        else:
+            value, errors = f"({compile_expression(spec['expr'])})", "_EXPRESSION_ERRORS"
+        source.guarded(target, value, errors, spec.get("default"), "default" in spec)
+
+    code = "\n".join(["def transform(data):", "    out = {}", *source.lines, "    return out"])
+    namespace: Dict[str, Any] = {
+        "__builtins__": {},
+        "_PATH_ERRORS": PATH_ERRORS,
+        "_EXPRESSION_ERRORS": EXPRESSION_ERRORS,
+        "_multiply": _multiply,
+        "_add": _add,
+        "_modulo": _modulo,
+        "_deepcopy": copy.deepcopy,
+        **{f"_fn_{name}": function for name, function in FUNCTIONS.items()},
+        "_fn_sum": _sum,
+        **source.constants,
+    }
+    exec(compile(code, "<transform>", "exec"), namespace)
+    transform = namespace["transform"]
+    transform.source = code
+    return transform
+
+
+def _failing(message: str) -> TransformFunction:
+    def transform(data: Mapping) -> Dict[str, Any]:
+        raise ValueError(message)
+
+    return transform
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_cached(encoded: str) -> TransformFunction:
+    config = json.loads(encoded)
+    return _generate(dict(config["mappings"]), config["fields"])
+
+
+def compile_transform(
+    mappings: Optional[Dict[Any, Any]] = None, fields: Optional[Dict[str, Any]] = None
+) -> TransformFunction:
+    """
+    Compile a transformer config into a function, reusing earlier compilations.
+
+    Args:
+        mappings: Renames of top-level fields, applied in order
+        fields: Computed fields by target name, applied after the mappings
+
+    Returns:
+        Function from a record to the fields written for it
+
+    Raises:
+        ValueError: If the config is invalid
+    """
+    mappings, fields = mappings or {}, fields or {}
+    if not isinstance(fields, dict):
+        raise ValueError("Transformer fields must be an object")
+    if not isinstance(mappings, dict):
+        # Malformed mappings have always failed the records rather than the config
+        return _failing(f"Transformer mappings must be an object, not {type(mappings).__name__}")
+    # Mappings are encoded as pairs so their order and key types survive
+    config = {"mappings": [list(pair) for pair in mappings.items()], "fields": fields}
+    try:
+        encoded = json.dumps(config, allow_nan=False)
+    except (TypeError, ValueError):
+        return _generate(mappings, fields)
+    # Configs that JSON does not carry exactly, such as tuples, are not cached
+    if json.loads(encoded) != config:
+        return _generate(mappings, fields)
+    return _compile_cached(encoded)
@@ -0,0 +1,273 @@
+"""
+Compilation of validation rules into check closures.
+
+A rule names the value it checks with "field", a top-level key, or with
+"path", a dotted path such as "address.city" into nested objects and
+lists. Every rule reports a missing value. The rule types are:
+
+    required    value must be truthy
+    type        "expected" is "string" or "number"
+    range       number within "min" and/or "max"
+    regex       string matching "pattern" (re.search; anchor it to match whole)
+    enum        value is one of "values"
+    length      length of a string, list or object within "min" and/or "max"
+    compare     value compared with the value at "other" (a key or dotted path)
+                using "op": one of <, <=, ==, !=, >=, >
+
+Rules of any other type only check that the value is present.
+"""
+
+import operator
+import re
+from collections.abc import Mapping, Sized
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Appends the errors of one rule about a record to a list
+Check = Callable[[Mapping, List[str]], None]
+
+# Returns the value a rule checks, raising LookupError when it is absent
+Getter = Callable[[Mapping], Any]
+
+COMPARISONS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    ">": operator.gt,
+}
+
+
+def compile_getter(field: Any = None, path: Optional[str] = None) -> Getter:
+    """
+    Build a function reading a top-level field or a dotted path from a record.
+
+    Args:
+        field: Top-level key, used as is
+        path: Dotted path; numeric parts index into lists
+
+    Returns:
+        Getter raising LookupError when the value is absent
+    """
+    if path is None:
+        return operator.itemgetter(field)
+
+    parts = tuple((part, int(part) if part.isdigit() else None) for part in path.split("."))
+
+    def get_path(data: Mapping) -> Any:
+        value: Any = data
+        for key, index in parts:
+            if isinstance(value, Mapping):
+                value = value[key]
+            elif index is not None and isinstance(value, list):
+                value = value[index]
+            else:
+                raise KeyError(path)
+        return value
+
+    return get_path
+
+
+def compile_rule(rule: Dict[str, Any]) -> Check:
+    """
+    Compile one rule into a check.
+
+    Args:
+        rule: Rule configuration
+
+    Returns:
+        Check appending the rule's errors about a record
+
+    Raises:
+        ValueError: If the rule is malformed
+    """
+    rule_type = rule.get("type")
+    path = rule.get("path")
+    name = path if path is not None else rule.get("field")
+    get = compile_getter(rule.get("field"), path)
+    missing = f"Missing required field: {name}"
+
+    if rule_type == "required":
+        message = f"Field {name} is required"
+
+        def check(data: Mapping, errors: List[str]):
+            try:
+                value = get(data)
+            except LookupError:
+                errors.append(missing)
+                return
+            if not value:
+                errors.append(message)
+
+        return check
+
+    if rule_type == "type":
+        expected = rule.get("expected")
+        types = {"string": str, "number": (int, float)}.get(expected)
+        message = f"Field {name} must be a {expected}"
+
+        def check(data: Mapping, errors: List[str]):
+            try:
+                value = get(data)
+            except LookupError:
+                errors.append(missing)
+                return
+            if types is not None and not isinstance(value, types):
+                errors.append(message)
+
+        return check
+
+    if rule_type == "range":
+        low, high = rule.get("min"), rule.get("max")
+        low_message = f"Field {name} must be >= {low}"
+        high_message = f"Field {name} must be <= {high}"
+
+        def check(data: Mapping, errors: List[str]):
+            try:
+                value = get(data)
+            except LookupError:
+                errors.append(missing)
+                return
+            if isinstance(value, (int, float)):
+                if low is not None and value < low:
+                    errors.append(low_message)
+                if high is not None and value > high:
+                    errors.append(high_message)
+
+        return check
+
+    if rule_type == "length":
+        low, high = rule.get("min"), rule.get("max")
+        invalid = f"Field {name} must have a length"
+        low_message = f"Field {name} must have a length >= {low}"
+        high_message = f"Field {name} must have a length <= {high}"
+
+        def check(data: Mapping, errors: List[str]):
+            try:
+                value = get(data)
+            except LookupError:
+                errors.append(missing)
+                return
+            if not isinstance(value, Sized):
+                errors.append(invalid)
+                return
+            length = len(value)
+            if low is not None and length < low:
+                errors.append(low_message)
+            if high is not None and length > high:
+                errors.append(high_message)
+
+        return check
+
+    if rule_type == "regex":
+        try:
+            search = re.compile(rule["pattern"]).search
+        except (KeyError, TypeError, re.error) as e:
+            raise ValueError(f"Invalid regex rule for {name}: {e}") from None
+        message = f"Field {name} must match {rule['pattern']}"
+
+        def check(data: Mapping, errors: List[str]):
+            try:
+                value = get(data)
+            except LookupError:
+                errors.append(missing)
+                return
+            if not isinstance(value, str) or search(value) is None:
+                errors.append(message)
+
+        return check
+
+    if rule_type == "enum":
+        values = rule.get("values")
+        if not isinstance(values, list):
+            raise ValueError(f"Enum rule for {name} needs a list of values")
+        message = f"Field {name} must be one of {values}"
+        # Values are matched with their type, so True is not taken for 1
+        hashable = frozenset(
+            (type(value), value) for value in values if not isinstance(value, (list, Mapping))
+        )
+        unhashable = [value for value in values if isinstance(value, (list, Mapping))]
+
+        def check(data: Mapping, errors: List[str]):
+            try:
+                value = get(data)
+            except LookupError:
+                errors.append(missing)
+                return
+            if isinstance(value, (list, Mapping)):
+                if value not in unhashable:
+                    errors.append(message)
+            elif (type(value), value) not in hashable:
+                errors.append(message)
+
+        return check
+
+    if rule_type == "compare":
+        compare = COMPARISONS.get(rule.get("op"))
+        other = rule.get("other")
+        if compare is None or not isinstance(other, str):
+            raise ValueError(f"Compare rule for {name} needs an op and another field")
+        get_other = compile_getter(other, other if "." in other else None)
+        other_missing = f"Missing required field: {other}"
+        message = f"Field {name} must be {rule['op']} {other}"
+
+        def check(data: Mapping, errors: List[str]):
+            try:
+                value = get(data)
+            except LookupError:
+                errors.append(missing)
+                return
+            try:
+                reference = get_other(data)
+            except LookupError:
+                errors.append(other_missing)
+                return
+            try:
+                valid = compare(value, reference)
+            except TypeError:
+                valid = False
+            if not valid:
+                errors.append(message)
+
+        return check
+
+    def check(data: Mapping, errors: List[str]):
+        try:
+            get(data)
+        except LookupError:
+            errors.append(missing)
+
+    return check
+
+
+def compile_rules(rules: Sequence[Dict[str, Any]]) -> List[Check]:
+    """
+    Compile rules into checks, in order.
+
+    Args:
+        rules: Rule configurations
+
+    Returns:
+        One check per rule
+
+    Raises:
+        ValueError: If a rule is malformed
+    """
+    return [compile_rule(rule) for rule in rules]
+
+
+def run_checks(data: Mapping, checks: Sequence[Check]) -> List[str]:
+    """
+    Run compiled checks on a record.
+
+    Args:
+        data: Record to validate
+        checks: Compiled checks
+
+    Returns:
+        Errors, in rule order
+    """
+    errors: List[str] = []
+    for check in checks:
+        check(data, errors)
+    return errors
@@ -14,6 +14,7 @@ from app.api.deps import RBACChecker, get_current_user
 from app.core.database import get_db
 from app.models import Agent, AgentStatus, AgentType, User
 from app.services.audit import AuditLogger
+from app.services.pipeline_plan import plan_cache
 
 router = APIRouter()
 
@@ -148,6 +149,7 @@ async def update_agent(
 
     await db.commit()
     await db.refresh(agent)
+    plan_cache.invalidate_agent(agent.id)
 
     # Audit log
     await AuditLogger.log_update(
@@ -193,6 +195,7 @@ async def delete_agent(
 
     await db.delete(agent)
     await db.commit()
+    plan_cache.invalidate_agent(agent_id)
 
     return None
 
@@ -217,6 +220,7 @@ async def activate_agent(
     agent.status = AgentStatus.ACTIVE
     await db.commit()
     await db.refresh(agent)
+    plan_cache.invalidate_agent(agent.id)
 
     # Audit log
     await AuditLogger.log_update(
@@ -252,6 +256,7 @@ async def deactivate_agent(
     agent.status = AgentStatus.INACTIVE
     await db.commit()
     await db.refresh(agent)
+    plan_cache.invalidate_agent(agent.id)
 
     # Audit log
     await AuditLogger.log_update(
@@ -2,27 +2,49 @@
 Pipeline management endpoints.
 """
 
-from datetime import datetime
-from typing import List, Optional
+import asyncio
+import json
+from contextlib import AsyncExitStack
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from starlette.background import BackgroundTask
 
 from app.api.deps import RBACChecker, get_current_user
-from app.core.database import get_db
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal, get_db
 from app.models import (
     Agent,
+    ExecutionKind,
+    ExecutionPriority,
     ExecutionStatus,
     Pipeline,
     PipelineExecution,
     PipelineStatus,
     PipelineStep,
+    RetentionArchive,
     User,
 )
 from app.services.audit import AuditLogger
+from app.services.blob_store import BlobError, BlobNotFoundError, blob_store
+from app.services.cancellation import execution_cancellation
+from app.services.pipeline_dispatch import dispatch_batch, dispatch_execution
+from app.services.pipeline_executor import PipelineExecutionError, StepResult, pipeline_executor
+from app.services.pipeline_plan import ExecutionPlan, PlanCompilationError, plan_cache
+from app.services.plan_explain import explain_plan
+from app.services.progress import execution_channel, execution_progress, pipeline_channel
+from app.services.retention import retention_service
+from app.services.scheduler import AdmissionError, check_admission
+from app.services.step_stats import step_statistics
+from app.services.step_trace import step_latencies
+
+settings = get_settings()
 
 router = APIRouter()
 
@@ -31,12 +53,14 @@ class PipelineStepCreate(BaseModel):
     agent_id: int
     order: int
     config: dict = {}
+    depends_on: Optional[List[int]] = None
 
 
 class PipelineCreate(BaseModel):
     name: str
     description: Optional[str] = None
     config: dict = {}
+    retention_days: Optional[int] = None
 
 
 class PipelineUpdate(BaseModel):
@@ -44,6 +68,7 @@ class PipelineUpdate(BaseModel):
     description: Optional[str] = None
     status: Optional[PipelineStatus] = None
     config: Optional[dict] = None
+    retention_days: Optional[int] = None
 
 
 class PipelineStepResponse(BaseModel):
@@ -51,6 +76,7 @@ class PipelineStepResponse(BaseModel):
     agent_id: int
     order: int
     config: dict
+    depends_on: Optional[List[int]] = None
 
     class Config:
         from_attributes = True
@@ -62,6 +88,7 @@ class PipelineResponse(BaseModel):
     description: Optional[str]
     status: PipelineStatus
     config: dict
+    retention_days: Optional[int] = None
     steps: List[PipelineStepResponse] = []
 
     class Config:
@@ -70,22 +97,161 @@ class PipelineResponse(BaseModel):
 
 class PipelineExecuteRequest(BaseModel):
     input_data: dict
+    priority: ExecutionPriority = ExecutionPriority.INTERACTIVE
+
+
+class PipelineBatchExecuteRequest(BaseModel):
+    records: List[dict]
+    priority: ExecutionPriority = ExecutionPriority.BATCH
+
+
+class BatchRecordStatus(BaseModel):
+    index: int
+    execution_id: int
+    status: ExecutionStatus
+
+
+class PipelineBatchExecutionResponse(BaseModel):
+    pipeline_id: int
+    records: List[BatchRecordStatus]
 
 
 class PipelineExecutionResponse(BaseModel):
     id: int
     pipeline_id: int
     status: ExecutionStatus
+    priority: ExecutionPriority
+    kind: ExecutionKind = ExecutionKind.RECORD
     input_data: Optional[dict]
     output_data: Optional[dict]
     error_message: Optional[str]
     started_at: Optional[datetime]
     completed_at: Optional[datetime]
+    archived: bool = False
 
     class Config:
         from_attributes = True
 
 
+class RetentionArchiveResponse(BaseModel):
+    id: int
+    kind: str
+    pipeline_id: Optional[int]
+    partition_date: date
+    path: str
+    first_id: int
+    last_id: int
+    rows: int
+    status_counts: Optional[Dict[str, int]]
+    oldest_at: datetime
+    newest_at: datetime
+    size_bytes: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class StepStatisticsResponse(BaseModel):
+    calls: int
+    records: int
+    mean_call_seconds: float
+    mean_batch_size: float
+    records_per_second: Optional[float]
+    seconds_per_call: float
+    seconds_per_record: float
+
+
+class FusedStepResponse(BaseModel):
+    step_id: int
+    order: int
+    agent_name: str
+    agent_class: str
+    registry_name: str
+    config: dict
+
+
+class ExplainStepResponse(FusedStepResponse):
+    depends_on: List[int]
+    sink: bool
+    timeout_seconds: Optional[float]
+    runs_in: str
+    cached: bool
+    copy_on_write: bool
+    concurrency_limit: Optional[int]
+    fused_steps: List[FusedStepResponse]
+    statistics: Optional[StepStatisticsResponse]
+    estimated_seconds: Optional[float]
+
+
+class PipelineExplainResponse(BaseModel):
+    pipeline_id: int
+    version: datetime
+    status: PipelineStatus
+    is_chain: bool
+    fusion: bool
+    records: int
+    batch_size: int
+    steps: List[ExplainStepResponse]
+    sinks: List[int]
+    estimated_seconds: float
+    unestimated_steps: List[int]
+
+
+class StepLatencyResponse(BaseModel):
+    step_id: int
+    agent: str
+    runs: int
+    records: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    cache_hits: int
+    errors: int
+    input_bytes: Optional[int]
+    output_bytes: Optional[int]
+
+
+async def get_executable_plan(db: AsyncSession, pipeline_id: int) -> ExecutionPlan:
+    """Get the compiled plan of an active pipeline, raising HTTP errors otherwise."""
+    # Cached plans skip loading the pipeline, its steps and agents
+    try:
+        plan = await plan_cache.get_or_compile(db, pipeline_id)
+    except PlanCompilationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    if not plan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pipeline not found",
+        )
+
+    if plan.status != PipelineStatus.ACTIVE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pipeline is not active",
+        )
+
+    return plan
+
+
+async def admit_executions(
+    db: AsyncSession, priority: ExecutionPriority, user_id: int, records: int = 1
+):
+    """Apply admission control, answering 429 when too much work is pending."""
+    try:
+        await check_admission(db, priority, user_id, records)
+    except AdmissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+        )
+
+
 @router.get("/", response_model=List[PipelineResponse])
 async def list_pipelines(
     skip: int = 0,
@@ -122,6 +288,7 @@ async def create_pipeline(
         name=pipeline_data.name,
         description=pipeline_data.description,
         config=pipeline_data.config,
+        retention_days=pipeline_data.retention_days,
         status=PipelineStatus.DRAFT,
     )
 
@@ -164,6 +331,61 @@ async def get_pipeline(
     return pipeline
 
 
+@router.get("/{pipeline_id}/explain", response_model=PipelineExplainResponse)
+async def explain_pipeline(
+    pipeline_id: int,
+    records: int = Query(1, ge=0),
+    batch_size: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(RBACChecker("pipeline", "read")),
+):
+    """
+    Show the execution plan of a pipeline with estimated costs.
+
+    Estimates come from the recent calls of steps with the same agent and
+    config, across all executions.
+    """
+    try:
+        plan = await plan_cache.get_or_compile(db, pipeline_id)
+    except PlanCompilationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    if not plan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pipeline not found",
+        )
+
+    return await explain_plan(plan, pipeline_executor, step_statistics, records, batch_size)
+
+
+@router.get("/{pipeline_id}/steps/latency", response_model=List[StepLatencyResponse])
+async def get_step_latencies(
+    pipeline_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(RBACChecker("pipeline", "read")),
+):
+    """
+    Get step latency percentiles from the step traces of a pipeline.
+
+    The range defaults to the 24 hours before end, and end to now.
+    """
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end",
+        )
+
+    return await step_latencies(db, pipeline_id, start, end)
+
+
 @router.put("/{pipeline_id}", response_model=PipelineResponse)
 async def update_pipeline(
     pipeline_id: int,
@@ -189,6 +411,7 @@ async def update_pipeline(
 
     await db.commit()
     await db.refresh(pipeline)
+    plan_cache.invalidate(pipeline.id)
 
     # Audit log
     await AuditLogger.log_update(
@@ -234,6 +457,7 @@ async def delete_pipeline(
 
     await db.delete(pipeline)
     await db.commit()
+    plan_cache.invalidate(pipeline_id)
 
     return None
 
@@ -267,22 +491,43 @@ async def add_pipeline_step(
             detail="Agent not found",
         )
 
+    # Verify dependencies are steps of the same pipeline
+    if step_data.depends_on:
+        result = await db.execute(
+            select(PipelineStep.id).where(
+                PipelineStep.pipeline_id == pipeline_id,
+                PipelineStep.id.in_(step_data.depends_on),
+            )
+        )
+        missing = set(step_data.depends_on) - set(result.scalars().all())
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown dependency steps: {sorted(missing)}",
+            )
+
     # Create step
     step = PipelineStep(
         pipeline_id=pipeline_id,
         agent_id=step_data.agent_id,
         order=step_data.order,
         config=step_data.config,
+        depends_on=step_data.depends_on,
     )
 
     db.add(step)
     await db.commit()
     await db.refresh(step)
+    plan_cache.invalidate(pipeline_id)
 
     return step
 
 
-@router.post("/{pipeline_id}/execute", response_model=PipelineExecutionResponse)
+@router.post(
+    "/{pipeline_id}/execute",
+    response_model=PipelineExecutionResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def execute_pipeline(
     pipeline_id: int,
     execution_data: PipelineExecuteRequest,
@@ -290,47 +535,488 @@ async def execute_pipeline(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(RBACChecker("pipeline", "execute")),
 ):
-    """Execute a pipeline."""
-    # Get pipeline with steps
-    result = await db.execute(
-        select(Pipeline).options(selectinload(Pipeline.steps)).where(Pipeline.id == pipeline_id)
+    """Queue a pipeline execution and return immediately."""
+    plan = await get_executable_plan(db, pipeline_id)
+    # Offloaded before admission, which holds its locks until the commit
+    input_data = await blob_store.offload(execution_data.input_data)
+    await admit_executions(db, execution_data.priority, current_user.id)
+
+    # Create execution record
+    execution = PipelineExecution(
+        pipeline_id=pipeline_id,
+        status=ExecutionStatus.PENDING,
+        priority=execution_data.priority,
+        submitted_by=current_user.id,
+        input_data=input_data,
+        started_at=datetime.utcnow(),
     )
-    pipeline = result.scalar_one_or_none()
 
-    if not pipeline:
+    db.add(execution)
+    await db.commit()
+
+    # Run steps in the background pool or on the worker pool
+    await dispatch_execution(
+        plan,
+        execution.id,
+        execution_data.input_data,
+        priority=execution_data.priority,
+        user_id=current_user.id,
+    )
+
+    # Audit log
+    await AuditLogger.log(
+        db=db,
+        user_id=current_user.id,
+        action="execute",
+        resource_type="pipeline",
+        resource_id=pipeline_id,
+        details={"execution_id": execution.id},
+        ip_address=request.client.host,
+        user_agent=request.headers.get("user-agent"),
+    )
+
+    return execution
+
+
+@router.post(
+    "/{pipeline_id}/execute-batch",
+    response_model=PipelineBatchExecutionResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def execute_pipeline_batch(
+    pipeline_id: int,
+    batch_data: PipelineBatchExecuteRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(RBACChecker("pipeline", "execute")),
+):
+    """Queue one execution per input record and run them as a single batch."""
+    if not batch_data.records:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pipeline not found",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Batch contains no records",
         )
 
-    if pipeline.status != PipelineStatus.ACTIVE:
+    if len(batch_data.records) > settings.max_batch_size:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Pipeline is not active",
+            detail=f"Batch exceeds the maximum of {settings.max_batch_size} records",
         )
 
+    plan = await get_executable_plan(db, pipeline_id)
+    # Offloaded before admission, which holds its locks until the commit
+    inputs = await asyncio.gather(*(blob_store.offload(record) for record in batch_data.records))
+    await admit_executions(db, batch_data.priority, current_user.id, len(batch_data.records))
+
+    # Create all execution records with one multi-row insert
+    started_at = datetime.utcnow()
+    result = await db.execute(
+        insert(PipelineExecution).returning(PipelineExecution.id, sort_by_parameter_order=True),
+        [
+            {
+                "pipeline_id": pipeline_id,
+                "status": ExecutionStatus.PENDING,
+                "priority": batch_data.priority,
+                "submitted_by": current_user.id,
+                "input_data": input_data,
+                "started_at": started_at,
+            }
+            for input_data in inputs
+        ],
+    )
+    execution_ids = result.scalars().all()
+    await db.commit()
+
+    # Run the whole batch in the background pool or on the worker pool
+    await dispatch_batch(
+        plan,
+        execution_ids,
+        batch_data.records,
+        priority=batch_data.priority,
+        user_id=current_user.id,
+    )
+
+    # Audit log, once per batch
+    await AuditLogger.log(
+        db=db,
+        user_id=current_user.id,
+        action="execute_batch",
+        resource_type="pipeline",
+        resource_id=pipeline_id,
+        details={
+            "records": len(execution_ids),
+            "first_execution_id": execution_ids[0],
+            "last_execution_id": execution_ids[-1],
+        },
+        ip_address=request.client.host,
+        user_agent=request.headers.get("user-agent"),
+    )
+
+    return PipelineBatchExecutionResponse(
+        pipeline_id=pipeline_id,
+        records=[
+            BatchRecordStatus(
+                index=index, execution_id=execution_id, status=ExecutionStatus.PENDING
+            )
+            for index, execution_id in enumerate(execution_ids)
+        ],
+    )
+
+
+def _parse_ndjson_line(line: bytes) -> StepResult:
+    """Parse one NDJSON line, turning bad lines into failed records."""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return PipelineExecutionError(f"Invalid JSON record: {e}")
+
+    if not isinstance(record, dict):
+        return PipelineExecutionError("Record must be a JSON object")
+    return record
+
+
+async def _read_ndjson(
+    request: Request, max_line_bytes: int = settings.stream_max_line_bytes
+) -> AsyncIterator[StepResult]:
+    """
+    Parse an NDJSON request body incrementally.
+
+    A line longer than max_line_bytes fails as a record of its own and the
+    rest of it is discarded as it arrives, so memory stays bounded. The
+    response has already started by then, so it cannot fail the request.
+    """
+    too_large = f"Record exceeds the {max_line_bytes} byte line limit"
+    buffer = bytearray()
+    scanned = 0  # Bytes of the buffer known to hold no newline
+    skipping = False  # Discarding the rest of a line over the limit
+    async for chunk in request.stream():
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", max(start, scanned))) >= 0:
+            if skipping:
+                skipping = False
+            elif end - start > max_line_bytes:
+                yield PipelineExecutionError(too_large)
+            elif buffer[start:end].strip():
+                yield _parse_ndjson_line(bytes(buffer[start:end]))
+            start = end + 1
+        del buffer[:start]
+        scanned = len(buffer)
+
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield PipelineExecutionError(too_large)
+                skipping = True
+            buffer.clear()
+            scanned = 0
+
+    if buffer.strip() and not skipping:
+        yield _parse_ndjson_line(bytes(buffer))
+
+
+async def _write_ndjson(results: AsyncIterator[StepResult]) -> AsyncIterator[str]:
+    """Serialize per-record results as NDJSON lines."""
+    index = 0
+    async for result in results:
+        if isinstance(result, Exception):
+            line: Any = {"index": index, "status": "failed", "error": str(result)}
+        else:
+            line = {"index": index, "status": "success", "output": result}
+        yield json.dumps(line, default=str) + "\n"
+        index += 1
+
+
+@router.post("/{pipeline_id}/execute-stream")
+async def execute_pipeline_stream(
+    pipeline_id: int,
+    request: Request,
+    priority: ExecutionPriority = ExecutionPriority.BATCH,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(RBACChecker("pipeline", "execute")),
+):
+    """
+    Stream NDJSON records through a pipeline.
+
+    The request body is read incrementally and results are streamed back as
+    NDJSON, one line per input record, so memory stays flat for large inputs.
+    """
+    plan = await get_executable_plan(db, pipeline_id)
+    await admit_executions(db, priority, current_user.id)
+
     # Create execution record
     execution = PipelineExecution(
         pipeline_id=pipeline_id,
         status=ExecutionStatus.PENDING,
-        input_data=execution_data.input_data,
+        priority=priority,
+        submitted_by=current_user.id,
+        kind=ExecutionKind.STREAM,
         started_at=datetime.utcnow(),
     )
 
     db.add(execution)
     await db.commit()
+
+    # Audit log
+    await AuditLogger.log(
+        db=db,
+        user_id=current_user.id,
+        action="execute_stream",
+        resource_type="pipeline",
+        resource_id=pipeline_id,
+        details={"execution_id": execution.id},
+        ip_address=request.client.host,
+        user_agent=request.headers.get("user-agent"),
+    )
+
+    results = pipeline_executor.stream(
+        plan, execution.id, _read_ndjson(request), priority=priority, user_id=current_user.id
+    )
+    return StreamingResponse(
+        _write_ndjson(results),
+        media_type="application/x-ndjson",
+        headers={"X-Execution-Id": str(execution.id)},
+    )
+
+
+def _format_sse(event: Optional[Dict[str, Any]]) -> str:
+    """Format a progress event as a Server-Sent Event, or a heartbeat comment for None."""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def _finished_event(execution: PipelineExecution) -> Optional[Dict[str, Any]]:
+    """The execution-finished event of a finished execution, or None while it runs."""
+    if execution.status in (ExecutionStatus.PENDING, ExecutionStatus.RUNNING):
+        return None
+    return {
+        "event": "execution-finished",
+        "pipeline_id": execution.pipeline_id,
+        "execution_id": execution.id,
+        "status": execution.status.value,
+        "error_message": execution.error_message,
+    }
+
+
+async def _execution_events(
+    execution_id: int,
+    events: AsyncIterator[Optional[Dict[str, Any]]],
+    subscription: AsyncExitStack,
+) -> AsyncIterator[str]:
+    """Stream the events of one running execution until it finishes."""
+    try:
+        async for event in events:
+            yield _format_sse(event)
+            if event is not None and event["event"] == "execution-finished":
+                return
+
+        # Without progress events, poll the status until the execution finishes
+        while True:
+            await asyncio.sleep(settings.progress_heartbeat_seconds)
+            async with AsyncSessionLocal() as db:
+                execution = await db.get(PipelineExecution, execution_id)
+            if execution is None:
+                return
+            finished = _finished_event(execution)
+            yield _format_sse(finished)
+            if finished is not None:
+                return
+    finally:
+        await subscription.aclose()
+
+
+async def _pipeline_events(pipeline_id: int) -> AsyncIterator[str]:
+    """Stream the events of every execution of a pipeline until the client leaves."""
+    async with execution_progress.subscribe(
+        pipeline_channel(pipeline_id), settings.progress_heartbeat_seconds
+    ) as events:
+        async for event in events:
+            yield _format_sse(event)
+
+
+async def load_payload(value: Any) -> Any:
+    """Fetch a stored payload, following its blob reference if it was offloaded."""
+    try:
+        return await blob_store.load(value)
+    except BlobNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Execution payload is no longer stored",
+        )
+    except BlobError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Execution payload cannot be read: {e}",
+        )
+
+
+@router.get("/executions/{execution_id}", response_model=PipelineExecutionResponse)
+async def get_pipeline_execution(
+    execution_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(RBACChecker("pipeline", "read")),
+):
+    """
+    Get an execution with its full input and output.
+
+    Listings return offloaded payloads as blob references; they are
+    fetched from the blob store here. Executions moved out of the database
+    by retention are read back from their archive file.
+    """
+    execution = await db.get(PipelineExecution, execution_id)
+
+    if execution:
+        response = PipelineExecutionResponse.model_validate(execution)
+    else:
+        archived = await retention_service.find(db, "execution", execution_id)
+        if archived is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Execution not found",
+            )
+        response = PipelineExecutionResponse.model_validate({**archived, "archived": True})
+
+    response.input_data = await load_payload(response.input_data)
+    response.output_data = await load_payload(response.output_data)
+    return response
+
+
+@router.get("/executions/{execution_id}/events")
+async def stream_execution_events(
+    execution_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(RBACChecker("pipeline", "read")),
+):
+    """
+    Stream step-started, step-finished and execution-finished events of an execution.
+
+    The response is a Server-Sent Events stream that ends after the
+    execution-finished event, so clients no longer need to poll.
+    """
+    subscription = AsyncExitStack()
+    events = await subscription.enter_async_context(
+        execution_progress.subscribe(
+            execution_channel(execution_id), settings.progress_heartbeat_seconds
+        )
+    )
+    try:
+        # Read the status only once subscribed, so a finish in between is not missed
+        execution = await db.get(PipelineExecution, execution_id)
+        if not execution:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Execution not found",
+            )
+        finished = _finished_event(execution)
+        # Release the database connection for the lifetime of the stream
+        await db.close()
+    except BaseException:
+        await subscription.aclose()
+        raise
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if finished is not None:
+        await subscription.aclose()
+        return StreamingResponse(
+            iter([_format_sse(finished)]), media_type="text/event-stream", headers=headers
+        )
+    return StreamingResponse(
+        _execution_events(execution_id, events, subscription),
+        media_type="text/event-stream",
+        headers=headers,
+        # Also unsubscribes when the client leaves before the stream starts
+        background=BackgroundTask(subscription.aclose),
+    )
+
+
+@router.get("/{pipeline_id}/events")
+async def stream_pipeline_events(
+    pipeline_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(RBACChecker("pipeline", "read")),
+):
+    """Stream the progress events of every execution of a pipeline as Server-Sent Events."""
+    pipeline = await db.get(Pipeline, pipeline_id)
+
+    if not pipeline:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pipeline not found",
+        )
+
+    # Release the database connection for the lifetime of the stream
+    await db.close()
+
+    return StreamingResponse(
+        _pipeline_events(pipeline_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/executions/{execution_id}/resume",
+    response_model=PipelineExecutionResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def resume_pipeline_execution(
+    execution_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(RBACChecker("pipeline", "execute")),
+):
+    """Rerun a failed execution from its first failed step, reusing checkpointed outputs."""
+    execution = await db.get(PipelineExecution, execution_id)
+
+    if not execution:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Execution not found",
+        )
+
+    if execution.kind == ExecutionKind.STREAM:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Streamed executions cannot be resumed",
+        )
+
+    input_data = await load_payload(execution.input_data)
+    plan = await get_executable_plan(db, execution.pipeline_id)
+    await admit_executions(db, execution.priority, current_user.id)
+
+    # Claim the execution so concurrent resume requests cannot both start it
+    result = await db.execute(
+        update(PipelineExecution)
+        .where(
+            PipelineExecution.id == execution_id,
+            PipelineExecution.status.in_([ExecutionStatus.FAILED, ExecutionStatus.CANCELLED]),
+        )
+        .values(status=ExecutionStatus.PENDING, error_message=None, completed_at=None)
+    )
+    if result.rowcount != 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only failed or cancelled executions can be resumed",
+        )
+    await db.commit()
     await db.refresh(execution)
 
-    # TODO: Execute pipeline steps asynchronously via Celery
-    # For now, we'll just mark it as pending
+    await dispatch_execution(
+        plan,
+        execution.id,
+        input_data or {},
+        resume=True,
+        priority=execution.priority,
+        user_id=execution.submitted_by,
+    )
 
     # Audit log
     await AuditLogger.log(
         db=db,
         user_id=current_user.id,
-        action="execute",
+        action="resume",
         resource_type="pipeline",
-        resource_id=pipeline_id,
+        resource_id=execution.pipeline_id,
         details={"execution_id": execution.id},
         ip_address=request.client.host,
         user_agent=request.headers.get("user-agent"),
@@ -339,6 +1025,74 @@ async def execute_pipeline(
     return execution
 
 
+@router.post(
+    "/executions/{execution_id}/cancel",
+    response_model=PipelineExecutionResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def cancel_pipeline_execution(
+    execution_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(RBACChecker("pipeline", "execute")),
+):
+    """
+    Cancel a pending or running execution.
+
+    Pending executions are cancelled right away. Running ones are cancelled
+    at their next await point by whichever node runs them, which records the
+    outputs of the steps that completed. CPU-bound work already running in
+    the process pool finishes in its worker process before its slot is freed.
+    """
+    execution = await db.get(PipelineExecution, execution_id)
+
+    if not execution:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Execution not found",
+        )
+
+    if execution.status not in (ExecutionStatus.PENDING, ExecutionStatus.RUNNING):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only pending or running executions can be cancelled",
+        )
+
+    # A pending execution is never claimed by a worker once it is cancelled
+    await db.execute(
+        update(PipelineExecution)
+        .where(
+            PipelineExecution.id == execution_id,
+            PipelineExecution.status == ExecutionStatus.PENDING,
+        )
+        .values(
+            status=ExecutionStatus.CANCELLED,
+            error_message="Execution was cancelled",
+            completed_at=datetime.utcnow(),
+        )
+    )
+    await db.commit()
+
+    # Stop the task here, and on every other node in case it runs elsewhere
+    pipeline_executor.cancel(execution_id)
+    await execution_cancellation.broadcast([execution_id])
+
+    # Audit log
+    await AuditLogger.log(
+        db=db,
+        user_id=current_user.id,
+        action="cancel",
+        resource_type="pipeline",
+        resource_id=execution.pipeline_id,
+        details={"execution_id": execution.id},
+        ip_address=request.client.host,
+        user_agent=request.headers.get("user-agent"),
+    )
+
+    await db.refresh(execution)
+    return execution
+
+
 @router.get("/{pipeline_id}/executions", response_model=List[PipelineExecutionResponse])
 async def list_pipeline_executions(
     pipeline_id: int,
@@ -347,7 +1101,12 @@ async def list_pipeline_executions(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(RBACChecker("pipeline", "read")),
 ):
-    """List executions for a pipeline."""
+    """
+    List executions for a pipeline, with payloads as stored.
+
+    Offloaded payloads are returned as blob references, and payloads using
+    the reserved "$blob" or "$literal" keys wrapped in {"$literal": ...}.
+    """
     result = await db.execute(
         select(PipelineExecution)
         .where(PipelineExecution.pipeline_id == pipeline_id)
@@ -357,3 +1116,22 @@ async def list_pipeline_executions(
     )
     executions = result.scalars().all()
     return executions
+
+
+@router.get("/{pipeline_id}/archives", response_model=List[RetentionArchiveResponse])
+async def list_pipeline_archives(
+    pipeline_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(RBACChecker("pipeline", "read")),
+):
+    """List the archive files holding the executions of a pipeline removed by retention."""
+    result = await db.execute(
+        select(RetentionArchive)
+        .where(RetentionArchive.pipeline_id == pipeline_id, RetentionArchive.kind == "execution")
+        .offset(skip)
+        .limit(limit)
+        .order_by(RetentionArchive.partition_date.desc(), RetentionArchive.id.desc())
+    )
+    return result.scalars().all()
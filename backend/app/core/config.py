@@ -3,11 +3,21 @@ Core configuration module for the Interface Agent application.
 """
 
 from functools import lru_cache
-from typing import List
+from typing import Any, Dict, List
 
 from pydantic_settings import BaseSettings
 
 
+def parse_pairs(value: str, cast=int) -> Dict[str, Any]:
+    """Parse a "name=value,name=value" setting into a dict."""
+    pairs = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, raw = item.split("=", 1)
+            pairs[name.strip()] = cast(raw.strip())
+    return pairs
+
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
@@ -70,6 +80,83 @@ class Settings(BaseSettings):
     # Celery
     celery_broker_url: str
     celery_result_backend: str
+    celery_task_always_eager: bool = False
+    celery_partitions: int = 4
+    execution_backend: str = "local"  # local, celery
+
+    # Pipeline Execution
+    executor_max_concurrency: int = 10
+    plan_cache_ttl_seconds: int = 300
+    max_batch_size: int = 10000
+    stream_window_size: int = 100
+    stream_max_line_bytes: int = 1048576
+    process_pool_size: int = 4
+    process_pool_max_queue: int = 100
+    process_pool_max_agents: int = 64
+    step_timeout_seconds: float = 60.0
+    execution_checkpoints: bool = True
+    agent_default_concurrency: int = 100
+    agent_concurrency_limits: str = ""  # e.g. "validator=50,analyzer=20"
+
+    @property
+    def agent_concurrency_limits_map(self) -> Dict[str, int]:
+        return parse_pairs(self.agent_concurrency_limits)
+
+    # Progress Events
+    progress_events_enabled: bool = True
+    progress_queue_size: int = 1000
+    progress_heartbeat_seconds: int = 15
+
+    # Scheduling
+    scheduler_weights: str = "interactive=8,batch=2,backfill=1"
+    scheduler_max_pending: str = "interactive=1000,batch=100000,backfill=100000"
+    scheduler_max_pending_per_user: int = 100000
+
+    @property
+    def scheduler_weights_map(self) -> Dict[str, float]:
+        return parse_pairs(self.scheduler_weights, float)
+
+    @property
+    def scheduler_max_pending_map(self) -> Dict[str, int]:
+        return parse_pairs(self.scheduler_max_pending)
+
+    # Step Result Cache
+    step_cache_enabled: bool = True
+    step_cache_ttl_seconds: int = 3600
+    step_cache_local_ttl_seconds: int = 60
+    step_cache_local_max_entries: int = 10000
+    step_cache_max_value_bytes: int = 65536
+
+    # Step Statistics
+    step_stats_enabled: bool = True
+    step_stats_window: int = 200
+    step_stats_flush_seconds: float = 5.0
+    step_stats_ttl_seconds: int = 604800
+
+    # Step Traces
+    step_traces_enabled: bool = True
+    step_trace_batch_size: int = 500
+    step_trace_flush_seconds: float = 1.0
+    step_trace_queue_size: int = 10000
+    step_trace_size_sample: int = 16
+
+    # Streaming Sketches
+    analyzer_sketch_flush_seconds: float = 10.0
+    analyzer_sketch_ttl_seconds: int = 2592000
+    analyzer_sketch_max_fields: int = 64
+
+    # Blob Store
+    blob_offload_threshold_bytes: int = 65536
+    blob_store_backend: str = "local"
+    blob_store_path: str = "./data/blobs"
+
+    # Retention
+    retention_enabled: bool = True
+    execution_retention_days: int = 90
+    event_retention_days: int = 30
+    retention_batch_size: int = 1000
+    retention_interval_seconds: int = 3600
+    retention_archive_path: str = "./data/archive"
 
     # Autoscaling
     min_workers: int = 2
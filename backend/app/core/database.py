@@ -2,30 +2,51 @@
 Database connection and session management.
 """
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base
 
 from app.core.config import get_settings
 
 settings = get_settings()
 
+
+def create_engine() -> AsyncEngine:
+    """
+    Create an async engine with the configured pool.
+
+    Pooled connections belong to the event loop that opened them, so every
+    event loop needs an engine of its own.
+    """
+    return create_async_engine(
+        settings.database_url,
+        echo=settings.debug,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_pre_ping=True,
+    )
+
+
+def create_session_factory(bind: AsyncEngine) -> async_sessionmaker:
+    """Create a session factory for an engine."""
+    return async_sessionmaker(
+        bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
 # Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_size=settings.database_pool_size,
-    max_overflow=settings.database_max_overflow,
-    pool_pre_ping=True,
-)
+engine = create_engine()
 
 # Create async session factory
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+AsyncSessionLocal = create_session_factory(engine)
 
 # Base class for models
 Base = declarative_base()
@@ -46,6 +67,7 @@ async def get_db() -> AsyncSession:
 
 async def init_db():
     """Initialize database - create all tables."""
+    # Only missing tables are created; run "alembic upgrade head" for new columns
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
@@ -0,0 +1,109 @@
+"""
+Prometheus metrics exported on the /metrics mount.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Agent process pool
+process_pool_size = Gauge(
+    "agent_process_pool_size",
+    "Number of worker processes running CPU-bound agents",
+)
+process_pool_in_flight = Gauge(
+    "agent_process_pool_in_flight",
+    "Agent calls submitted to the process pool and not finished yet",
+)
+process_pool_queue_depth = Gauge(
+    "agent_process_pool_queue_depth",
+    "Agent calls waiting for room in the process pool queue",
+)
+
+# Concurrency limits
+concurrency_queue_wait_seconds = Histogram(
+    "concurrency_queue_wait_seconds",
+    "Time spent waiting for a concurrency slot",
+    ["limiter", "key"],
+)
+concurrency_queued = Gauge(
+    "concurrency_queued",
+    "Callers waiting for a concurrency slot",
+    ["limiter", "key"],
+)
+concurrency_in_use = Gauge(
+    "concurrency_in_use",
+    "Concurrency slots currently held",
+    ["limiter", "key"],
+)
+step_timeouts_total = Counter(
+    "pipeline_step_timeouts_total",
+    "Pipeline steps that exceeded their timeout",
+    ["agent"],
+)
+
+# Step result cache
+step_cache_hits_total = Counter(
+    "step_cache_hits_total",
+    "Step outputs served from the result cache",
+    ["tier"],
+)
+step_cache_misses_total = Counter(
+    "step_cache_misses_total",
+    "Step outputs not found in the result cache",
+)
+step_cache_errors_total = Counter(
+    "step_cache_errors_total",
+    "Result cache operations that failed and were skipped",
+)
+step_cache_local_entries = Gauge(
+    "step_cache_local_entries",
+    "Entries in the in-process step result cache",
+)
+
+# Scheduler
+scheduler_queue_depth = Gauge(
+    "scheduler_queue_depth",
+    "Executions waiting for a slot, per priority class",
+    ["priority"],
+)
+scheduler_queue_wait_seconds = Histogram(
+    "scheduler_queue_wait_seconds",
+    "Time executions waited for a slot, per priority class",
+    ["priority"],
+)
+scheduler_running = Gauge(
+    "scheduler_running",
+    "Executions holding a slot",
+)
+scheduler_rejections_total = Counter(
+    "scheduler_rejections_total",
+    "Executions refused by admission control, per priority class",
+    ["priority"],
+)
+
+# Progress events
+progress_events_published_total = Counter(
+    "progress_events_published_total",
+    "Execution progress events sent to Redis",
+)
+progress_events_dropped_total = Counter(
+    "progress_events_dropped_total",
+    "Execution progress events dropped because a queue was full or Redis failed",
+)
+
+# Cancellation
+executions_cancelled_total = Counter(
+    "pipeline_executions_cancelled_total",
+    "Pipeline executions recorded as cancelled; process pool work they started may still run",
+)
+
+# Step traces
+# Labelled by agent only, to bound the series; per-step latency is in the step_trace table
+step_duration_seconds = Histogram(
+    "pipeline_step_duration_seconds",
+    "Time a step took over a batch of records",
+    ["agent"],
+)
+step_traces_dropped_total = Counter(
+    "pipeline_step_traces_dropped_total",
+    "Step traces dropped because the write queue was full or the write failed",
+)
@@ -0,0 +1,74 @@
+"""
+Cheap size estimates of JSON-like values.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Sequence
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the size of a value encoded as compact JSON, without encoding it.
+
+    Strings count one byte per character plus quotes, so escapes and
+    multi-byte characters are undercounted.
+
+    Args:
+        value: Dicts, Records, lists and scalars
+
+    Returns:
+        Estimated size in bytes
+    """
+    size = 0
+    stack = [value]
+    pop, extend = stack.pop, stack.extend
+    while stack:
+        item = pop()
+        # Exact types first, as they are most values and cheapest to test
+        kind = type(item)
+        if kind is str:
+            size += len(item) + 2
+        elif kind is int or kind is float:
+            size += len(repr(item))
+        elif kind is dict or isinstance(item, Mapping):
+            # Braces, quoted keys, a colon per entry and commas between entries
+            size += 2 + max(4 * len(item) - 1, 0) + sum(map(len, map(str, item.keys())))
+            extend(item.values())
+        elif kind is list or kind is tuple:
+            size += 2 + max(len(item) - 1, 0)
+            extend(item)
+        elif item is None or item is True:
+            size += 4
+        elif item is False:
+            size += 5
+        elif isinstance(item, str):
+            size += len(item) + 2
+        elif isinstance(item, (int, float)):
+            size += len(repr(item))
+        elif isinstance(item, (list, tuple)):
+            size += 2 + max(len(item) - 1, 0)
+            extend(item)
+        else:
+            size += len(str(item)) + 2
+    return size
+
+
+def estimate_total_size(values: Sequence[Any], sample: int) -> int:
+    """
+    Estimate the total size of many values from an evenly spread sample.
+
+    Args:
+        values: Values to size
+        sample: Most values to look at; 0 or less looks at all of them
+
+    Returns:
+        Estimated total size in bytes
+    """
+    if not values:
+        return 0
+    if sample <= 0 or len(values) <= sample:
+        return sum(estimate_size(value) for value in values)
+
+    step = len(values) / sample
+    sampled = sum(estimate_size(values[int(index * step)]) for index in range(sample))
+    return round(sampled * len(values) / sample)
@@ -12,7 +12,14 @@ from prometheus_client import make_asgi_app
 from app.api import admin, agents, audit_logs, auth, pipelines
 from app.core.config import get_settings
 from app.core.database import close_db, init_db
+from app.services.agent_process_pool import agent_process_pool
+from app.services.cancellation import execution_cancellation
 from app.services.event_bus import event_bus
+from app.services.pipeline_executor import pipeline_executor
+from app.services.pipeline_plan import plan_cache
+from app.services.progress import execution_progress
+from app.services.step_stats import step_statistics
+from app.services.step_trace import step_trace_writer
 
 settings = get_settings()
 
@@ -23,8 +30,17 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     await event_bus.connect()
+    execution_cancellation.start(pipeline_executor.cancel)
+    plan_cache.start()
     yield
     # Shutdown
+    await execution_cancellation.stop()
+    await plan_cache.stop()
+    await pipeline_executor.shutdown()
+    await step_statistics.close()
+    await step_trace_writer.close()
+    agent_process_pool.shutdown()
+    await execution_progress.close()
     await event_bus.disconnect()
     await close_db()
 
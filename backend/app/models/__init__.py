@@ -6,11 +6,17 @@ from app.models.agent import (
     Agent,
     AgentStatus,
     AgentType,
+    ArchiveMember,
+    ExecutionCheckpoint,
+    ExecutionKind,
+    ExecutionPriority,
     ExecutionStatus,
     Pipeline,
     PipelineExecution,
     PipelineStatus,
     PipelineStep,
+    RetentionArchive,
+    StepTrace,
 )
 from app.models.base import BaseModel
 from app.models.event import Anomaly, AuditLog, Escalation, Event, Plugin
@@ -25,10 +31,16 @@ __all__ = [
     "Pipeline",
     "PipelineStep",
     "PipelineExecution",
+    "ExecutionCheckpoint",
+    "StepTrace",
+    "RetentionArchive",
+    "ArchiveMember",
     "AgentStatus",
     "AgentType",
     "PipelineStatus",
     "ExecutionStatus",
+    "ExecutionPriority",
+    "ExecutionKind",
     "Event",
     "AuditLog",
     "Anomaly",
@@ -4,9 +4,9 @@ Agent and Pipeline models.
 
 import enum
 
-from sqlalchemy import JSON, Boolean, Column, DateTime
+from sqlalchemy import JSON, Boolean, Column, Date, DateTime
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy import Float, ForeignKey, Index, Integer, String, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.models.base import BaseModel
@@ -67,6 +67,7 @@ class Pipeline(BaseModel):
     description = Column(String(500))
     status = Column(SQLEnum(PipelineStatus), default=PipelineStatus.DRAFT, nullable=False)
     config = Column(JSON, default={})
+    retention_days = Column(Integer)  # Days executions are kept; null uses the default, 0 forever
 
     # Relationships
     steps = relationship("PipelineStep", back_populates="pipeline", order_by="PipelineStep.order")
@@ -82,6 +83,7 @@ class PipelineStep(BaseModel):
     agent_id = Column(ForeignKey("agent.id"), nullable=False)
     order = Column(Integer, nullable=False)
     config = Column(JSON, default={})  # Step-specific configuration
+    depends_on = Column(JSON)  # Step IDs this step reads from; null chains to the previous step
 
     # Relationships
     pipeline = relationship("Pipeline", back_populates="steps")
@@ -98,13 +100,37 @@ class ExecutionStatus(str, enum.Enum):
     CANCELLED = "cancelled"
 
 
+class ExecutionPriority(str, enum.Enum):
+    """Execution priority class enumeration."""
+
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+    BACKFILL = "backfill"
+
+
+class ExecutionKind(str, enum.Enum):
+    """How an execution receives its input."""
+
+    RECORD = "record"
+    STREAM = "stream"
+
+
 class PipelineExecution(BaseModel):
     """Pipeline execution tracking."""
 
     __tablename__ = "pipeline_execution"
+    __table_args__ = (
+        Index("ix_pipeline_execution_status_priority", "status", "priority"),
+        Index("ix_pipeline_execution_pipeline_created", "pipeline_id", "created_at"),
+    )
 
     pipeline_id = Column(ForeignKey("pipeline.id"), nullable=False)
     status = Column(SQLEnum(ExecutionStatus), default=ExecutionStatus.PENDING, nullable=False)
+    priority = Column(
+        SQLEnum(ExecutionPriority), default=ExecutionPriority.INTERACTIVE, nullable=False
+    )
+    submitted_by = Column(ForeignKey("user.id"), index=True)
+    kind = Column(SQLEnum(ExecutionKind), default=ExecutionKind.RECORD, nullable=False)
     input_data = Column(JSON)
     output_data = Column(JSON)
     error_message = Column(String(1000))
@@ -113,3 +139,82 @@ class PipelineExecution(BaseModel):
 
     # Relationships
     pipeline = relationship("Pipeline", back_populates="executions")
+    checkpoints = relationship(
+        "ExecutionCheckpoint", back_populates="execution", cascade="all, delete-orphan"
+    )
+
+
+class ExecutionCheckpoint(BaseModel):
+    """Output of a completed step, kept so a failed execution can resume after it."""
+
+    __tablename__ = "execution_checkpoint"
+    __table_args__ = (UniqueConstraint("execution_id", "step_id"),)
+
+    execution_id = Column(
+        ForeignKey("pipeline_execution.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    step_id = Column(ForeignKey("pipeline_step.id", ondelete="CASCADE"), nullable=False)
+    fingerprint = Column(String(64), nullable=False)  # Agent and config the output came from
+    output_data = Column(JSON)
+
+    # Relationships
+    execution = relationship("PipelineExecution", back_populates="checkpoints")
+
+
+class StepTrace(BaseModel):
+    """Timing and sizes of one run of a step over a batch of records."""
+
+    __tablename__ = "step_trace"
+    __table_args__ = (Index("ix_step_trace_pipeline_started", "pipeline_id", "started_at"),)
+
+    pipeline_id = Column(ForeignKey("pipeline.id", ondelete="CASCADE"), nullable=False)
+    step_id = Column(ForeignKey("pipeline_step.id", ondelete="CASCADE"), nullable=False)
+    # Traces outlive their executions once those are archived
+    execution_id = Column(ForeignKey("pipeline_execution.id", ondelete="SET NULL"), index=True)
+    agent = Column(String(100), nullable=False)  # Registry name, "fused" for fused steps
+    started_at = Column(DateTime, nullable=False)
+    completed_at = Column(DateTime, nullable=False)
+    duration_ms = Column(Float, nullable=False)
+    records = Column(Integer, nullable=False)
+    input_bytes = Column(Integer)  # Estimated size of the inputs encoded as JSON
+    output_bytes = Column(Integer)
+    cache_hits = Column(Integer, default=0, nullable=False)
+    errors = Column(Integer, default=0, nullable=False)  # Records failed by this step
+    error_message = Column(String(1000))
+
+
+class RetentionArchive(BaseModel):
+    """Summary of one archive file of rows moved out of the database."""
+
+    __tablename__ = "retention_archive"
+    __table_args__ = (
+        Index("ix_retention_archive_kind_ids", "kind", "first_id", "last_id"),
+        Index("ix_retention_archive_pipeline_date", "pipeline_id", "partition_date"),
+    )
+
+    kind = Column(String(20), nullable=False)  # execution, event
+    pipeline_id = Column(ForeignKey("pipeline.id", ondelete="SET NULL"))  # Null for events
+    partition_date = Column(Date, nullable=False)  # Date the archived rows were created on
+    path = Column(String(500), nullable=False)  # Relative to the archive directory
+    first_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    rows = Column(Integer, nullable=False)
+    status_counts = Column(JSON)  # Number of archived rows by status
+    oldest_at = Column(DateTime, nullable=False)
+    newest_at = Column(DateTime, nullable=False)
+    size_bytes = Column(Integer, nullable=False)  # Compressed size of the file
+
+
+class ArchiveMember(BaseModel):
+    """Where one gzip member of an archive file starts and which rows it holds."""
+
+    __tablename__ = "archive_member"
+    __table_args__ = (Index("ix_archive_member_kind_ids", "kind", "first_id", "last_id"),)
+
+    archive_id = Column(
+        ForeignKey("retention_archive.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    kind = Column(String(20), nullable=False)  # execution, event
+    first_id = Column(Integer, nullable=False)  # IDs the rows had in the database
+    last_id = Column(Integer, nullable=False)
+    offset = Column(Integer, nullable=False)  # Byte offset of the member in the file
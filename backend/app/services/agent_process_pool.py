@@ -0,0 +1,162 @@
+"""
+Shared process pool for CPU-bound agents.
+"""
+
+import asyncio
+import hashlib
+import json
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from app.agents.base_agent import BaseAgent
+from app.core import metrics
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Returned by a worker process that has not seen an agent yet
+AGENT_NOT_LOADED = "__agent_not_loaded__"
+
+# Agents built inside a worker process, keyed by agent key, least recently used first
+_worker_agents: "OrderedDict[str, BaseAgent]" = OrderedDict()
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def agent_key(agent: BaseAgent) -> str:
+    """Identify an agent by its class, version and configuration."""
+    agent_class = type(agent)
+    config = json.dumps(agent.config, sort_keys=True, default=str)
+    digest = hashlib.sha256(config.encode()).hexdigest()[:16]
+    return f"{agent_class.__module__}.{agent_class.__qualname__}@{agent.version}:{digest}"
+
+
+def run_in_worker(
+    key: str,
+    records: List[Dict[str, Any]],
+    spec: Optional[Tuple[Type[BaseAgent], Dict[str, Any]]] = None,
+):
+    """
+    Run an agent over a batch inside a worker process.
+
+    The agent class and config are only sent with the first call that reaches
+    a given process; later calls send the key alone and reuse the agent. Each
+    process keeps the process_pool_max_agents most recently used agents; a
+    dropped agent is rebuilt from its spec on its next call.
+
+    Args:
+        key: Agent key from agent_key
+        records: Input records
+        spec: Agent class and config, or None if the process should have them
+
+    Returns:
+        The outputs, or AGENT_NOT_LOADED if spec is needed
+    """
+    global _worker_loop
+
+    agent = _worker_agents.get(key)
+    if agent is None:
+        if spec is None:
+            return AGENT_NOT_LOADED
+        agent_class, config = spec
+        agent = _worker_agents[key] = agent_class(config=config)
+        # Agents of changed configs are never asked for again, so the oldest are dropped
+        while len(_worker_agents) > settings.process_pool_max_agents:
+            _worker_agents.popitem(last=False)
+    else:
+        _worker_agents.move_to_end(key)
+
+    if _worker_loop is None:
+        _worker_loop = asyncio.new_event_loop()
+    return _worker_loop.run_until_complete(agent.execute_batch(records))
+
+
+class AgentProcessPool:
+    """
+    Runs CPU-bound agents in worker processes with a bounded submission queue.
+
+    Every call submitted to the pool holds one of max_queue slots until its
+    worker process is done with it. A caller that is cancelled or times out
+    stops waiting, but a call already running keeps its slot until it ends,
+    so the bound covers all work in the pool.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.process_pool_size,
+        max_queue: int = settings.process_pool_max_queue,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(max_queue)
+        self._keys: "weakref.WeakKeyDictionary[BaseAgent, str]" = weakref.WeakKeyDictionary()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            metrics.process_pool_size.set(self.max_workers)
+        return self._executor
+
+    async def execute_batch(
+        self, agent: BaseAgent, records: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Run agent.execute_batch in the process pool.
+
+        Args:
+            agent: CPU-bound agent
+            records: Input records
+
+        Returns:
+            One output per input record
+        """
+        key = self._keys.get(agent)
+        if key is None:
+            key = self._keys[agent] = agent_key(agent)
+
+        outputs = await self._submit(key, records)
+        if outputs == AGENT_NOT_LOADED:
+            outputs = await self._submit(key, records, (type(agent), dict(agent.config)))
+        return outputs
+
+    async def _submit(self, *args: Any) -> Any:
+        """Call run_in_worker in the pool, holding a slot until the call ends."""
+        metrics.process_pool_queue_depth.inc()
+        try:
+            await self._slots.acquire()
+        finally:
+            metrics.process_pool_queue_depth.dec()
+
+        try:
+            future = self._get_executor().submit(run_in_worker, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        metrics.process_pool_in_flight.inc()
+
+        loop = asyncio.get_running_loop()
+
+        def release(_: Future):
+            # Runs once the call ended, or was cancelled before it started, on any thread
+            metrics.process_pool_in_flight.dec()
+            try:
+                loop.call_soon_threadsafe(self._slots.release)
+            except RuntimeError:
+                pass  # The loop is closed
+
+        future.add_done_callback(release)
+        # Cancelling the wait cancels the call only if it has not started yet
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            metrics.process_pool_size.set(0)
+
+
+# Global agent process pool instance
+agent_process_pool = AgentProcessPool()
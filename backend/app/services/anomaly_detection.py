@@ -13,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.models import Anomaly, Event
+from app.services.blob_store import blob_size, blob_store, is_blob_ref
 
 settings = get_settings()
 
@@ -66,7 +67,7 @@ class AnomalyDetectionService:
         for event in events:
             # Example features - customize based on your needs
             feature_vector = [
-                len(str(event.payload)) if event.payload else 0,
+                self._payload_size(event.payload),
                 event.retry_count,
                 hash(event.event_type) % 1000,  # Simple hash for categorical
                 hash(event.source) % 1000,
@@ -75,6 +76,12 @@ class AnomalyDetectionService:
 
         return np.array(features)
 
+    def _payload_size(self, payload: Any) -> int:
+        """Size feature of an event payload, taken from the reference when it was offloaded."""
+        if is_blob_ref(payload):
+            return blob_size(payload)
+        return len(str(payload)) if payload else 0
+
     async def detect_anomaly(
         self,
         db: AsyncSession,
@@ -108,7 +115,7 @@ class AnomalyDetectionService:
                 detection_type=detection_type,
                 severity=severity,
                 description=f"Anomaly detected in {detection_type}",
-                data=data,
+                data=await blob_store.offload(data),
                 score=float(score),
                 is_resolved=False,
             )
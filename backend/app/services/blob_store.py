@@ -0,0 +1,301 @@
+"""
+Content-addressed storage of large JSON payloads outside the database.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Optional, Type
+
+from app.agents.record import json_default
+from app.core.config import get_settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+settings = get_settings()
+
+# Only key of a payload reference, holding the description of the blob
+BLOB_REF_KEY = "$blob"
+
+# Only key of an escaped payload, wrapping a payload that could pass for a reference
+LITERAL_KEY = "$literal"
+
+
+# Codecs a blob may be compressed with
+CODECS = ("gzip", "zstd")
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+_KEY = re.compile(r"[0-9a-f]{64}\.(?:gzip|zstd)")
+
+# Raised by the codecs on corrupt data
+DECOMPRESS_ERRORS = (OSError, EOFError, ValueError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+class BlobError(Exception):
+    """Raised when a blob reference is invalid or its blob cannot be read back."""
+
+
+class BlobNotFoundError(BlobError):
+    """Raised when a referenced blob is missing from the store."""
+
+
+def is_blob_ref(value: Any) -> bool:
+    """Whether a stored payload is a reference to a blob rather than the payload."""
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(BLOB_REF_KEY), dict)
+
+
+def _is_literal(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and LITERAL_KEY in value
+
+
+def escape(value: Any) -> Any:
+    """
+    Wrap a payload stored inline if it uses either reserved key.
+
+    Every payload kept inline goes through here, so only offload() makes
+    references and a user payload shaped like one reads back unchanged.
+    """
+    if isinstance(value, Mapping) and (BLOB_REF_KEY in value or LITERAL_KEY in value):
+        return {LITERAL_KEY: value}
+    return value
+
+
+def blob_size(reference: Dict[str, Any]) -> int:
+    """Size of the JSON encoding of an offloaded payload."""
+    return reference[BLOB_REF_KEY]["size"]
+
+
+def blob_key(reference: Dict[str, Any]) -> str:
+    """
+    Storage key of the blob behind a reference.
+
+    Args:
+        reference: Blob reference
+
+    Returns:
+        "<sha256>.<codec>"
+
+    Raises:
+        BlobError: If the reference does not name a valid digest and codec
+    """
+    description = reference[BLOB_REF_KEY]
+    digest, codec = description.get("sha256"), description.get("codec")
+    if not isinstance(digest, str) or not _DIGEST.fullmatch(digest):
+        raise BlobError("Blob reference has an invalid digest")
+    if codec not in CODECS:
+        raise BlobError(f"Blob reference has an unknown codec: {codec!r}")
+    return f"{digest}.{codec}"
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    try:
+        if codec == "zstd":
+            if zstandard is None:
+                raise BlobError("zstandard is required to read zstd blobs")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+    except DECOMPRESS_ERRORS as e:
+        raise BlobError(f"Blob cannot be decompressed: {e}") from None
+
+
+class BlobBackend(ABC):
+    """
+    Storage of immutable blobs by key.
+
+    Keys are derived from the content, so a put of a key that already
+    exists can be skipped.
+    """
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes):
+        """Write a blob under a key."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        """
+        Read a blob.
+
+        Raises:
+            BlobNotFoundError: If there is no blob under the key
+        """
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether there is a blob under a key."""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Remove the blob under a key, if there is one."""
+
+
+class LocalBlobBackend(BlobBackend):
+    """Blobs as files under a directory, fanned out by the first bytes of the key."""
+
+    def __init__(self, root: str = settings.blob_store_path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        # Keys are content hashes; anything else could address files outside root
+        if not _KEY.fullmatch(key):
+            raise BlobError(f"Invalid blob key: {key!r}")
+        return self.root / key[:2] / key[2:4] / key
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write aside and rename, so readers never see a partial blob
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    def _read(self, key: str) -> bytes:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            raise BlobNotFoundError(key) from None
+
+    async def put(self, key: str, data: bytes):
+        await asyncio.to_thread(self._write, key, data)
+
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._read, key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._path(key).exists)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._path(key).unlink, True)
+
+
+# Backends selectable by name; others are given as "package.module:ClassName"
+BLOB_BACKENDS: Dict[str, Type[BlobBackend]] = {"local": LocalBlobBackend}
+
+
+def create_backend(name: str) -> BlobBackend:
+    """
+    Create a blob backend from its name or import path.
+
+    Args:
+        name: Name of a built-in backend, or "package.module:ClassName"
+
+    Returns:
+        Backend instance, created without arguments
+    """
+    backend = BLOB_BACKENDS.get(name)
+    if backend is None:
+        module_path, _, class_name = name.partition(":")
+        backend = getattr(importlib.import_module(module_path), class_name)
+    return backend()
+
+
+class BlobStore:
+    """
+    Moves JSON payloads above a size threshold into a blob backend.
+
+    An offloaded payload is replaced by a small reference,
+    {"$blob": {"sha256", "size", "stored_size", "codec"}}, holding the
+    SHA-256 of its JSON encoding, its size and the codec it is compressed
+    with. Identical payloads share one blob. Inline payloads whose keys
+    include "$blob" or "$literal" are wrapped as {"$literal": payload}, so
+    a stored value is a reference only if offload() made it one. zstd is used when the
+    zstandard package is installed, gzip otherwise; blobs written with
+    either stay readable as the reference names the codec.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[BlobBackend] = None,
+        threshold_bytes: int = settings.blob_offload_threshold_bytes,
+        codec: Optional[str] = None,
+    ):
+        self.backend = backend or create_backend(settings.blob_store_backend)
+        self.threshold_bytes = threshold_bytes
+        self.codec = codec or ("zstd" if zstandard is not None else "gzip")
+
+    async def offload(self, value: Any) -> Any:
+        """
+        Store a payload as a blob if it is large enough.
+
+        Args:
+            value: JSON-like payload
+
+        Returns:
+            A blob reference, or the payload itself, escaped, if it is small or
+            offloading is off
+        """
+        if self.threshold_bytes <= 0 or value is None:
+            return escape(value)
+
+        # Sized by the encoding itself; estimates undercount escapes and non-ASCII text
+        data = json.dumps(value, default=json_default, separators=(",", ":")).encode()
+        if len(data) < self.threshold_bytes:
+            return escape(value)
+
+        digest = hashlib.sha256(data).hexdigest()
+        compressed = await asyncio.to_thread(compress, data, self.codec)
+        await self.backend.put(f"{digest}.{self.codec}", compressed)
+        return {
+            BLOB_REF_KEY: {
+                "sha256": digest,
+                "size": len(data),
+                "stored_size": len(compressed),
+                "codec": self.codec,
+            }
+        }
+
+    async def load(self, value: Any) -> Any:
+        """
+        Fetch the payload behind a blob reference.
+
+        Args:
+            value: Stored payload: a blob reference, an escaped payload or a payload
+
+        Returns:
+            The full payload
+
+        Raises:
+            BlobNotFoundError: If the blob is missing
+            BlobError: If the reference is invalid or the blob is corrupt
+        """
+        if _is_literal(value):
+            return value[LITERAL_KEY]
+        if not is_blob_ref(value):
+            return value
+
+        key = blob_key(value)
+        digest, _, codec = key.partition(".")
+        compressed = await self.backend.get(key)
+        data = await asyncio.to_thread(decompress, compressed, codec)
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise BlobError(f"Blob {digest} does not match its hash")
+        return json.loads(data)
+
+
+# Global blob store instance
+blob_store = BlobStore()
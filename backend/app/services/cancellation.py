@@ -0,0 +1,106 @@
+"""
+Cancellation requests broadcast to every node through Redis pub/sub.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Callable, Optional, Sequence, Set
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+CANCEL_CHANNEL = "executions:cancel"
+
+# How long to wait before listening again after a Redis error
+REDIS_RETRY_SECONDS = 5.0
+
+
+class ExecutionCancellation:
+    """Sends cancellation requests to, and receives them from, every node."""
+
+    def __init__(self, redis_url: Optional[str] = settings.redis_url):
+        self.redis_url = redis_url
+        self._redis: Optional[Redis] = None
+        self._listeners: Set[asyncio.Task] = set()
+
+    def _connect(self) -> Redis:
+        return Redis.from_url(
+            self.redis_url,
+            max_connections=settings.redis_max_connections,
+            decode_responses=True,
+            socket_connect_timeout=1,
+        )
+
+    async def broadcast(self, execution_ids: Sequence[int]) -> bool:
+        """
+        Ask every node to cancel executions it is running or queueing.
+
+        Args:
+            execution_ids: IDs of the executions to cancel
+
+        Returns:
+            True if the request reached Redis
+        """
+        if not self.redis_url:
+            return False
+        if self._redis is None:
+            self._redis = self._connect()
+        try:
+            await self._redis.publish(CANCEL_CHANNEL, json.dumps(list(execution_ids)))
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            logger.warning("Could not broadcast cancellation: %s", e)
+            return False
+        return True
+
+    def start(self, on_cancel: Callable[[int], object]) -> Optional[asyncio.Task]:
+        """
+        Call on_cancel for every execution ID broadcast, until stopped.
+
+        Args:
+            on_cancel: Called with each execution ID, such as PipelineExecutor.cancel
+
+        Returns:
+            The listening task, or None without Redis
+        """
+        if not self.redis_url:
+            return None
+        task = asyncio.create_task(self._listen(on_cancel))
+        self._listeners.add(task)
+        task.add_done_callback(self._listeners.discard)
+        return task
+
+    async def _listen(self, on_cancel: Callable[[int], object]):
+        while True:
+            redis = self._connect()
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(CANCEL_CHANNEL)
+                async for message in pubsub.listen():
+                    for execution_id in json.loads(message["data"]):
+                        on_cancel(execution_id)
+            except (RedisError, OSError, asyncio.TimeoutError) as e:
+                logger.warning("Cancellation listener lost its Redis connection: %s", e)
+            finally:
+                await pubsub.close()
+                await redis.close()
+            await asyncio.sleep(REDIS_RETRY_SECONDS)
+
+    async def stop(self):
+        """Stop listening and close the connection used for broadcasting."""
+        for task in list(self._listeners):
+            task.cancel()
+        await asyncio.gather(*self._listeners, return_exceptions=True)
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+# Global execution cancellation instance
+execution_cancellation = ExecutionCancellation()
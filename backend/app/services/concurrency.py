@@ -0,0 +1,92 @@
+"""
+Concurrency limits for agent calls.
+"""
+
+import asyncio
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, Optional
+
+from app.core import metrics
+
+
+class ConcurrencyLimiter:
+    """Named semaphores that report how long callers queue for a slot."""
+
+    def __init__(self, name: str, limits: Dict[str, int], default_limit: int = 0):
+        """
+        Initialize the limiter.
+
+        Args:
+            name: Limiter name used as a metrics label
+            limits: Slot count per key
+            default_limit: Slot count for keys without a limit, 0 for unlimited
+        """
+        self.name = name
+        self.limits = dict(limits)
+        self.default_limit = default_limit
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_semaphore(self, key: str) -> Optional[asyncio.Semaphore]:
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            limit = self.limits.get(key, self.default_limit)
+            if limit <= 0:
+                return None
+            semaphore = self._semaphores[key] = asyncio.Semaphore(limit)
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self, key: str) -> AsyncIterator[float]:
+        """
+        Hold a slot for a key, waiting in line if all slots are taken.
+
+        Args:
+            key: Key to limit, such as an agent type
+
+        Yields:
+            Seconds spent waiting for the slot
+        """
+        semaphore = self._get_semaphore(key)
+        if semaphore is None:
+            yield 0.0
+            return
+
+        queued = metrics.concurrency_queued.labels(self.name, key)
+        started = time.perf_counter()
+        queued.inc()
+        try:
+            await semaphore.acquire()
+        finally:
+            queued.dec()
+
+        waited = time.perf_counter() - started
+        metrics.concurrency_queue_wait_seconds.labels(self.name, key).observe(waited)
+
+        in_use = metrics.concurrency_in_use.labels(self.name, key)
+        in_use.inc()
+        try:
+            yield waited
+        finally:
+            in_use.dec()
+            semaphore.release()
+
+    @asynccontextmanager
+    async def slots(self, keys: Iterable[str]) -> AsyncIterator[float]:
+        """
+        Hold a slot for each of several keys.
+
+        Slots are taken one key at a time in sorted order, so callers
+        holding overlapping keys cannot deadlock each other.
+
+        Args:
+            keys: Keys to limit; duplicates take a single slot
+
+        Yields:
+            Seconds spent waiting for all the slots
+        """
+        async with AsyncExitStack() as stack:
+            waited = 0.0
+            for key in sorted(set(keys)):
+                waited += await stack.enter_async_context(self.slot(key))
+            yield waited
@@ -15,6 +15,7 @@ from sqlalchemy import select
 from app.core.config import get_settings
 from app.core.database import AsyncSessionLocal
 from app.models import Event
+from app.services.blob_store import blob_store
 
 settings = get_settings()
 
@@ -67,7 +68,7 @@ class EventBus:
             event = Event(
                 event_type=event_type,
                 source=source,
-                payload=payload,
+                payload=await blob_store.offload(payload),
                 status="pending",
             )
             db.add(event)
@@ -0,0 +1,87 @@
+"""
+Dispatch of pipeline executions to the configured execution backend.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional, Sequence
+
+from app.core.config import get_settings
+from app.models import ExecutionPriority
+from app.services.pipeline_executor import pipeline_executor
+from app.services.pipeline_plan import ExecutionPlan
+from app.worker import (
+    MESSAGE_PRIORITIES,
+    celery_app,
+    execute_pipeline_batch_task,
+    execute_pipeline_task,
+    partition_queue,
+)
+
+settings = get_settings()
+
+
+def _use_celery() -> bool:
+    # Eager tasks would run to completion on a worker event loop of this process,
+    # blocking the request, so they run on the in-process executor instead
+    return settings.execution_backend == "celery" and not celery_app.conf.task_always_eager
+
+
+async def dispatch_execution(
+    plan: ExecutionPlan,
+    execution_id: int,
+    input_data: Dict[str, Any],
+    resume: bool = False,
+    priority: ExecutionPriority = ExecutionPriority.INTERACTIVE,
+    user_id: Optional[int] = None,
+):
+    """
+    Start a pending execution in-process or on the Celery worker pool.
+
+    Args:
+        plan: Compiled plan of the pipeline
+        execution_id: ID of the pending PipelineExecution
+        input_data: Input for the first step
+        resume: Reuse the checkpoints of an earlier, failed run
+        priority: Priority class to schedule the execution in
+        user_id: ID of the submitting user
+    """
+    if _use_celery():
+        # Publishing talks to the broker synchronously, keep it off the event loop
+        await asyncio.to_thread(
+            execute_pipeline_task.apply_async,
+            args=(plan.pipeline_id, execution_id, input_data, plan.version.isoformat()),
+            kwargs={"resume": resume, "priority": priority.value, "user_id": user_id},
+            queue=partition_queue(plan.pipeline_id),
+            priority=MESSAGE_PRIORITIES[priority],
+        )
+    else:
+        pipeline_executor.submit(plan, execution_id, input_data, resume, priority, user_id)
+
+
+async def dispatch_batch(
+    plan: ExecutionPlan,
+    execution_ids: Sequence[int],
+    records: Sequence[Dict[str, Any]],
+    priority: ExecutionPriority = ExecutionPriority.BATCH,
+    user_id: Optional[int] = None,
+):
+    """
+    Start a batch of pending executions in-process or on the Celery worker pool.
+
+    Args:
+        plan: Compiled plan of the pipeline
+        execution_ids: IDs of the pending executions, one per record
+        records: Input records, in the same order as execution_ids
+        priority: Priority class to schedule the batch in
+        user_id: ID of the submitting user
+    """
+    if _use_celery():
+        await asyncio.to_thread(
+            execute_pipeline_batch_task.apply_async,
+            args=(plan.pipeline_id, list(execution_ids), list(records), plan.version.isoformat()),
+            kwargs={"priority": priority.value, "user_id": user_id},
+            queue=partition_queue(plan.pipeline_id),
+            priority=MESSAGE_PRIORITIES[priority],
+        )
+    else:
+        pipeline_executor.submit_batch(plan, execution_ids, records, priority, user_id)
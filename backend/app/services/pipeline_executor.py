@@ -0,0 +1,961 @@
+"""
+Pipeline execution engine.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.agents.record import materialize
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.sizing import estimate_total_size
+from app.models import (
+    ExecutionCheckpoint,
+    ExecutionPriority,
+    ExecutionStatus,
+    PipelineExecution,
+)
+from app.services.agent_process_pool import agent_process_pool
+from app.services.blob_store import BlobStore, blob_store
+from app.services.concurrency import ConcurrencyLimiter
+from app.services.pipeline_plan import ExecutionPlan, PlanStep
+from app.services.progress import ExecutionProgress, execution_progress
+from app.services.scheduler import FairShareScheduler
+from app.services.step_cache import StepResultCache, step_cache_key, step_result_cache
+from app.services.step_stats import StepStatistics, step_statistics
+from app.services.step_trace import StepTraceWriter, step_trace_writer
+
+settings = get_settings()
+
+# Per-record outcome of a step: its output, or the error that failed the record
+StepResult = Union[Dict[str, Any], Exception]
+
+# Called with a step and its per-record results once the step completes
+StepCallback = Callable[[PlanStep, List[StepResult]], Awaitable[None]]
+
+# Called with a step just before it starts
+StepStartCallback = Callable[[PlanStep], Awaitable[None]]
+
+
+class PipelineExecutionError(Exception):
+    """Raised when a pipeline step fails."""
+
+
+def merge_outputs(outputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge the outputs of the steps feeding a join.
+
+    Keys of later dependencies win over earlier ones.
+    """
+    if len(outputs) == 1:
+        return outputs[0]
+
+    merged: Dict[str, Any] = {}
+    for output in outputs:
+        merged.update(output)
+    return merged
+
+
+def chain_callbacks(*callbacks: Optional[StepCallback]) -> Optional[StepCallback]:
+    """Combine step callbacks into one that awaits each in turn, skipping missing ones."""
+    present = [callback for callback in callbacks if callback is not None]
+    if not present:
+        return None
+
+    async def call_all(step: PlanStep, results: List[StepResult]):
+        for callback in present:
+            await callback(step, results)
+
+    return call_all
+
+
+def join_results(branches: List[List[StepResult]]) -> List[StepResult]:
+    """
+    Merge per-record results of the branches feeding a join.
+
+    A record that failed in any branch stays failed.
+    """
+    if len(branches) == 1:
+        return branches[0]
+
+    joined: List[StepResult] = []
+    for parts in zip(*branches):
+        error = next((part for part in parts if isinstance(part, Exception)), None)
+        joined.append(error if error is not None else merge_outputs(list(parts)))
+    return joined
+
+
+async def read_windows(
+    records: AsyncIterator[StepResult], window_size: int
+) -> AsyncIterator[List[StepResult]]:
+    """
+    Group a record stream into windows, reading at most one window ahead.
+
+    Args:
+        records: Async iterator of records
+        window_size: Maximum number of records per window
+
+    Yields:
+        Lists of up to window_size records
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=window_size)
+    end = object()
+
+    async def read():
+        try:
+            async for record in records:
+                await queue.put(record)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await queue.put(end)
+            raise
+        await queue.put(end)
+
+    reader = asyncio.create_task(read())
+    try:
+        window: List[StepResult] = []
+        while True:
+            record = await queue.get()
+            if record is end:
+                break
+            window.append(record)
+            if len(window) >= window_size:
+                yield window
+                window = []
+
+        if window:
+            yield window
+
+        # Surface errors raised while reading the stream
+        await reader
+    finally:
+        reader.cancel()
+
+
+class PipelineExecutor:
+    """
+    Runs pipeline executions as bounded background tasks.
+
+    At most max_concurrency executions run at once; the rest wait for a slot
+    in the fair-share scheduler, by priority class, user and pipeline. Each
+    agent type additionally has its own limit on concurrent step calls, so
+    a slow agent cannot take every slot downstream of it.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        max_concurrency: int = settings.executor_max_concurrency,
+        agent_limits: Optional[Dict[str, int]] = None,
+        agent_default_limit: int = settings.agent_default_concurrency,
+        result_cache: Optional[StepResultCache] = (
+            step_result_cache if settings.step_cache_enabled else None
+        ),
+        checkpoints: bool = settings.execution_checkpoints,
+        progress: Optional[ExecutionProgress] = (
+            execution_progress if settings.progress_events_enabled else None
+        ),
+        statistics: Optional[StepStatistics] = (
+            step_statistics if settings.step_stats_enabled else None
+        ),
+        tracer: Optional[StepTraceWriter] = (
+            step_trace_writer if settings.step_traces_enabled else None
+        ),
+        blobs: BlobStore = blob_store,
+    ):
+        self.session_factory = session_factory
+        self.result_cache = result_cache
+        self.checkpoints = checkpoints
+        self.progress = progress
+        self.statistics = statistics
+        self.tracer = tracer
+        self.blobs = blobs
+        self.scheduler = FairShareScheduler(max_concurrency)
+        self.agent_limiter = ConcurrencyLimiter(
+            "agents",
+            settings.agent_concurrency_limits_map if agent_limits is None else agent_limits,
+            agent_default_limit,
+        )
+        self._tasks: Set[asyncio.Task] = set()
+        self._running: Dict[int, asyncio.Task] = {}
+
+    def submit(
+        self,
+        plan: ExecutionPlan,
+        execution_id: int,
+        input_data: Dict[str, Any],
+        resume: bool = False,
+        priority: ExecutionPriority = ExecutionPriority.INTERACTIVE,
+        user_id: Optional[int] = None,
+    ) -> asyncio.Task:
+        """
+        Schedule an execution in the background.
+
+        Args:
+            plan: Compiled plan of the pipeline
+            execution_id: ID of a pending PipelineExecution
+            input_data: Input for the first step
+            resume: Reuse the checkpoints of an earlier, failed run
+            priority: Priority class to schedule the execution in
+            user_id: ID of the submitting user, for fair sharing
+
+        Returns:
+            The task running the execution
+        """
+        task = asyncio.create_task(
+            self.run(plan, execution_id, input_data, resume, priority, user_id)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def run(
+        self,
+        plan: ExecutionPlan,
+        execution_id: int,
+        input_data: Dict[str, Any],
+        resume: bool = False,
+        priority: ExecutionPriority = ExecutionPriority.INTERACTIVE,
+        user_id: Optional[int] = None,
+    ):
+        """
+        Run an execution once the scheduler grants it a slot.
+
+        The output of every step except the sinks is checkpointed as it
+        completes. A resumed run skips the steps whose checkpoints are still
+        valid, and the checkpoints are dropped once the execution succeeds.
+        A cancelled run keeps the outputs of the steps it completed.
+        """
+        step_outputs: Dict[str, Any] = {}
+
+        async def keep_output(step: PlanStep, results: List[StepResult]):
+            if not isinstance(results[0], Exception):
+                step_outputs[str(step.step_id)] = results[0]
+
+        with self._track([execution_id]):
+            try:
+                async with self.scheduler.slot(priority, user_id, plan.pipeline_id):
+                    if not await self._claim([execution_id]):
+                        return
+                    completed = await self._load_checkpoints(plan, execution_id) if resume else {}
+
+                    checkpointing = self.checkpoints and len(plan.steps) > len(plan.sinks)
+                    step_started, step_finished = self._step_events(plan, execution_id=execution_id)
+                    on_step = chain_callbacks(
+                        keep_output,
+                        partial(self._save_checkpoint, plan, execution_id)
+                        if checkpointing
+                        else None,
+                        step_finished,
+                    )
+
+                    values: Dict[str, Any] = {}
+                    try:
+                        output = await self.run_plan(
+                            plan,
+                            input_data or {},
+                            completed=completed,
+                            on_step=on_step,
+                            on_step_start=step_started,
+                            execution_id=execution_id,
+                        )
+                        values["output_data"] = await self.blobs.offload(output)
+                        values["status"] = ExecutionStatus.SUCCESS
+                    except Exception as e:
+                        values["status"] = ExecutionStatus.FAILED
+                        values["error_message"] = str(e)[:1000]
+
+                    async with self.session_factory() as db:
+                        await db.execute(
+                            update(PipelineExecution)
+                            .where(PipelineExecution.id == execution_id)
+                            .values(completed_at=datetime.utcnow(), **values)
+                        )
+                        succeeded = values["status"] == ExecutionStatus.SUCCESS
+                        if succeeded and (completed or checkpointing):
+                            await db.execute(
+                                delete(ExecutionCheckpoint).where(
+                                    ExecutionCheckpoint.execution_id == execution_id
+                                )
+                            )
+                        await db.commit()
+            except asyncio.CancelledError:
+                await self._mark_cancelled(
+                    plan,
+                    [execution_id],
+                    {"completed_steps": materialize(step_outputs)} if step_outputs else None,
+                )
+                raise
+
+        self._publish(
+            "execution-finished",
+            plan,
+            execution_id=execution_id,
+            status=values["status"].value,
+            error_message=values.get("error_message"),
+        )
+
+    def submit_batch(
+        self,
+        plan: ExecutionPlan,
+        execution_ids: Sequence[int],
+        records: Sequence[Dict[str, Any]],
+        priority: ExecutionPriority = ExecutionPriority.BATCH,
+        user_id: Optional[int] = None,
+    ) -> asyncio.Task:
+        """
+        Schedule a batch of executions in the background.
+
+        Args:
+            plan: Compiled plan of the pipeline
+            execution_ids: IDs of the pending executions, one per record
+            records: Input records, in the same order as execution_ids
+            priority: Priority class to schedule the batch in
+            user_id: ID of the submitting user, for fair sharing
+
+        Returns:
+            The task running the batch
+        """
+        task = asyncio.create_task(self.run_batch(plan, execution_ids, records, priority, user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def run_batch(
+        self,
+        plan: ExecutionPlan,
+        execution_ids: Sequence[int],
+        records: Sequence[Dict[str, Any]],
+        priority: ExecutionPriority = ExecutionPriority.BATCH,
+        user_id: Optional[int] = None,
+    ):
+        """
+        Run a batch in a single slot, writing all results in one statement.
+
+        The batch runs as one unit, so cancelling any of its executions
+        cancels all of them. Records cancelled before the batch started are
+        left out.
+        """
+        with self._track(execution_ids):
+            try:
+                async with self.scheduler.slot(priority, user_id, plan.pipeline_id, len(records)):
+                    claimed = set(await self._claim(execution_ids))
+                    if not claimed:
+                        return
+                    pairs = [
+                        (execution_id, record)
+                        for execution_id, record in zip(execution_ids, records)
+                        if execution_id in claimed
+                    ]
+                    execution_ids = [execution_id for execution_id, _ in pairs]
+
+                    step_started, step_finished = self._step_events(
+                        plan,
+                        batch={
+                            "first_execution_id": execution_ids[0],
+                            "last_execution_id": execution_ids[-1],
+                            "records": len(execution_ids),
+                        },
+                    )
+                    results = await self.run_plan_batch(
+                        plan,
+                        [record for _, record in pairs],
+                        on_step=step_finished,
+                        on_step_start=step_started,
+                    )
+                    completed_at = datetime.utcnow()
+
+                    rows = []
+                    for execution_id, result in zip(execution_ids, results):
+                        failed = isinstance(result, Exception)
+                        rows.append(
+                            {
+                                "id": execution_id,
+                                "status": (
+                                    ExecutionStatus.FAILED if failed else ExecutionStatus.SUCCESS
+                                ),
+                                "output_data": (
+                                    None if failed else await self.blobs.offload(result)
+                                ),
+                                "error_message": str(result)[:1000] if failed else None,
+                                "completed_at": completed_at,
+                            }
+                        )
+
+                    await self._update_executions(rows)
+            except asyncio.CancelledError:
+                await self._mark_cancelled(plan, execution_ids)
+                raise
+
+        for row in rows:
+            self._publish(
+                "execution-finished",
+                plan,
+                execution_id=row["id"],
+                status=row["status"].value,
+                error_message=row["error_message"],
+            )
+
+    async def stream(
+        self,
+        plan: ExecutionPlan,
+        execution_id: int,
+        records: AsyncIterator[StepResult],
+        window_size: int = settings.stream_window_size,
+        priority: ExecutionPriority = ExecutionPriority.BATCH,
+        user_id: Optional[int] = None,
+    ) -> AsyncIterator[StepResult]:
+        """
+        Run a stream of records through a plan with bounded memory.
+
+        Records are read ahead into a queue of at most one window and run
+        through the plan one window at a time, so memory stays flat no
+        matter how long the stream is. The execution keeps a count of
+        processed, succeeded and failed records as its output.
+
+        Args:
+            plan: Compiled plan of the pipeline
+            execution_id: ID of a pending PipelineExecution
+            records: Input records; errors are passed through as failed records
+            window_size: Number of records handed to each step at once
+            priority: Priority class to schedule the stream in
+            user_id: ID of the submitting user, for fair sharing
+
+        Yields:
+            One output or error per record, in input order
+        """
+        with self._track([execution_id]):
+            async with self.scheduler.slot(priority, user_id, plan.pipeline_id):
+                if not await self._claim([execution_id]):
+                    return
+
+                summary = {"records": 0, "succeeded": 0, "failed": 0}
+                values: Dict[str, Any] = {"status": ExecutionStatus.SUCCESS}
+                try:
+                    async for window in read_windows(records, window_size):
+                        for result in await self.run_plan_batch(
+                            plan, window, execution_id=execution_id
+                        ):
+                            summary["records"] += 1
+                            failed = isinstance(result, Exception)
+                            summary["failed" if failed else "succeeded"] += 1
+                            yield result
+                except GeneratorExit:
+                    values["status"] = ExecutionStatus.CANCELLED
+                    values["error_message"] = "Stream closed before all records were processed"
+                    raise
+                except asyncio.CancelledError:
+                    values["status"] = ExecutionStatus.CANCELLED
+                    values["error_message"] = "Execution was cancelled"
+                    raise
+                except Exception as e:
+                    values["status"] = ExecutionStatus.FAILED
+                    values["error_message"] = str(e)[:1000]
+                finally:
+                    await self._update_execution(
+                        execution_id, output_data=summary, completed_at=datetime.utcnow(), **values
+                    )
+                    if values["status"] == ExecutionStatus.CANCELLED:
+                        metrics.executions_cancelled_total.inc()
+                    self._publish(
+                        "execution-finished",
+                        plan,
+                        execution_id=execution_id,
+                        status=values["status"].value,
+                        error_message=values.get("error_message"),
+                        summary=summary,
+                    )
+
+    def cancel(self, execution_id: int) -> bool:
+        """
+        Cancel an execution if it is running or queued in this executor.
+
+        The task is cancelled at its next await point, which releases its
+        scheduler slot, agent concurrency slots and database connections.
+        Work already handed to the process pool cannot be preempted: it runs
+        to completion in its worker process and keeps its pool slot until
+        then, so the pool frees up only once that work is done.
+
+        Args:
+            execution_id: ID of the execution
+
+        Returns:
+            True if the execution was found here
+        """
+        task = self._running.get(execution_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    @contextmanager
+    def _track(self, execution_ids: Sequence[int]) -> Iterator[None]:
+        """Register the current task as running the executions, so they can be cancelled."""
+        task = asyncio.current_task()
+        for execution_id in execution_ids:
+            self._running[execution_id] = task
+        try:
+            yield
+        finally:
+            for execution_id in execution_ids:
+                if self._running.get(execution_id) is task:
+                    del self._running[execution_id]
+
+    async def _claim(self, execution_ids: Sequence[int]) -> List[int]:
+        """Move pending executions to running, skipping any cancelled in the meantime."""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(PipelineExecution)
+                .where(
+                    PipelineExecution.id.in_(execution_ids),
+                    PipelineExecution.status == ExecutionStatus.PENDING,
+                )
+                .values(status=ExecutionStatus.RUNNING, started_at=datetime.utcnow())
+                .returning(PipelineExecution.id)
+            )
+            claimed = list(result.scalars())
+            await db.commit()
+        return claimed
+
+    async def _mark_cancelled(
+        self,
+        plan: ExecutionPlan,
+        execution_ids: Sequence[int],
+        output_data: Optional[Dict[str, Any]] = None,
+    ):
+        """Record cancelled executions along with any partial output."""
+        async with self.session_factory() as db:
+            await db.execute(
+                update(PipelineExecution)
+                .where(
+                    PipelineExecution.id.in_(execution_ids),
+                    PipelineExecution.status.in_(
+                        [ExecutionStatus.PENDING, ExecutionStatus.RUNNING]
+                    ),
+                )
+                .values(
+                    status=ExecutionStatus.CANCELLED,
+                    output_data=await self.blobs.offload(output_data),
+                    error_message="Execution was cancelled",
+                    completed_at=datetime.utcnow(),
+                )
+            )
+            await db.commit()
+
+        metrics.executions_cancelled_total.inc(len(execution_ids))
+        for execution_id in execution_ids:
+            self._publish(
+                "execution-finished",
+                plan,
+                execution_id=execution_id,
+                status=ExecutionStatus.CANCELLED.value,
+                error_message="Execution was cancelled",
+            )
+
+    async def run_plan(
+        self,
+        plan: ExecutionPlan,
+        data: Dict[str, Any],
+        completed: Optional[Dict[int, Dict[str, Any]]] = None,
+        on_step: Optional[StepCallback] = None,
+        on_step_start: Optional[StepStartCallback] = None,
+        execution_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a single record through a plan.
+
+        Args:
+            plan: Compiled plan of the pipeline
+            data: Pipeline input, fed to steps without dependencies
+            completed: Outputs of steps that already ran, by step ID; they are not run again
+            on_step: Awaited with each step and its results as it completes
+            on_step_start: Awaited with each step before it runs
+            execution_id: Execution the step traces belong to
+
+        Returns:
+            Output of the sink step, or the merged outputs of several sinks
+        """
+        completed_batch = {step_id: [output] for step_id, output in (completed or {}).items()}
+        result = (
+            await self.run_plan_batch(
+                plan, [data], completed_batch, on_step, on_step_start, execution_id
+            )
+        )[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def run_plan_batch(
+        self,
+        plan: ExecutionPlan,
+        records: List[Dict[str, Any]],
+        completed: Optional[Dict[int, List[StepResult]]] = None,
+        on_step: Optional[StepCallback] = None,
+        on_step_start: Optional[StepStartCallback] = None,
+        execution_id: Optional[int] = None,
+    ) -> List[StepResult]:
+        """
+        Run a batch of records through a plan, handing the whole batch to each step.
+
+        Independent branches run in parallel. A record that fails at one step
+        is dropped from the steps after it. Steps pass copy-on-write Records
+        along, which are turned into plain dicts only once the plan is done.
+
+        Args:
+            plan: Compiled plan of the pipeline
+            records: Pipeline inputs
+            completed: Per-record results of steps that already ran, by step ID
+            on_step: Awaited with each step and its results as it completes
+            on_step_start: Awaited with each step before it runs
+            execution_id: Execution the step traces belong to, if there is just one
+
+        Returns:
+            One output or error per record, in input order
+        """
+        completed = completed or {}
+
+        async def run_one(step: PlanStep, step_input: List[StepResult]) -> List[StepResult]:
+            if step.step_id in completed:
+                return completed[step.step_id]
+            if on_step_start is not None:
+                await on_step_start(step)
+            started_at, started = datetime.utcnow(), time.perf_counter()
+            results, cache_hits = await self._execute_step(step, step_input)
+            if self.tracer is not None:
+                self._trace(
+                    plan, step, execution_id, step_input, results, cache_hits, started_at, started
+                )
+            if on_step is not None:
+                await on_step(step, results)
+            return results
+
+        if plan.is_chain:
+            results: List[StepResult] = list(records)
+            for step in plan.steps:
+                results = await run_one(step, results)
+            return [materialize(result) for result in results]
+
+        tasks: Dict[int, asyncio.Task] = {}
+
+        async def run_step(step: PlanStep) -> List[StepResult]:
+            if step.depends_on:
+                step_input = join_results([await tasks[dep] for dep in step.depends_on])
+            else:
+                step_input = list(records)
+            return await run_one(step, step_input)
+
+        # Steps are in topological order, so dependencies are created first
+        for step in plan.steps:
+            tasks[step.step_id] = asyncio.ensure_future(run_step(step))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        results = join_results([tasks[step_id].result() for step_id in plan.sinks])
+        return [materialize(result) for result in results]
+
+    async def _execute_step(
+        self, step: PlanStep, inputs: List[StepResult]
+    ) -> Tuple[List[StepResult], int]:
+        """Run a step over the records that have not failed yet, counting cache hits."""
+        results = list(inputs)
+        live = [index for index, item in enumerate(inputs) if not isinstance(item, Exception)]
+        if not live:
+            return results, 0
+
+        agent = step.agent
+        if not agent.copy_on_write:
+            # Unchanged containers are shared with earlier outputs and cached results
+            inputs = [materialize(item, copy=True) for item in inputs]
+
+        await agent.on_start()
+        try:
+            accepted = []
+            for index in live:
+                if await agent.validate_input(inputs[index]):
+                    accepted.append(index)
+                else:
+                    results[index] = PipelineExecutionError(f"{step.label} rejected its input")
+
+            outputs, cache_hits = await self._execute_cached(
+                step, [inputs[index] for index in accepted]
+            )
+            for index, output in zip(accepted, outputs):
+                results[index] = output
+        finally:
+            await agent.on_stop()
+
+        return results, cache_hits
+
+    async def _execute_cached(
+        self, step: PlanStep, records: List[Dict[str, Any]]
+    ) -> Tuple[List[StepResult], int]:
+        """Serve deterministic agents from the result cache, running only the misses."""
+        agent = step.agent
+        if self.result_cache is None or not agent.is_deterministic() or not records:
+            return await self._execute_records(step, records), 0
+
+        keys = [step_cache_key(agent, record) for record in records]
+        cached = await self.result_cache.get_many([key for key in keys if key])
+        results: List[StepResult] = [cached.get(key) for key in keys]
+
+        misses = [index for index, key in enumerate(keys) if key not in cached]
+        if misses:
+            outputs = await self._execute_records(step, [records[index] for index in misses])
+            fresh = {}
+            for index, output in zip(misses, outputs):
+                results[index] = output
+                if keys[index] and not isinstance(output, Exception):
+                    fresh[keys[index]] = output
+            if fresh:
+                await self.result_cache.put_many(fresh)
+
+        return results, len(records) - len(misses)
+
+    async def _execute_records(
+        self, step: PlanStep, records: List[Dict[str, Any]]
+    ) -> List[StepResult]:
+        """Call execute_batch, isolating failures to the records that caused them."""
+        if not records:
+            return []
+
+        agent = step.agent
+        try:
+            async with self.agent_limiter.slots(step.limit_keys):
+                if agent.cpu_bound:
+                    call = agent_process_pool.execute_batch(agent, records)
+                else:
+                    call = agent.execute_overlays(records)
+                started = time.perf_counter()
+                outputs = await asyncio.wait_for(call, step.timeout)
+            if len(outputs) != len(records):
+                raise PipelineExecutionError(
+                    f"{step.label} returned {len(outputs)} outputs for {len(records)} records"
+                )
+            if self.statistics is not None:
+                self.statistics.record(
+                    step.fingerprint, len(records), time.perf_counter() - started
+                )
+            return list(outputs)
+        except asyncio.TimeoutError:
+            # A retry per record could take the timeout once per record, so fail the call
+            metrics.step_timeouts_total.labels(step.registry_name).inc()
+            error = PipelineExecutionError(f"{step.label} timed out after {step.timeout:g}s")
+            for record in records:
+                await agent.on_error(error, record)
+            return [error] * len(records)
+        except Exception as e:
+            if len(records) > 1 and agent.is_deterministic():
+                # Running a deterministic agent again is safe, so retry record by
+                # record to mark only the failing records failed
+                return [(await self._execute_records(step, [record]))[0] for record in records]
+
+            # Other agents may have had side effects for some records already
+            for record in records:
+                await agent.on_error(e, record)
+            if not isinstance(e, PipelineExecutionError):
+                e = PipelineExecutionError(f"{step.label} failed: {e}")
+            return [e] * len(records)
+
+    def _trace(
+        self,
+        plan: ExecutionPlan,
+        step: PlanStep,
+        execution_id: Optional[int],
+        inputs: List[StepResult],
+        results: List[StepResult],
+        cache_hits: int,
+        started_at: datetime,
+        started: float,
+    ):
+        """Queue the trace of a step run."""
+        duration = time.perf_counter() - started
+        live = [item for item in inputs if not isinstance(item, Exception)]
+        outputs = [item for item in results if not isinstance(item, Exception)]
+        errors = [
+            result
+            for item, result in zip(inputs, results)
+            if isinstance(result, Exception) and not isinstance(item, Exception)
+        ]
+        sample = settings.step_trace_size_sample
+        self.tracer.record(
+            {
+                "pipeline_id": plan.pipeline_id,
+                "step_id": step.step_id,
+                "execution_id": execution_id,
+                "agent": step.registry_name,
+                "started_at": started_at,
+                "completed_at": started_at + timedelta(seconds=duration),
+                "duration_ms": round(duration * 1000, 3),
+                "records": len(live),
+                "input_bytes": estimate_total_size(live, sample),
+                "output_bytes": estimate_total_size(outputs, sample),
+                "cache_hits": cache_hits,
+                "errors": len(errors),
+                "error_message": str(errors[0])[:1000] if errors else None,
+            }
+        )
+
+    def _publish(self, event: str, plan: ExecutionPlan, **fields):
+        """Publish a progress event, if progress events are enabled."""
+        if self.progress is not None:
+            self.progress.publish(
+                {
+                    "event": event,
+                    "pipeline_id": plan.pipeline_id,
+                    "timestamp": datetime.utcnow().isoformat(),
+                    **fields,
+                }
+            )
+
+    def _step_events(
+        self, plan: ExecutionPlan, **fields
+    ) -> Tuple[Optional[StepStartCallback], Optional[StepCallback]]:
+        """Build step callbacks publishing step-started and step-finished events."""
+        if self.progress is None:
+            return None, None
+
+        started: Dict[int, float] = {}
+
+        async def step_started(step: PlanStep):
+            started[step.step_id] = time.perf_counter()
+            self._publish("step-started", plan, step_id=step.step_id, step=step.label, **fields)
+
+        async def step_finished(step: PlanStep, results: List[StepResult]):
+            failed = sum(1 for result in results if isinstance(result, Exception))
+            self._publish(
+                "step-finished",
+                plan,
+                step_id=step.step_id,
+                step=step.label,
+                succeeded=len(results) - failed,
+                failed=failed,
+                duration_ms=round((time.perf_counter() - started.pop(step.step_id)) * 1000, 3),
+                **fields,
+            )
+
+        return step_started, step_finished
+
+    async def _load_checkpoints(
+        self, plan: ExecutionPlan, execution_id: int
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Load the step outputs a resumed execution can reuse.
+
+        A checkpoint is reused when its step still has the same agent and
+        config and every step it depends on is reused as well. The others are
+        deleted so the steps can checkpoint again.
+        """
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(ExecutionCheckpoint).where(ExecutionCheckpoint.execution_id == execution_id)
+            )
+            checkpoints = {checkpoint.step_id: checkpoint for checkpoint in result.scalars()}
+
+            completed: Dict[int, Dict[str, Any]] = {}
+            for step in plan.steps:
+                checkpoint = checkpoints.get(step.step_id)
+                if (
+                    checkpoint is not None
+                    and checkpoint.fingerprint == step.fingerprint
+                    and all(dep in completed for dep in step.depends_on)
+                ):
+                    completed[step.step_id] = checkpoint.output_data
+
+            stale = [step_id for step_id in checkpoints if step_id not in completed]
+            if stale:
+                await db.execute(
+                    delete(ExecutionCheckpoint).where(
+                        ExecutionCheckpoint.execution_id == execution_id,
+                        ExecutionCheckpoint.step_id.in_(stale),
+                    )
+                )
+                await db.commit()
+
+        return completed
+
+    async def _save_checkpoint(
+        self, plan: ExecutionPlan, execution_id: int, step: PlanStep, results: List[StepResult]
+    ):
+        """Store the output of a completed step; sinks end up in output_data instead."""
+        result = results[0]
+        if isinstance(result, Exception) or step.step_id in plan.sinks:
+            return
+
+        async with self.session_factory() as db:
+            await db.execute(
+                insert(ExecutionCheckpoint).values(
+                    execution_id=execution_id,
+                    step_id=step.step_id,
+                    fingerprint=step.fingerprint,
+                    output_data=materialize(result),
+                )
+            )
+            await db.commit()
+
+    async def _update_execution(self, execution_id: int, **values):
+        """Write execution fields without loading the row first."""
+        async with self.session_factory() as db:
+            await db.execute(
+                update(PipelineExecution)
+                .where(PipelineExecution.id == execution_id)
+                .values(**values)
+            )
+            await db.commit()
+
+    async def mark_failed(self, execution_ids: Sequence[int], error_message: str):
+        """Fail executions that could not be started."""
+        async with self.session_factory() as db:
+            await db.execute(
+                update(PipelineExecution)
+                .where(PipelineExecution.id.in_(execution_ids))
+                .values(
+                    status=ExecutionStatus.FAILED,
+                    error_message=error_message[:1000],
+                    completed_at=datetime.utcnow(),
+                )
+            )
+            await db.commit()
+
+    async def _update_executions(self, rows: List[Dict[str, Any]]):
+        """Write many executions at once with a bulk UPDATE by primary key."""
+        async with self.session_factory() as db:
+            await db.execute(update(PipelineExecution), rows)
+            await db.commit()
+
+    async def shutdown(self):
+        """Cancel executions still in flight."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Global pipeline executor instance
+pipeline_executor = PipelineExecutor()
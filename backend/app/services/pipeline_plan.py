@@ -0,0 +1,514 @@
+"""
+Pipeline execution plan compiler and cache.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Sequence, Set, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.agents.base_agent import BaseAgent
+from app.agents.registry import agent_registry
+from app.core.config import get_settings
+from app.models import Pipeline, PipelineStatus, PipelineStep
+from app.services.step_fusion import FusedAgent, is_fusible
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "plans:invalidate"
+
+# How long to wait before listening again after a Redis error
+REDIS_RETRY_SECONDS = 5.0
+
+
+class PlanCompilationError(ValueError):
+    """Raised when a pipeline cannot be compiled into an execution plan."""
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    """A resolved pipeline step with its agent already built."""
+
+    step_id: int
+    order: int
+    agent_id: int
+    agent_name: str
+    registry_name: str
+    config: Mapping[str, Any]
+    agent: BaseAgent
+    depends_on: Tuple[int, ...] = ()
+    timeout: Optional[float] = None
+    # Steps replaced by this one when it runs a fused chain
+    fused: Tuple["PlanStep", ...] = ()
+
+    @property
+    def label(self) -> str:
+        return f"Step {self.order} ({self.agent_name})"
+
+    @property
+    def limit_keys(self) -> Tuple[str, ...]:
+        """Agent types whose concurrency limits apply, each fused step's included."""
+        return tuple(sorted({part.registry_name for part in self.fused or (self,)}))
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Hash of the agent and config, telling whether a stored output is still valid."""
+        payload = json.dumps(
+            [self.registry_name, self.agent.version, dict(self.config)],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """
+    Immutable snapshot of everything needed to run a pipeline.
+
+    Steps are stored in topological order. Steps without dependencies read
+    the pipeline input; the outputs of the sink steps form the result.
+    """
+
+    pipeline_id: int
+    status: PipelineStatus
+    version: datetime
+    steps: Tuple[PlanStep, ...]
+    sinks: Tuple[int, ...] = ()
+    fusion: bool = True
+
+    @property
+    def is_chain(self) -> bool:
+        """True when every step reads only from the step before it."""
+        return all(
+            step.depends_on == ((previous.step_id,) if previous else ())
+            for previous, step in zip((None,) + self.steps, self.steps)
+        )
+
+    @property
+    def key(self) -> Tuple[int, datetime]:
+        """Cache key: pipeline id plus the newest updated_at of its rows."""
+        return (self.pipeline_id, self.version)
+
+    @property
+    def agent_ids(self) -> FrozenSet[int]:
+        return frozenset(part.agent_id for step in self.steps for part in step.fused or (step,))
+
+
+def build_plan_step(step: PipelineStep, depends_on: Tuple[int, ...] = ()) -> PlanStep:
+    """
+    Resolve a pipeline step into a plan step.
+
+    Args:
+        step: Pipeline step with its agent loaded
+        depends_on: Resolved IDs of the steps it reads from
+
+    Returns:
+        Plan step holding the agent built with the merged configuration
+    """
+    registry_name = step.agent.name if step.agent.is_plugin else step.agent.agent_type.value
+    config = {**(step.agent.config or {}), **(step.config or {})}
+    timeout = config.get("timeout_seconds", settings.step_timeout_seconds)
+
+    try:
+        agent = agent_registry.create_agent(registry_name, config=config)
+    except ValueError as e:
+        raise PlanCompilationError(f"Step {step.id} has an invalid config: {e}")
+    if agent is None:
+        raise PlanCompilationError(f"Agent '{registry_name}' is not registered")
+
+    return PlanStep(
+        step_id=step.id,
+        order=step.order,
+        agent_id=step.agent_id,
+        agent_name=step.agent.name,
+        registry_name=registry_name,
+        config=MappingProxyType(config),
+        agent=agent,
+        depends_on=depends_on,
+        timeout=float(timeout) if timeout else None,
+    )
+
+
+def resolve_dependencies(steps: Sequence[PipelineStep]) -> Dict[int, Tuple[int, ...]]:
+    """
+    Resolve the dependencies of each step.
+
+    Steps with ``depends_on`` left null keep the legacy behaviour of reading
+    from the previous step by order.
+
+    Args:
+        steps: Pipeline steps sorted by order
+
+    Returns:
+        Mapping of step ID to the IDs it depends on
+    """
+    step_ids = {step.id for step in steps}
+    dependencies = {}
+
+    for previous, step in zip([None] + list(steps), steps):
+        if step.depends_on is None:
+            dependencies[step.id] = (previous.id,) if previous else ()
+            continue
+
+        unknown = set(step.depends_on) - step_ids
+        if unknown:
+            raise PlanCompilationError(
+                f"Step {step.order} depends on unknown steps: {sorted(unknown)}"
+            )
+        dependencies[step.id] = tuple(dict.fromkeys(step.depends_on))
+
+    return dependencies
+
+
+def schedule_steps(
+    steps: Sequence[PipelineStep], dependencies: Dict[int, Tuple[int, ...]]
+) -> List[PipelineStep]:
+    """
+    Order steps topologically, breaking ties by step order.
+
+    Args:
+        steps: Pipeline steps
+        dependencies: Mapping of step ID to the IDs it depends on
+
+    Returns:
+        Steps in an order where every step follows its dependencies
+    """
+    by_id = {step.id: step for step in steps}
+    remaining = {step_id: len(deps) for step_id, deps in dependencies.items()}
+    dependents: Dict[int, List[int]] = {step_id: [] for step_id in by_id}
+    for step_id, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].append(step_id)
+
+    ready = [(by_id[step_id].order, step_id) for step_id, count in remaining.items() if not count]
+    heapq.heapify(ready)
+    scheduled = []
+
+    while ready:
+        _, step_id = heapq.heappop(ready)
+        scheduled.append(by_id[step_id])
+        for dependent in dependents[step_id]:
+            remaining[dependent] -= 1
+            if not remaining[dependent]:
+                heapq.heappush(ready, (by_id[dependent].order, dependent))
+
+    if len(scheduled) != len(steps):
+        cycle = sorted(by_id[step_id].order for step_id, count in remaining.items() if count)
+        raise PlanCompilationError(f"Pipeline steps form a cycle: {cycle}")
+
+    return scheduled
+
+
+def fuse_steps(steps: Sequence[PlanStep]) -> Tuple[PlanStep, ...]:
+    """
+    Replace runs of fusible steps with one fused step each.
+
+    A step joins the run of the step before it when it depends only on that
+    step and is its only consumer, so no other step sees the intermediate
+    output. The fused step keeps the ID of the last step of the run, so
+    dependents, sinks and checkpoints still refer to a step of the plan.
+
+    Args:
+        steps: Plan steps in topological order
+
+    Returns:
+        Plan steps in topological order
+    """
+    by_id = {step.step_id: step for step in steps}
+    consumers: Dict[int, List[int]] = {step.step_id: [] for step in steps}
+    for step in steps:
+        for dep in step.depends_on:
+            consumers[dep].append(step.step_id)
+
+    following: Dict[int, PlanStep] = {}
+    for step in steps:
+        if len(step.depends_on) != 1:
+            continue
+        previous = by_id[step.depends_on[0]]
+        if (
+            consumers[previous.step_id] == [step.step_id]
+            and is_fusible(previous.agent)
+            and is_fusible(step.agent)
+        ):
+            following[previous.step_id] = step
+
+    followers = {step.step_id for step in following.values()}
+    runs: Dict[int, List[PlanStep]] = {}
+    for step in steps:
+        if step.step_id in following and step.step_id not in followers:
+            run = [step]
+            while run[-1].step_id in following:
+                run.append(following[run[-1].step_id])
+            runs[run[-1].step_id] = run
+
+    in_runs = {part.step_id for run in runs.values() for part in run}
+    fused: List[PlanStep] = []
+    for step in steps:
+        if step.step_id in runs:
+            fused.append(fuse_run(runs[step.step_id]))
+        elif step.step_id not in in_runs:
+            fused.append(step)
+    return tuple(fused)
+
+
+def fuse_run(run: Sequence[PlanStep]) -> PlanStep:
+    """
+    Build the single step standing in for a run of fusible steps.
+
+    Args:
+        run: Steps each reading only from the one before it
+
+    Returns:
+        Plan step running a FusedAgent
+    """
+    agent = FusedAgent([part.agent for part in run])
+    timeouts = [part.timeout for part in run]
+    return PlanStep(
+        step_id=run[-1].step_id,
+        order=run[0].order,
+        agent_id=run[0].agent_id,
+        agent_name="+".join(part.agent_name for part in run),
+        registry_name="fused",
+        config=MappingProxyType(agent.config),
+        agent=agent,
+        depends_on=run[0].depends_on,
+        timeout=sum(timeouts) if all(timeouts) else None,
+        fused=tuple(run),
+    )
+
+
+async def compile_plan(db: AsyncSession, pipeline_id: int) -> Optional[ExecutionPlan]:
+    """
+    Load a pipeline with its steps and agents and compile it.
+
+    Runs of built-in transformers and enrichers are fused into single-pass
+    steps unless the pipeline config sets "fusion" to false.
+
+    Args:
+        db: Database session
+        pipeline_id: ID of the pipeline
+
+    Returns:
+        Execution plan or None if the pipeline does not exist
+    """
+    result = await db.execute(
+        select(Pipeline)
+        .options(selectinload(Pipeline.steps).selectinload(PipelineStep.agent))
+        .where(Pipeline.id == pipeline_id)
+    )
+    pipeline = result.scalar_one_or_none()
+    if pipeline is None:
+        return None
+
+    steps = sorted(pipeline.steps, key=lambda step: (step.order, step.id))
+    version = max(
+        [pipeline.updated_at]
+        + [step.updated_at for step in steps]
+        + [step.agent.updated_at for step in steps]
+    )
+
+    dependencies = resolve_dependencies(steps)
+    scheduled = schedule_steps(steps, dependencies)
+    consumed = {dep for deps in dependencies.values() for dep in deps}
+
+    fusion = bool((pipeline.config or {}).get("fusion", True))
+    plan_steps = tuple(build_plan_step(step, dependencies[step.id]) for step in scheduled)
+    if fusion:
+        plan_steps = fuse_steps(plan_steps)
+
+    return ExecutionPlan(
+        pipeline_id=pipeline.id,
+        status=pipeline.status,
+        version=version,
+        steps=plan_steps,
+        sinks=tuple(step.id for step in scheduled if step.id not in consumed),
+        fusion=fusion,
+    )
+
+
+class PlanCache:
+    """
+    In-memory cache of compiled plans, invalidated when pipelines or agents change.
+
+    A cache hit makes no database reads. Invalidations are broadcast through
+    Redis pub/sub to the plan caches of every other process, which drop the
+    same plans. A process that loses its subscription drops all its plans
+    once it is subscribed again, as it may have missed invalidations; the
+    TTL bounds staleness while Redis is unreachable.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = settings.plan_cache_ttl_seconds,
+        redis_url: Optional[str] = settings.redis_url,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.redis_url = redis_url
+        self._plans: Dict[int, Tuple[ExecutionPlan, float]] = {}
+        # Identifies this cache's own broadcasts, which it has already applied
+        self._source = uuid.uuid4().hex
+        self._redis: Optional[Redis] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _connect(self) -> Redis:
+        return Redis.from_url(
+            self.redis_url,
+            max_connections=settings.redis_max_connections,
+            decode_responses=True,
+            socket_connect_timeout=1,
+        )
+
+    def get(self, pipeline_id: int) -> Optional[ExecutionPlan]:
+        """Get a cached plan without touching the database."""
+        entry = self._plans.get(pipeline_id)
+        if entry is None:
+            return None
+
+        plan, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._plans.pop(pipeline_id, None)
+            return None
+        return plan
+
+    def put(self, plan: ExecutionPlan):
+        """Cache a plan unless a newer version is already cached."""
+        current = self.get(plan.pipeline_id)
+        if current is not None and current.version > plan.version:
+            return
+        self._plans[plan.pipeline_id] = (plan, time.monotonic() + self.ttl_seconds)
+
+    async def get_or_compile(self, db: AsyncSession, pipeline_id: int) -> Optional[ExecutionPlan]:
+        """
+        Get a cached plan, compiling it on a miss.
+
+        Args:
+            db: Database session used only on a cache miss
+            pipeline_id: ID of the pipeline
+
+        Returns:
+            Execution plan or None if the pipeline does not exist
+        """
+        plan = self.get(pipeline_id)
+        if plan is None:
+            plan = await compile_plan(db, pipeline_id)
+            if plan is not None:
+                self.put(plan)
+        return plan
+
+    def invalidate(self, pipeline_id: int, broadcast: bool = True):
+        """
+        Drop the plan of a pipeline.
+
+        Args:
+            pipeline_id: ID of the pipeline
+            broadcast: Also drop it from the plan caches of other processes
+        """
+        self._plans.pop(pipeline_id, None)
+        if broadcast:
+            self._broadcast({"pipeline_id": pipeline_id})
+
+    def invalidate_agent(self, agent_id: int, broadcast: bool = True):
+        """
+        Drop every plan that uses an agent.
+
+        Args:
+            agent_id: ID of the agent
+            broadcast: Also drop them from the plan caches of other processes
+        """
+        for pipeline_id, (plan, _) in list(self._plans.items()):
+            if agent_id in plan.agent_ids:
+                self._plans.pop(pipeline_id, None)
+        if broadcast:
+            self._broadcast({"agent_id": agent_id})
+
+    def clear(self):
+        """Drop all plans."""
+        self._plans.clear()
+
+    def _broadcast(self, message: Dict[str, Any]):
+        """Publish an invalidation in the background, without waiting for Redis."""
+        if not self.redis_url:
+            return
+        task = asyncio.get_running_loop().create_task(
+            self._publish({**message, "source": self._source})
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, message: Dict[str, Any]):
+        if self._redis is None:
+            self._redis = self._connect()
+        try:
+            await self._redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            logger.warning("Could not broadcast plan invalidation: %s", e)
+
+    def _apply(self, message: Dict[str, Any]):
+        """Apply an invalidation broadcast by another process."""
+        if message.get("source") == self._source:
+            return
+        if message.get("pipeline_id") is not None:
+            self.invalidate(message["pipeline_id"], broadcast=False)
+        if message.get("agent_id") is not None:
+            self.invalidate_agent(message["agent_id"], broadcast=False)
+
+    def start(self) -> Optional[asyncio.Task]:
+        """
+        Apply the invalidations other processes broadcast, until stopped.
+
+        Returns:
+            The listening task, or None without Redis
+        """
+        if not self.redis_url:
+            return None
+        task = asyncio.create_task(self._listen())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _listen(self):
+        while True:
+            redis = self._connect()
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Invalidations broadcast while not subscribed were missed
+                self.clear()
+                async for message in pubsub.listen():
+                    self._apply(json.loads(message["data"]))
+            except (RedisError, OSError, asyncio.TimeoutError) as e:
+                logger.warning("Plan invalidation listener lost its Redis connection: %s", e)
+            finally:
+                await pubsub.close()
+                await redis.close()
+            await asyncio.sleep(REDIS_RETRY_SECONDS)
+
+    async def stop(self):
+        """Stop listening and close the connection used for broadcasting."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+# Global plan cache instance
+plan_cache = PlanCache()
@@ -0,0 +1,122 @@
+"""
+Explanation of compiled execution plans with cost estimates.
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+
+from app.agents.base_agent import BaseAgent
+from app.core.config import get_settings
+from app.services.pipeline_executor import PipelineExecutor
+from app.services.pipeline_plan import ExecutionPlan, PlanStep
+from app.services.step_stats import StepStatistics
+
+settings = get_settings()
+
+
+def agent_class(agent: BaseAgent) -> str:
+    return f"{type(agent).__module__}.{type(agent).__qualname__}"
+
+
+def estimate_seconds(
+    statistics: Optional[Dict[str, float]], records: int, batch_size: int
+) -> Optional[float]:
+    """
+    Estimate how long a step takes over a number of records.
+
+    Args:
+        statistics: Summary of the recent calls of the step
+        records: Number of records to run
+        batch_size: Records handed to the step per call
+
+    Returns:
+        Estimated seconds, or None without statistics
+    """
+    if statistics is None:
+        return None
+    calls = math.ceil(records / batch_size) if records else 0
+    return calls * statistics["seconds_per_call"] + records * statistics["seconds_per_record"]
+
+
+def _describe_step(step: PlanStep) -> Dict[str, Any]:
+    return {
+        "step_id": step.step_id,
+        "order": step.order,
+        "agent_name": step.agent_name,
+        "agent_class": agent_class(step.agent),
+        "registry_name": step.registry_name,
+        "config": dict(step.config),
+    }
+
+
+async def explain_plan(
+    plan: ExecutionPlan,
+    executor: PipelineExecutor,
+    statistics: StepStatistics,
+    records: int = 1,
+    batch_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Describe how a plan would run and estimate where the time goes.
+
+    Each step is estimated from the recent calls of steps with the same
+    agent and config. The total follows the critical path of the plan, as
+    independent branches run in parallel; steps without statistics count
+    as free and are listed separately.
+
+    Args:
+        plan: Compiled plan of the pipeline
+        executor: Executor whose caching and limits apply
+        statistics: Rolling step statistics
+        records: Number of records to estimate for
+        batch_size: Records per step call; defaults to the stream window size
+
+    Returns:
+        Plan description with per-step and total estimates
+    """
+    batch_size = max(1, min(records, batch_size or settings.stream_window_size))
+    summaries = await statistics.get_many(step.fingerprint for step in plan.steps)
+    limiter = executor.agent_limiter
+
+    steps: List[Dict[str, Any]] = []
+    finished: Dict[int, float] = {}
+    unestimated: List[int] = []
+    for step in plan.steps:
+        summary = summaries.get(step.fingerprint)
+        estimate = estimate_seconds(summary, records, batch_size)
+        if estimate is None:
+            unestimated.append(step.step_id)
+        start = max((finished[dep] for dep in step.depends_on), default=0.0)
+        finished[step.step_id] = start + (estimate or 0.0)
+
+        limits = [limiter.limits.get(key, limiter.default_limit) for key in step.limit_keys]
+        limit = min((limit for limit in limits if limit > 0), default=0)
+        steps.append(
+            {
+                **_describe_step(step),
+                "depends_on": list(step.depends_on),
+                "sink": step.step_id in plan.sinks,
+                "timeout_seconds": step.timeout,
+                "runs_in": "process_pool" if step.agent.cpu_bound else "event_loop",
+                "cached": executor.result_cache is not None and step.agent.is_deterministic(),
+                "copy_on_write": step.agent.copy_on_write,
+                "concurrency_limit": limit if limit > 0 else None,
+                "fused_steps": [_describe_step(part) for part in step.fused],
+                "statistics": summary,
+                "estimated_seconds": estimate,
+            }
+        )
+
+    return {
+        "pipeline_id": plan.pipeline_id,
+        "version": plan.version,
+        "status": plan.status,
+        "is_chain": plan.is_chain,
+        "fusion": plan.fusion,
+        "records": records,
+        "batch_size": batch_size,
+        "steps": steps,
+        "sinks": list(plan.sinks),
+        "estimated_seconds": max((finished[sink] for sink in plan.sinks), default=0.0),
+        "unestimated_steps": unestimated,
+    }
@@ -0,0 +1,232 @@
+"""
+Live execution progress events fanned out through Redis pub/sub.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
+
+from app.core import metrics
+from app.core.config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# How long to drop events after a Redis error before trying it again
+REDIS_RETRY_SECONDS = 5.0
+
+# Most events sent to Redis in one round trip
+SEND_BATCH_SIZE = 500
+
+# Put on listener queues when the pub/sub connection is lost
+_CLOSED = object()
+
+
+def execution_channel(execution_id: int) -> str:
+    return f"progress:execution:{execution_id}"
+
+
+def pipeline_channel(pipeline_id: int) -> str:
+    return f"progress:pipeline:{pipeline_id}"
+
+
+class ExecutionProgress:
+    """
+    Publishes execution events and fans them out to local listeners.
+
+    publish never blocks the execution: events go to a bounded outbox per
+    event loop and a background task sends them to Redis in pipelined
+    batches, in order. Every event goes to its pipeline's channel and, when
+    it belongs to one execution, to that execution's channel.
+
+    Listeners in one process share a single pub/sub connection; each gets a
+    bounded queue that drops its oldest events when the client falls behind.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = settings.redis_url,
+        queue_size: int = settings.progress_queue_size,
+    ):
+        self.redis_url = redis_url
+        self.queue_size = queue_size
+        self._outboxes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Queue]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._tasks: Set[asyncio.Task] = set()
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._pubsub: Optional[PubSub] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    def _connect(self) -> Redis:
+        return Redis.from_url(
+            self.redis_url,
+            max_connections=settings.redis_max_connections,
+            decode_responses=True,
+            socket_connect_timeout=1,
+        )
+
+    def publish(self, event: Dict[str, Any]):
+        """
+        Queue an event for publishing without waiting for Redis.
+
+        Args:
+            event: Event with at least "event" and "pipeline_id" set
+        """
+        if not self.redis_url:
+            return
+
+        loop = asyncio.get_running_loop()
+        outbox = self._outboxes.get(loop)
+        if outbox is None:
+            outbox = self._outboxes[loop] = asyncio.Queue(maxsize=self.queue_size)
+            task = loop.create_task(self._send(outbox))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        try:
+            outbox.put_nowait(event)
+        except asyncio.QueueFull:
+            metrics.progress_events_dropped_total.inc()
+
+    async def _send(self, outbox: asyncio.Queue):
+        """Drain an outbox into Redis until cancelled."""
+        redis = self._connect()
+        retry_at = 0.0
+        try:
+            while True:
+                events = [await outbox.get()]
+                while not outbox.empty() and len(events) < SEND_BATCH_SIZE:
+                    events.append(outbox.get_nowait())
+
+                if time.monotonic() < retry_at:
+                    metrics.progress_events_dropped_total.inc(len(events))
+                    continue
+
+                try:
+                    async with redis.pipeline(transaction=False) as pipe:
+                        for event in events:
+                            data = json.dumps(event, default=str)
+                            pipe.publish(pipeline_channel(event["pipeline_id"]), data)
+                            if event.get("execution_id") is not None:
+                                pipe.publish(execution_channel(event["execution_id"]), data)
+                        await pipe.execute()
+                    metrics.progress_events_published_total.inc(len(events))
+                except (RedisError, OSError, asyncio.TimeoutError) as e:
+                    logger.warning("Dropping progress events after Redis error: %s", e)
+                    metrics.progress_events_dropped_total.inc(len(events))
+                    retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        finally:
+            await redis.close()
+
+    @asynccontextmanager
+    async def subscribe(
+        self, channel: str, heartbeat: Optional[float] = None
+    ) -> AsyncIterator[AsyncIterator[Optional[Dict[str, Any]]]]:
+        """
+        Subscribe to the events published on a channel from now on.
+
+        Args:
+            channel: Channel from execution_channel or pipeline_channel
+            heartbeat: Seconds without events after which None is yielded
+
+        Yields:
+            Async iterator of events in publishing order, with None for
+            heartbeats. It ends at once if subscribing fails and when the
+            Redis connection is lost, so callers subscribe again or fall
+            back to polling.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        listeners = self._listeners.setdefault(channel, set())
+        listeners.add(queue)
+        try:
+            try:
+                # Other listeners of the channel may still hold a lost connection
+                if len(listeners) == 1 or self._pubsub is None:
+                    if self._pubsub is None:
+                        self._pubsub = self._connect().pubsub(ignore_subscribe_messages=True)
+                    await self._pubsub.subscribe(channel)
+                if self._reader is None or self._reader.done():
+                    self._reader = asyncio.create_task(self._read())
+            except (RedisError, OSError, asyncio.TimeoutError) as e:
+                logger.warning("Progress listener could not subscribe: %s", e)
+                queue.put_nowait(_CLOSED)
+
+            yield self._drain(queue, heartbeat)
+        finally:
+            listeners.discard(queue)
+            if not listeners:
+                del self._listeners[channel]
+                if self._pubsub is not None:
+                    try:
+                        await self._pubsub.unsubscribe(channel)
+                    except (RedisError, OSError, asyncio.TimeoutError):
+                        pass
+
+    @staticmethod
+    async def _drain(
+        queue: asyncio.Queue, heartbeat: Optional[float]
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if event is _CLOSED:
+                return
+            yield event
+
+    async def _read(self):
+        """Dispatch pub/sub messages to the local listeners while there are any."""
+        pubsub = self._pubsub
+        try:
+            while self._listeners:
+                message = await pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                event = json.loads(message["data"])
+                for queue in list(self._listeners.get(message["channel"], ())):
+                    self._offer(queue, event)
+        except (RedisError, OSError, asyncio.TimeoutError, RuntimeError) as e:
+            # RuntimeError: the pub/sub never got a connection because no subscribe succeeded
+            logger.warning("Progress listener lost its Redis connection: %s", e)
+            if self._pubsub is pubsub:
+                self._pubsub = None
+            for listeners in self._listeners.values():
+                for queue in listeners:
+                    self._offer(queue, _CLOSED)
+            await pubsub.close()
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Any):
+        """Put an event on a listener queue, dropping its oldest event if it is full."""
+        if queue.full():
+            queue.get_nowait()
+            metrics.progress_events_dropped_total.inc()
+        queue.put_nowait(event)
+
+    async def close(self):
+        """Stop sending and listening."""
+        tasks: List[asyncio.Task] = list(self._tasks)
+        if self._reader is not None:
+            tasks.append(self._reader)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+
+
+# Global execution progress instance
+execution_progress = ExecutionProgress()
@@ -0,0 +1,340 @@
+"""
+Retention of execution and event history, with archival to compressed files.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import tempfile
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, Table, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.models import (
+    ArchiveMember,
+    Event,
+    ExecutionCheckpoint,
+    ExecutionStatus,
+    Pipeline,
+    PipelineExecution,
+    RetentionArchive,
+)
+from app.services.blob_store import BlobError, BlobStore, blob_store, escape, is_blob_ref
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# Executions in these states are never archived, as they may still change
+TERMINAL_STATUSES = (ExecutionStatus.SUCCESS, ExecutionStatus.FAILED, ExecutionStatus.CANCELLED)
+
+# Rows per gzip member of an archive file; reading one row decompresses one member
+ARCHIVE_BLOCK_ROWS = 100
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+class RetentionService:
+    """
+    Moves old executions and events out of the database into archive files.
+
+    Rows past their retention period are archived in chunks of batch_size,
+    each in its own short transaction: the chunk is locked and deleted, the
+    deleted rows are written to gzipped JSON Lines files partitioned by the
+    date the rows were created, and a summary row is recorded per file.
+    Pending and running executions are left alone; the delete checks this
+    again, so an execution that was resumed after it was selected is kept.
+
+    Payloads offloaded to the blob store are copied into the archive, so
+    archive files do not depend on blobs. The blobs themselves are kept, as
+    identical payloads of rows still in the database share them.
+
+    Files are written as a series of gzip members of ARCHIVE_BLOCK_ROWS
+    rows, which gzip tools read as one stream. The offset and ID range of
+    every member is recorded as an ArchiveMember, so an archived row is read
+    back by decompressing one member of one file.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        archive_path: str = settings.retention_archive_path,
+        batch_size: int = settings.retention_batch_size,
+        execution_retention_days: int = settings.execution_retention_days,
+        event_retention_days: int = settings.event_retention_days,
+        blobs: BlobStore = blob_store,
+    ):
+        self.session_factory = session_factory
+        self.archive_path = Path(archive_path)
+        self.batch_size = batch_size
+        self.execution_retention_days = execution_retention_days
+        self.event_retention_days = event_retention_days
+        self.blobs = blobs
+
+    async def run(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Archive everything past its retention period.
+
+        Args:
+            now: Time to measure retention periods from; defaults to the current time
+
+        Returns:
+            Number of archived executions and events
+        """
+        now = now or datetime.utcnow()
+        async with self.session_factory() as db:
+            result = await db.execute(select(Pipeline.id, Pipeline.retention_days))
+            policies = result.all()
+
+        archived = {"executions": 0, "events": 0}
+        for pipeline_id, days in policies:
+            days = self.execution_retention_days if days is None else days
+            if days > 0:
+                archived["executions"] += await self.archive_executions(
+                    pipeline_id, now - timedelta(days=days)
+                )
+        if self.event_retention_days > 0:
+            archived["events"] = await self.archive_events(
+                now - timedelta(days=self.event_retention_days)
+            )
+        return archived
+
+    async def archive_executions(self, pipeline_id: int, cutoff: datetime) -> int:
+        """
+        Archive the finished executions of a pipeline created before a cutoff.
+
+        Args:
+            pipeline_id: ID of the pipeline
+            cutoff: Executions created before this time are archived
+
+        Returns:
+            Number of archived executions
+        """
+        table = PipelineExecution.__table__
+        return await self._archive(
+            "execution",
+            table,
+            (
+                table.c.pipeline_id == pipeline_id,
+                table.c.created_at < cutoff,
+                table.c.status.in_(TERMINAL_STATUSES),
+            ),
+            pipeline_id=pipeline_id,
+            dependents=(ExecutionCheckpoint.__table__.c.execution_id,),
+            payloads=("input_data", "output_data"),
+        )
+
+    async def archive_events(self, cutoff: datetime) -> int:
+        """
+        Archive the events created before a cutoff.
+
+        Args:
+            cutoff: Events created before this time are archived
+
+        Returns:
+            Number of archived events
+        """
+        table = Event.__table__
+        return await self._archive(
+            "event", table, (table.c.created_at < cutoff,), payloads=("payload",)
+        )
+
+    async def _archive(
+        self,
+        kind: str,
+        table: Table,
+        conditions: Sequence[Any],
+        pipeline_id: Optional[int] = None,
+        dependents: Sequence[Column] = (),
+        payloads: Sequence[str] = (),
+    ) -> int:
+        total = 0
+        while True:
+            async with self.session_factory() as db:
+                # Locked until the chunk commits, so the rows cannot change in between
+                result = await db.execute(
+                    select(table)
+                    .where(*conditions)
+                    .order_by(table.c.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                selected = [dict(row._mapping) for row in result]
+                if not selected:
+                    break
+
+                ids = [row["id"] for row in selected]
+                # Dependent rows go first, for databases that do not cascade deletes
+                for column in dependents:
+                    await db.execute(delete(column.table).where(column.in_(ids)))
+                result = await db.execute(
+                    delete(table).where(table.c.id.in_(ids), *conditions).returning(table.c.id)
+                )
+                deleted = set(result.scalars())
+                rows = [row for row in selected if row["id"] in deleted]
+
+                for row in rows:
+                    for column in payloads:
+                        row[column] = await self._inline(row[column])
+                files = await asyncio.to_thread(self._write_files, kind, pipeline_id, rows)
+                for summary, members in files:
+                    archive_id = (
+                        await db.execute(
+                            insert(RetentionArchive).values(summary).returning(RetentionArchive.id)
+                        )
+                    ).scalar_one()
+                    await db.execute(
+                        insert(ArchiveMember),
+                        [{"archive_id": archive_id, "kind": kind, **member} for member in members],
+                    )
+                await db.commit()
+
+            total += len(rows)
+            if len(selected) < self.batch_size:
+                break
+
+        if total:
+            logger.info("Archived %d %s rows", total, kind)
+        return total
+
+    async def _inline(self, value: Any) -> Any:
+        """Replace a blob reference with its payload, escaped as it would be stored inline."""
+        if not is_blob_ref(value):
+            return value
+        try:
+            return escape(await self.blobs.load(value))
+        except BlobError as e:
+            logger.warning("Archiving a blob reference that cannot be read: %s", e)
+            return value
+
+    def _write_files(
+        self, kind: str, pipeline_id: Optional[int], rows: List[Dict[str, Any]]
+    ) -> List[Tuple[Dict[str, Any], List[Dict[str, int]]]]:
+        """
+        Write a chunk of rows to one file per creation date.
+
+        Returns:
+            Per file, its summary and the ID range and offset of each gzip member
+        """
+        partitions: Dict[date, List[Dict[str, Any]]] = {}
+        for row in rows:
+            partitions.setdefault(row["created_at"].date(), []).append(row)
+
+        files = []
+        for partition_date, partition in partitions.items():
+            first_id, last_id = partition[0]["id"], partition[-1]["id"]
+            directory = Path(f"{kind}s")
+            if pipeline_id is not None:
+                directory /= f"pipeline={pipeline_id}"
+            # Named after its rows, so a chunk archived again overwrites its own file
+            path = (
+                directory
+                / f"date={partition_date.isoformat()}"
+                / f"{kind}s-{first_id}-{last_id}.jsonl.gz"
+            )
+
+            data: List[bytes] = []
+            members: List[Dict[str, int]] = []
+            size = 0
+            for start in range(0, len(partition), ARCHIVE_BLOCK_ROWS):
+                block = partition[start : start + ARCHIVE_BLOCK_ROWS]
+                lines = "".join(
+                    json.dumps(row, default=_json_default, separators=(",", ":")) + "\n"
+                    for row in block
+                )
+                members.append(
+                    {"first_id": block[0]["id"], "last_id": block[-1]["id"], "offset": size}
+                )
+                data.append(gzip.compress(lines.encode()))
+                size += len(data[-1])
+            _write_atomic(self.archive_path / path, b"".join(data))
+
+            statuses = Counter(
+                str(getattr(row["status"], "value", row["status"])) for row in partition
+            )
+            summary = {
+                "kind": kind,
+                "pipeline_id": pipeline_id,
+                "partition_date": partition_date,
+                "path": path.as_posix(),
+                "first_id": first_id,
+                "last_id": last_id,
+                "rows": len(partition),
+                "status_counts": dict(statuses),
+                "oldest_at": min(row["created_at"] for row in partition),
+                "newest_at": max(row["created_at"] for row in partition),
+                "size_bytes": size,
+            }
+            files.append((summary, members))
+        return files
+
+    def _read_row(self, path: str, offset: int, row_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.archive_path / path, "rb") as f:
+                f.seek(offset)
+                # The row is in the member starting at the offset
+                with gzip.open(f, "rt") as lines:
+                    for line in lines:
+                        row = json.loads(line)
+                        if row["id"] == row_id:
+                            return row
+        except FileNotFoundError:
+            logger.warning("Archive file %s is missing", path)
+        return None
+
+    async def find(self, db: AsyncSession, kind: str, row_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Fetch an archived row.
+
+        Args:
+            db: Database session
+            kind: "execution" or "event"
+            row_id: ID the row had in the database
+
+        Returns:
+            Column values of the row, with timestamps as ISO strings, or None
+        """
+        # Members of different files can cover overlapping ranges, as IDs of
+        # different pipelines and dates interleave
+        result = await db.execute(
+            select(RetentionArchive.path, ArchiveMember.offset)
+            .join(RetentionArchive, RetentionArchive.id == ArchiveMember.archive_id)
+            .where(
+                ArchiveMember.kind == kind,
+                ArchiveMember.first_id <= row_id,
+                ArchiveMember.last_id >= row_id,
+            )
+        )
+        for path, offset in result.all():
+            row = await asyncio.to_thread(self._read_row, path, offset, row_id)
+            if row is not None:
+                return row
+        return None
+
+
+# Global retention service instance
+retention_service = RetentionService()
@@ -0,0 +1,199 @@
+"""
+Fair-share scheduler for pipeline executions.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.models import ExecutionPriority, ExecutionStatus, PipelineExecution
+
+settings = get_settings()
+
+
+# Namespaces of the advisory locks that serialize admissions per class and per user
+ADMISSION_LOCK_CLASS = 1
+ADMISSION_LOCK_USER = 2
+
+
+class AdmissionError(Exception):
+    """Raised when an execution is refused because too much work is pending."""
+
+
+async def check_admission(
+    db: AsyncSession, priority: ExecutionPriority, user_id: Optional[int], records: int = 1
+):
+    """
+    Refuse new executions when their class or their user has too much work pending.
+
+    Pending work is counted from PipelineExecution rows, so the limits hold
+    across every API node and worker. Call it in the transaction that then
+    inserts the executions and commit right after: on PostgreSQL it takes an
+    advisory lock per class and per user until the transaction ends, so
+    concurrent requests cannot all pass the same count.
+
+    Args:
+        db: Database session
+        priority: Priority class of the new executions
+        user_id: ID of the submitting user
+        records: Number of executions about to be created
+
+    Raises:
+        AdmissionError: If admitting the executions would exceed a limit
+    """
+    postgres = db.get_bind().dialect.name == "postgresql"
+    max_pending = settings.scheduler_max_pending_map.get(priority.value)
+    if max_pending is not None:
+        if postgres:
+            # Always the class lock before the user lock, so admissions cannot deadlock
+            await db.execute(
+                select(
+                    func.pg_advisory_xact_lock(
+                        ADMISSION_LOCK_CLASS, list(ExecutionPriority).index(priority)
+                    )
+                )
+            )
+        pending = await db.scalar(
+            select(func.count(PipelineExecution.id)).where(
+                PipelineExecution.status == ExecutionStatus.PENDING,
+                PipelineExecution.priority == priority,
+            )
+        )
+        if pending + records > max_pending:
+            metrics.scheduler_rejections_total.labels(priority.value).inc()
+            raise AdmissionError(f"Too many pending {priority.value} executions")
+
+    if user_id is not None and settings.scheduler_max_pending_per_user:
+        if postgres:
+            await db.execute(select(func.pg_advisory_xact_lock(ADMISSION_LOCK_USER, user_id)))
+        pending = await db.scalar(
+            select(func.count(PipelineExecution.id)).where(
+                PipelineExecution.status == ExecutionStatus.PENDING,
+                PipelineExecution.submitted_by == user_id,
+            )
+        )
+        if pending + records > settings.scheduler_max_pending_per_user:
+            metrics.scheduler_rejections_total.labels(priority.value).inc()
+            raise AdmissionError("Too many pending executions for this user")
+
+
+class FairShareScheduler:
+    """
+    Hands out execution slots by weighted fair queuing.
+
+    Waiting executions are ordered by a virtual finish tag. The tag grows
+    with the cost of the execution divided by the weight of its priority
+    class, and it continues from the last tag of the same user and of the
+    same pipeline within that class. A user or pipeline with a lot of queued
+    work is therefore interleaved with everyone else instead of running
+    first, and heavier classes get proportionally more slots.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.executor_max_concurrency,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrency: Number of executions allowed to run at once
+            weights: Share of each priority class, by class name
+        """
+        self.max_concurrency = max_concurrency
+        self.weights = settings.scheduler_weights_map if weights is None else weights
+        self._running = 0
+        self._queue: List[Tuple[float, int, asyncio.Future, ExecutionPriority]] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[Hashable, float] = {}
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future, _ in self._queue if not future.cancelled())
+
+    def _finish_tag(
+        self,
+        priority: ExecutionPriority,
+        user_id: Optional[int],
+        pipeline_id: int,
+        cost: float,
+    ) -> float:
+        flows = ((priority, "user", user_id), (priority, "pipeline", pipeline_id))
+        start = max([self._virtual_time] + [self._last_finish.get(flow, 0.0) for flow in flows])
+        finish = start + cost / self.weights.get(priority.value, 1.0)
+        for flow in flows:
+            self._last_finish[flow] = finish
+        return finish
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: ExecutionPriority,
+        user_id: Optional[int],
+        pipeline_id: int,
+        cost: float = 1,
+    ) -> AsyncIterator[None]:
+        """
+        Hold an execution slot, waiting for a fair turn if all slots are taken.
+
+        Args:
+            priority: Priority class of the execution
+            user_id: ID of the submitting user
+            pipeline_id: ID of the pipeline
+            cost: Relative amount of work, such as the number of records
+        """
+        started = time.perf_counter()
+        if self._running < self.max_concurrency and not self._queue:
+            self._running += 1
+            metrics.scheduler_running.set(self._running)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            tag = self._finish_tag(priority, user_id, pipeline_id, cost)
+            heapq.heappush(self._queue, (tag, next(self._sequence), future, priority))
+            metrics.scheduler_queue_depth.labels(priority.value).inc()
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just as the wait was cancelled
+                    self._release()
+                else:
+                    future.cancel()
+                    metrics.scheduler_queue_depth.labels(priority.value).dec()
+                raise
+
+        metrics.scheduler_queue_wait_seconds.labels(priority.value).observe(
+            time.perf_counter() - started
+        )
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        """Hand the slot to the waiting execution with the smallest finish tag."""
+        while self._queue:
+            tag, _, future, priority = heapq.heappop(self._queue)
+            if future.cancelled():
+                continue
+            self._virtual_time = tag
+            metrics.scheduler_queue_depth.labels(priority.value).dec()
+            future.set_result(None)
+            return
+
+        self._running -= 1
+        metrics.scheduler_running.set(self._running)
+        if self._running == 0:
+            # Idle: every flow is back to an equal start
+            self._virtual_time = 0.0
+            self._last_finish.clear()
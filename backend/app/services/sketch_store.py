@@ -0,0 +1,226 @@
+"""
+Shared streaming sketches of analyzer agents, merged in Redis.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, WatchError
+
+from app.agents.sketches import StreamSketches
+from app.core.config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# How long to keep sketches local after a Redis error before trying it again
+REDIS_RETRY_SECONDS = 30.0
+
+# Attempts at merging before giving up when other instances keep writing the key
+MERGE_ATTEMPTS = 10
+
+
+def sketch_key(stream: str) -> str:
+    return f"sketches:{stream}"
+
+
+class SketchStore:
+    """
+    Keeps one set of sketches per stream in Redis.
+
+    Instances sketch their own records and merge the difference into the
+    stored sketches with an optimistic transaction: the key is watched,
+    read, merged in process and written back, and the merge is retried if
+    another instance wrote the key in between. Without Redis every
+    instance keeps only its own view.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = settings.redis_url,
+        ttl_seconds: int = settings.analyzer_sketch_ttl_seconds,
+        max_fields: int = settings.analyzer_sketch_max_fields,
+    ):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self.max_fields = max_fields
+        self._redis: Optional[Redis] = None
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_retry_at = 0.0
+
+    def _get_redis(self) -> Optional[Redis]:
+        if not self.redis_url or time.monotonic() < self._redis_retry_at:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis_loop = loop
+            self._redis = Redis.from_url(
+                self.redis_url,
+                max_connections=settings.redis_max_connections,
+                socket_connect_timeout=1,
+                socket_timeout=1,
+            )
+        return self._redis
+
+    def _redis_failed(self, error: Exception):
+        logger.warning("Sketch store skipping Redis after error: %s", error)
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _parse(self, stream: str, data: Optional[bytes]) -> StreamSketches:
+        if data is None:
+            return StreamSketches(self.max_fields)
+        try:
+            return StreamSketches.loads(data, self.max_fields)
+        except ValueError as e:
+            # Unreadable sketches are replaced rather than blocking the stream
+            logger.warning("Discarding sketches of stream %s: %s", stream, e)
+            return StreamSketches(self.max_fields)
+
+    async def load(self, stream: str) -> Optional[StreamSketches]:
+        """
+        Read the shared sketches of a stream.
+
+        Args:
+            stream: Stream name
+
+        Returns:
+            The sketches, empty if none are stored, or None without Redis
+        """
+        redis = self._get_redis()
+        if redis is None:
+            return None
+        try:
+            data = await redis.get(sketch_key(stream))
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self._redis_failed(e)
+            return None
+        return self._parse(stream, data)
+
+    async def merge(self, stream: str, delta: StreamSketches) -> Optional[StreamSketches]:
+        """
+        Merge sketches of new records into the shared sketches of a stream.
+
+        Args:
+            stream: Stream name
+            delta: Sketches of records not merged yet
+
+        Returns:
+            The shared sketches after the merge, or None if it did not happen
+        """
+        redis = self._get_redis()
+        if redis is None:
+            return None
+        key = sketch_key(stream)
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                for _ in range(MERGE_ATTEMPTS):
+                    try:
+                        await pipe.watch(key)
+                        merged = self._parse(stream, await pipe.get(key))
+                        merged.merge(delta)
+                        pipe.multi()
+                        pipe.set(key, merged.dumps(), ex=self.ttl_seconds)
+                        await pipe.execute()
+                        return merged
+                    except WatchError:
+                        continue
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self._redis_failed(e)
+            return None
+        logger.warning("Gave up merging sketches of stream %s after contention", stream)
+        return None
+
+    async def close(self):
+        """Close the Redis connection."""
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+# Global sketch store instance
+sketch_store = SketchStore()
+
+
+class SketchStream:
+    """
+    One instance's view of a stream's sketches.
+
+    Records are compared with the view and added to it and to a delta of
+    the records not yet merged into Redis. Every flush_seconds the delta is
+    merged into the shared sketches, which then replace the view, so the
+    view covers the records of every instance up to the last merge plus
+    this instance's since. Records of an instance dropped between merges
+    are lost to the shared sketches.
+
+    Args:
+        stream: Stream name, shared by the instances that sketch together
+        store: Where shared sketches are kept
+        flush_seconds: Seconds between merges
+    """
+
+    def __init__(
+        self,
+        stream: str,
+        store: SketchStore = sketch_store,
+        flush_seconds: float = settings.analyzer_sketch_flush_seconds,
+    ):
+        self.stream = stream
+        self.store = store
+        self.flush_seconds = flush_seconds
+        self.view = StreamSketches(store.max_fields)
+        self.delta = StreamSketches(store.max_fields)
+        self._loaded = False
+        self._synced_at = time.monotonic()
+        self._syncing = False
+
+    def observe(self, record: Mapping) -> Dict[str, Dict[str, Any]]:
+        """
+        Compare a record with the records seen before it, then add it.
+
+        Args:
+            record: The record
+
+        Returns:
+            Comparison of each sketched field, as FieldSketch.compare
+        """
+        return self.view.observe(record, self.delta if self.store.redis_url else None)
+
+    async def sync(self, force: bool = False):
+        """
+        Load the shared sketches on first use, then merge the delta when due.
+
+        Args:
+            force: Merge the delta even if flush_seconds have not passed
+        """
+        if self._syncing or not self.store.redis_url:
+            return
+        self._syncing = True
+        try:
+            if not self._loaded:
+                shared = await self.store.load(self.stream)
+                if shared is not None:
+                    self._loaded = True
+                    self._replace_view(shared)
+
+            due = time.monotonic() - self._synced_at >= self.flush_seconds
+            if self.delta and (force or due):
+                self._synced_at = time.monotonic()
+                delta, self.delta = self.delta, StreamSketches(self.store.max_fields)
+                shared = await self.store.merge(self.stream, delta)
+                if shared is None:
+                    # Kept for the next merge, with the records seen meanwhile
+                    delta.merge(self.delta)
+                    self.delta = delta
+                else:
+                    self._replace_view(shared)
+        finally:
+            self._syncing = False
+
+    def _replace_view(self, shared: StreamSketches):
+        # Records added while Redis was being read are in the delta too
+        shared.merge(self.delta)
+        self.view = shared
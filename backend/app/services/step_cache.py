@@ -0,0 +1,204 @@
+"""
+Content-addressed cache of deterministic step outputs.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.agents.base_agent import BaseAgent
+from app.agents.record import json_default
+from app.core import metrics
+from app.core.config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# How long to skip Redis after an error before trying it again
+REDIS_RETRY_SECONDS = 30.0
+
+
+def step_cache_key(agent: BaseAgent, record: Dict[str, Any]) -> Optional[str]:
+    """
+    Hash an agent call into a cache key.
+
+    The key covers the agent class, its version, its effective config and the
+    input record, so any change to one of them misses the cache.
+
+    Args:
+        agent: Deterministic agent
+        record: Input record
+
+    Returns:
+        Hex digest, or None if the call cannot be serialized exactly
+    """
+    agent_class = type(agent)
+    call = [
+        f"{agent_class.__module__}.{agent_class.__qualname__}",
+        agent.version,
+        agent.config,
+        record,
+    ]
+    try:
+        payload = json.dumps(call, sort_keys=True, separators=(",", ":"), default=json_default)
+    except (TypeError, ValueError):
+        return None
+    # Calls that differ only in what JSON loses, such as tuples or int keys, would share a key
+    if json.loads(payload) != call:
+        return None
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StepResultCache:
+    """
+    Two-tier cache of step outputs: an in-process LRU in front of Redis.
+
+    Values are stored as JSON so every hit returns a fresh copy; outputs that
+    JSON does not carry exactly, such as tuples or int keys, are not cached.
+    Redis errors never fail an execution; the cache skips Redis for a while
+    and carries on with the local tier.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = settings.redis_url,
+        ttl_seconds: int = settings.step_cache_ttl_seconds,
+        local_ttl_seconds: int = settings.step_cache_local_ttl_seconds,
+        local_max_entries: int = settings.step_cache_local_max_entries,
+        max_value_bytes: int = settings.step_cache_max_value_bytes,
+    ):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self.local_ttl_seconds = local_ttl_seconds
+        self.local_max_entries = local_max_entries
+        self.max_value_bytes = max_value_bytes
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._redis: Optional[Redis] = None
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_retry_at = 0.0
+
+    def _get_redis(self) -> Optional[Redis]:
+        if not self.redis_url or time.monotonic() < self._redis_retry_at:
+            return None
+        # Connections belong to the loop that opened them, and Celery workers run one per thread
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis_loop = loop
+            self._redis = Redis.from_url(
+                self.redis_url,
+                max_connections=settings.redis_max_connections,
+                decode_responses=True,
+                socket_connect_timeout=1,
+                socket_timeout=1,
+            )
+        return self._redis
+
+    def _redis_failed(self, error: Exception):
+        metrics.step_cache_errors_total.inc()
+        logger.warning("Step result cache skipping Redis after error: %s", error)
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return value
+
+    def _put_local(self, key: str, value: str):
+        self._local[key] = (time.monotonic() + self.local_ttl_seconds, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_max_entries:
+            self._local.popitem(last=False)
+        metrics.step_cache_local_entries.set(len(self._local))
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """
+        Look up cached outputs.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Mapping of the keys found to their outputs
+        """
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        for key in dict.fromkeys(keys):
+            value = self._get_local(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        metrics.step_cache_hits_total.labels("local").inc(len(found))
+
+        redis = self._get_redis() if missing else None
+        if redis is not None:
+            try:
+                values = await redis.mget([f"step-cache:{key}" for key in missing])
+            except (RedisError, OSError, asyncio.TimeoutError) as e:
+                self._redis_failed(e)
+                values = [None] * len(missing)
+
+            remote_hits = 0
+            for key, value in zip(missing, values):
+                if value is not None:
+                    found[key] = value
+                    self._put_local(key, value)
+                    remote_hits += 1
+            metrics.step_cache_hits_total.labels("redis").inc(remote_hits)
+
+        metrics.step_cache_misses_total.inc(len(set(keys)) - len(found))
+        return {key: json.loads(value) for key, value in found.items()}
+
+    async def put_many(self, items: Dict[str, Any]):
+        """
+        Store outputs in both tiers.
+
+        Outputs that cannot be serialized, that would not decode back equal,
+        or that are larger than max_value_bytes, are not cached.
+
+        Args:
+            items: Mapping of cache key to output
+        """
+        encoded: Dict[str, str] = {}
+        for key, output in items.items():
+            try:
+                value = json.dumps(output, separators=(",", ":"), default=json_default)
+            except (TypeError, ValueError):
+                continue
+            if len(value) <= self.max_value_bytes and json.loads(value) == output:
+                encoded[key] = value
+                self._put_local(key, value)
+
+        redis = self._get_redis() if encoded else None
+        if redis is None:
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key, value in encoded.items():
+                    pipe.setex(f"step-cache:{key}", self.ttl_seconds, value)
+                await pipe.execute()
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self._redis_failed(e)
+
+    def clear(self):
+        """Drop every entry of the local tier."""
+        self._local.clear()
+        metrics.step_cache_local_entries.set(0)
+
+
+# Global step result cache instance
+step_result_cache = StepResultCache()
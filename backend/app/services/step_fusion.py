@@ -0,0 +1,140 @@
+"""
+Fusion of consecutive built-in steps into single-pass steps.
+"""
+
+from typing import Any, Dict, List, Mapping, Sequence, Set, Tuple
+
+from app.agents.base_agent import BaseAgent, EnricherAgent, TransformerAgent
+from app.agents.record import Record, materialize
+
+# Where a fused output field takes its value from: ("field", name) reads the
+# step input, ("value", value) is a constant and ("metadata", index) is the
+# enrichment metadata of the index-th fused agent.
+Source = Tuple[str, Any]
+
+
+def is_fusible(agent: BaseAgent) -> bool:
+    """True for the built-in agents whose effect on a record can be composed."""
+    if type(agent) is EnricherAgent:
+        return True
+    if type(agent) is TransformerAgent:
+        # Computed fields read beyond the top level, so they cannot be composed
+        if agent.config.get("fields"):
+            return False
+        mappings = agent.config.get("mappings", {})
+        return isinstance(mappings, dict) and all(
+            isinstance(target, str) for target in mappings.values()
+        )
+    return False
+
+
+class FusedAgent(BaseAgent):
+    """
+    Runs a chain of transformers and enrichers as one projection.
+
+    At construction the chain is composed into a single description of the
+    output: whether the unchanged fields of the input are kept, which of
+    them are dropped, and for every written field the ordered sources it may
+    take its value from. A record is then produced in one pass over the
+    written fields, without building the intermediate records.
+    """
+
+    copy_on_write = True
+
+    def __init__(self, agents: Sequence[BaseAgent]):
+        """
+        Compose a chain of fusible agents.
+
+        Args:
+            agents: Agents in the order they would run, all accepted by is_fusible
+        """
+        super().__init__(
+            {"steps": [{"agent": type(agent).__name__, "config": agent.config} for agent in agents]}
+        )
+        self.agents = list(agents)
+        self.deterministic = all(agent.is_deterministic() for agent in agents)
+        self._enrichers = [
+            (index, agent) for index, agent in enumerate(agents) if isinstance(agent, EnricherAgent)
+        ]
+
+        keep = True
+        removed: Set[str] = set()
+        fields: Dict[str, Tuple[Source, ...]] = {}
+
+        def lookup(key: str) -> Tuple[Source, ...]:
+            """Sources of a field of the output composed so far; empty if it is absent."""
+            if key in fields:
+                return fields[key]
+            if keep and key not in removed:
+                return (("field", key),)
+            return ()
+
+        for index, agent in enumerate(agents):
+            if isinstance(agent, EnricherAgent):
+                fields["_enrichment"] = (("metadata", index),)
+                for field, value in agent._parse_rules():
+                    fields[field] = (("value", value),)
+                continue
+
+            mappings = agent.config.get("mappings", {})
+            # A target takes the value of the last mapping whose source is present
+            targets: Dict[str, List[Source]] = {}
+            for source_field, target_field in mappings.items():
+                targets[target_field] = list(lookup(source_field)) + targets.get(target_field, [])
+
+            if agent.config.get("copy_unmapped", False):
+                for target_field, sources in targets.items():
+                    if target_field not in mappings:
+                        sources.extend(lookup(target_field))
+                fields = {key: value for key, value in fields.items() if key not in mappings}
+                removed |= set(mappings)
+            else:
+                fields = {}
+                removed = set()
+                keep = False
+
+            for target_field, sources in targets.items():
+                if sources:
+                    fields[target_field] = tuple(sources)
+                else:
+                    fields.pop(target_field, None)
+
+        self._keep = keep
+        self._removed = frozenset(removed)
+        self._fields = fields
+
+    async def execute(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the fused chain over a single record."""
+        return materialize(self._project(data, self._metadata()))
+
+    async def execute_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run the fused chain over a batch."""
+        return [materialize(result) for result in await self.execute_overlays(records)]
+
+    async def execute_overlays(self, records: List[Mapping]) -> List[Mapping]:
+        """Run the fused chain over a batch, building enrichment metadata once."""
+        metadata = self._metadata()
+        return [self._project(data, metadata) for data in records]
+
+    def _metadata(self) -> Dict[int, Dict[str, Any]]:
+        return {index: agent._metadata() for index, agent in self._enrichers}
+
+    def _project(self, data: Mapping, metadata: Dict[int, Dict[str, Any]]) -> Mapping:
+        """Produce the output of the whole chain for a single record."""
+        changes: Dict[str, Any] = {}
+        for target_field, sources in self._fields.items():
+            for kind, argument in sources:
+                if kind == "field":
+                    if argument in data:
+                        changes[target_field] = data[argument]
+                        break
+                elif kind == "value":
+                    changes[target_field] = argument
+                    break
+                else:
+                    changes[target_field] = dict(metadata[argument])
+                    break
+
+        if self._keep:
+            return Record.overlay(data, changes, removed=self._removed)
+        return changes
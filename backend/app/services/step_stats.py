@@ -0,0 +1,204 @@
+"""
+Rolling latency and throughput statistics of pipeline steps.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# How long to keep statistics local after a Redis error before trying it again
+REDIS_RETRY_SECONDS = 30.0
+
+# One agent call: number of records and seconds taken
+Sample = Tuple[int, float]
+
+
+def summarize(samples: Iterable[Sample]) -> Optional[Dict[str, float]]:
+    """
+    Summarize agent calls into latency and throughput figures.
+
+    The time of a call is modelled as a fixed cost per call plus a cost per
+    record, fitted by least squares when calls of different sizes were seen.
+
+    Args:
+        samples: (records, seconds) of each call
+
+    Returns:
+        Summary, or None if there are no samples
+    """
+    samples = list(samples)
+    if not samples:
+        return None
+
+    calls = len(samples)
+    records = sum(count for count, _ in samples)
+    seconds = sum(duration for _, duration in samples)
+    mean_records = records / calls
+    mean_seconds = seconds / calls
+
+    per_call = 0.0
+    per_record = seconds / records if records else 0.0
+    spread = sum((count - mean_records) ** 2 for count, _ in samples)
+    if spread:
+        slope = (
+            sum((count - mean_records) * (duration - mean_seconds) for count, duration in samples)
+            / spread
+        )
+        intercept = mean_seconds - slope * mean_records
+        if slope >= 0 and intercept >= 0:
+            per_call, per_record = intercept, slope
+
+    return {
+        "calls": calls,
+        "records": records,
+        "mean_call_seconds": mean_seconds,
+        "mean_batch_size": mean_records,
+        "records_per_second": records / seconds if seconds else None,
+        "seconds_per_call": per_call,
+        "seconds_per_record": per_record,
+    }
+
+
+class StepStatistics:
+    """
+    Keeps the last calls of each step configuration, by step fingerprint.
+
+    Calls are recorded in process and pushed to Redis every few seconds, so
+    statistics gathered by workers are visible to every API node. Each
+    fingerprint keeps a bounded window of calls, locally and in Redis. When
+    Redis is unreachable the local window is used instead.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = settings.redis_url,
+        window: int = settings.step_stats_window,
+        flush_seconds: float = settings.step_stats_flush_seconds,
+        ttl_seconds: int = settings.step_stats_ttl_seconds,
+    ):
+        self.redis_url = redis_url
+        self.window = window
+        self.flush_seconds = flush_seconds
+        self.ttl_seconds = ttl_seconds
+        self._local: Dict[str, Deque[Sample]] = {}
+        self._pending: Dict[str, List[Sample]] = {}
+        self._flushed_at = 0.0
+        self._tasks: Set[asyncio.Task] = set()
+        self._redis: Optional[Redis] = None
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_retry_at = 0.0
+
+    def _get_redis(self) -> Optional[Redis]:
+        if not self.redis_url or time.monotonic() < self._redis_retry_at:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis_loop = loop
+            self._redis = Redis.from_url(
+                self.redis_url,
+                max_connections=settings.redis_max_connections,
+                decode_responses=True,
+                socket_connect_timeout=1,
+                socket_timeout=1,
+            )
+        return self._redis
+
+    def _redis_failed(self, error: Exception):
+        logger.warning("Step statistics skipping Redis after error: %s", error)
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def record(self, fingerprint: str, records: int, seconds: float):
+        """
+        Record one agent call without waiting for Redis.
+
+        Args:
+            fingerprint: Fingerprint of the step, covering its agent and config
+            records: Number of records in the call
+            seconds: Time the call took
+        """
+        sample = (records, seconds)
+        local = self._local.get(fingerprint)
+        if local is None:
+            local = self._local[fingerprint] = deque(maxlen=self.window)
+        local.append(sample)
+
+        if not self.redis_url:
+            return
+        self._pending.setdefault(fingerprint, []).append(sample)
+        now = time.monotonic()
+        if not self._tasks and now - self._flushed_at >= self.flush_seconds:
+            self._flushed_at = now
+            task = asyncio.get_running_loop().create_task(self.flush())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        """Push the calls recorded since the last flush to Redis."""
+        pending, self._pending = self._pending, {}
+        redis = self._get_redis() if pending else None
+        if redis is None:
+            return
+
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for fingerprint, samples in pending.items():
+                    key = f"step-stats:{fingerprint}"
+                    pipe.rpush(key, *(f"{count}:{seconds:.6f}" for count, seconds in samples))
+                    pipe.ltrim(key, -self.window, -1)
+                    pipe.expire(key, self.ttl_seconds)
+                await pipe.execute()
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self._redis_failed(e)
+
+    async def get_many(self, fingerprints: Iterable[str]) -> Dict[str, Optional[Dict[str, float]]]:
+        """
+        Summarize the recent calls of several steps.
+
+        Args:
+            fingerprints: Step fingerprints
+
+        Returns:
+            Mapping of each fingerprint to its summary, or None without calls
+        """
+        fingerprints = list(dict.fromkeys(fingerprints))
+        windows: Dict[str, Iterable[Sample]] = {
+            fingerprint: self._local.get(fingerprint, ()) for fingerprint in fingerprints
+        }
+
+        redis = self._get_redis() if fingerprints else None
+        if redis is not None:
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for fingerprint in fingerprints:
+                        pipe.lrange(f"step-stats:{fingerprint}", 0, -1)
+                    values = await pipe.execute()
+                for fingerprint, entries in zip(fingerprints, values):
+                    if entries:
+                        windows[fingerprint] = [
+                            (int(count), float(seconds))
+                            for count, seconds in (entry.split(":") for entry in entries)
+                        ]
+            except (RedisError, OSError, asyncio.TimeoutError) as e:
+                self._redis_failed(e)
+
+        return {fingerprint: summarize(samples) for fingerprint, samples in windows.items()}
+
+    async def close(self):
+        """Wait for the flush in progress, then push what is left."""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+
+# Global step statistics instance
+step_statistics = StepStatistics()
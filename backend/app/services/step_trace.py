@@ -0,0 +1,206 @@
+"""
+Per-step execution traces written to the database in batches.
+"""
+
+import asyncio
+import logging
+import weakref
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Set
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.models import StepTrace
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# Queued to make a writer insert what it has and stop
+_STOP = object()
+
+# Reported percentiles, by the name of their column
+PERCENTILES = {"p50_ms": 0.5, "p95_ms": 0.95, "p99_ms": 0.99}
+
+
+def percentile(ordered: Sequence[float], fraction: float) -> float:
+    """
+    Interpolate a percentile of sorted values, as percentile_cont does.
+
+    Args:
+        ordered: Values in ascending order, at least one
+        fraction: Percentile between 0 and 1
+
+    Returns:
+        Interpolated value
+    """
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+async def step_latencies(
+    db: AsyncSession, pipeline_id: int, start: datetime, end: datetime
+) -> List[Dict[str, Any]]:
+    """
+    Summarize the traced runs of each step of a pipeline over a time range.
+
+    PostgreSQL computes the percentiles itself; other databases return the
+    durations and they are computed here.
+
+    Args:
+        db: Database session
+        pipeline_id: ID of the pipeline
+        start: Start of the range, inclusive
+        end: End of the range, exclusive
+
+    Returns:
+        One summary per step and agent, with p50/p95/p99 durations in milliseconds
+    """
+    in_range = (
+        StepTrace.pipeline_id == pipeline_id,
+        StepTrace.started_at >= start,
+        StepTrace.started_at < end,
+    )
+    totals = [
+        func.count(StepTrace.id).label("runs"),
+        func.sum(StepTrace.records).label("records"),
+        func.avg(StepTrace.duration_ms).label("mean_ms"),
+        func.sum(StepTrace.cache_hits).label("cache_hits"),
+        func.sum(StepTrace.errors).label("errors"),
+        func.sum(StepTrace.input_bytes).label("input_bytes"),
+        func.sum(StepTrace.output_bytes).label("output_bytes"),
+    ]
+    group = (StepTrace.step_id, StepTrace.agent)
+
+    if db.bind.dialect.name == "postgresql":
+        quantiles = [
+            func.percentile_cont(fraction).within_group(StepTrace.duration_ms).label(name)
+            for name, fraction in PERCENTILES.items()
+        ]
+        result = await db.execute(
+            select(*group, *totals, *quantiles)
+            .where(*in_range)
+            .group_by(*group)
+            .order_by(StepTrace.step_id)
+        )
+        return [dict(row._mapping) for row in result]
+
+    result = await db.execute(
+        select(*group, *totals).where(*in_range).group_by(*group).order_by(StepTrace.step_id)
+    )
+    rows = [dict(row._mapping) for row in result]
+    durations: Dict[tuple, List[float]] = {}
+    result = await db.execute(
+        select(*group, StepTrace.duration_ms).where(*in_range).order_by(StepTrace.duration_ms)
+    )
+    for step_id, agent, duration in result:
+        durations.setdefault((step_id, agent), []).append(duration)
+    for summary in rows:
+        ordered = durations[(summary["step_id"], summary["agent"])]
+        for name, fraction in PERCENTILES.items():
+            summary[name] = percentile(ordered, fraction)
+    return rows
+
+
+class StepTraceWriter:
+    """
+    Queues step traces and inserts them in batches off the execution path.
+
+    record never waits for the database: traces go to a bounded queue per
+    event loop, and a background task inserts up to batch_size of them at
+    a time, waiting at most flush_seconds for a batch to fill. Traces are
+    dropped rather than slowing executions down when the queue is full.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        batch_size: int = settings.step_trace_batch_size,
+        flush_seconds: float = settings.step_trace_flush_seconds,
+        queue_size: int = settings.step_trace_queue_size,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue_size = queue_size
+        self._queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Queue]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._tasks: Set[asyncio.Task] = set()
+
+    def record(self, trace: Dict[str, Any]):
+        """
+        Queue a trace and observe its duration.
+
+        Args:
+            trace: StepTrace column values
+        """
+        metrics.step_duration_seconds.labels(trace["agent"]).observe(trace["duration_ms"] / 1000)
+
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(loop)
+        if queue is None:
+            queue = self._queues[loop] = asyncio.Queue(maxsize=self.queue_size)
+            task = loop.create_task(self._write(queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        try:
+            queue.put_nowait(trace)
+        except asyncio.QueueFull:
+            metrics.step_traces_dropped_total.inc()
+
+    async def _write(self, queue: asyncio.Queue):
+        """Drain a queue into the database until the stop marker comes through."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            trace = await queue.get()
+            if trace is _STOP:
+                return
+            traces = [trace]
+            deadline = loop.time() + self.flush_seconds
+            while len(traces) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    trace = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if trace is _STOP:
+                    stopping = True
+                    break
+                traces.append(trace)
+            await self._insert(traces)
+
+    async def _insert(self, traces: List[Dict[str, Any]]):
+        try:
+            async with self.session_factory() as db:
+                await db.execute(insert(StepTrace), traces)
+                await db.commit()
+        except Exception as e:
+            # Tracing must never stop, whatever the database does
+            logger.warning("Dropping %d step traces after a write error: %s", len(traces), e)
+            metrics.step_traces_dropped_total.inc(len(traces))
+
+    async def close(self):
+        """Insert the traces queued on the current event loop, then stop writing."""
+        loop = asyncio.get_running_loop()
+        queue = self._queues.pop(loop, None)
+        if queue is not None:
+            # Inserts are left to finish, as cancelling one midway can wedge its connection
+            await queue.put(_STOP)
+        await asyncio.gather(
+            *(task for task in self._tasks if task.get_loop() is loop), return_exceptions=True
+        )
+
+
+# Global step trace writer instance
+step_trace_writer = StepTraceWriter()
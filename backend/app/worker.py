@@ -0,0 +1,221 @@
+"""
+Celery worker for distributed pipeline execution.
+
+Executions are routed to one queue per partition of the pipeline id, so a
+worker consuming a subset of partitions keeps the plans of those pipelines
+hot in its plan cache. Start workers with, for example:
+
+    celery -A app.worker worker -Q pipelines.0,pipelines.1 --autoscale=10,2
+
+where the autoscale bounds are MAX_WORKERS and MIN_WORKERS. Retention of
+execution history runs periodically once a beat scheduler is started:
+
+    celery -A app.worker beat
+"""
+
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from celery import Celery
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.database import create_engine, create_session_factory
+from app.models import ExecutionPriority
+from app.services.cancellation import execution_cancellation
+from app.services.pipeline_executor import PipelineExecutor
+from app.services.pipeline_plan import ExecutionPlan, PlanCompilationError, plan_cache
+from app.services.retention import RetentionService
+from app.services.step_trace import StepTraceWriter
+
+settings = get_settings()
+
+celery_app = Celery(
+    "interface_agent",
+    broker=settings.celery_broker_url,
+    backend=settings.celery_result_backend,
+)
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_acks_late=True,
+    task_ignore_result=True,
+    task_always_eager=settings.celery_task_always_eager,
+    task_default_queue="pipelines.0",
+    worker_prefetch_multiplier=1,
+    task_queue_max_priority=10,
+    task_default_priority=5,
+    worker_concurrency=settings.max_workers,
+)
+if settings.retention_enabled:
+    celery_app.conf.beat_schedule = {
+        "retention": {"task": "retention.run", "schedule": settings.retention_interval_seconds},
+    }
+
+# One event loop per worker thread, reused across tasks so connection pools survive.
+# Database connections belong to the loop that opened them, so every loop also has
+# its own engine, and the executor and services using it.
+_local = threading.local()
+
+
+# Broker message priority of each class; higher is delivered first
+MESSAGE_PRIORITIES = {
+    ExecutionPriority.INTERACTIVE: 9,
+    ExecutionPriority.BATCH: 5,
+    ExecutionPriority.BACKFILL: 0,
+}
+
+
+def partition_queue(pipeline_id: int) -> str:
+    """Get the queue that executions of a pipeline are routed to."""
+    return f"pipelines.{pipeline_id % settings.celery_partitions}"
+
+
+def create_worker_session_factory() -> async_sessionmaker:
+    """Create the session factory of a new worker event loop, on an engine of its own."""
+    return create_session_factory(create_engine())
+
+
+def worker_executor() -> PipelineExecutor:
+    """Get the executor of this thread's worker event loop."""
+    return _local.executor
+
+
+async def _listen_for_cancellations():
+    execution_cancellation.start(worker_executor().cancel)
+
+
+def run_async(coro):
+    """Run a coroutine on this thread's worker event loop."""
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+        session_factory = create_worker_session_factory()
+        _local.executor = PipelineExecutor(
+            session_factory=session_factory,
+            tracer=(
+                StepTraceWriter(session_factory=session_factory)
+                if settings.step_traces_enabled
+                else None
+            ),
+        )
+        _local.retention = RetentionService(session_factory=session_factory)
+        if not celery_app.conf.task_always_eager:
+            # The listener makes progress whenever the loop runs a task, which is
+            # exactly when there is something to cancel
+            loop.run_until_complete(_listen_for_cancellations())
+    return loop.run_until_complete(coro)
+
+
+async def get_plan(pipeline_id: int, plan_version: str) -> ExecutionPlan:
+    """
+    Get a plan at least as new as the one the API node dispatched with.
+
+    Args:
+        pipeline_id: ID of the pipeline
+        plan_version: ISO timestamp of the dispatching node's plan version
+
+    Returns:
+        Execution plan
+    """
+    plan = plan_cache.get(pipeline_id)
+    if plan is None or plan.version < datetime.fromisoformat(plan_version):
+        plan_cache.invalidate(pipeline_id, broadcast=False)
+        async with worker_executor().session_factory() as db:
+            plan = await plan_cache.get_or_compile(db, pipeline_id)
+
+    if plan is None:
+        raise PlanCompilationError("Pipeline not found")
+    return plan
+
+
+async def _execute(
+    pipeline_id: int,
+    execution_id: int,
+    input_data: Dict[str, Any],
+    plan_version: str,
+    resume: bool,
+    priority: ExecutionPriority,
+    user_id: Optional[int],
+):
+    try:
+        plan = await get_plan(pipeline_id, plan_version)
+    except PlanCompilationError as e:
+        await worker_executor().mark_failed([execution_id], str(e))
+        return
+    await worker_executor().run(plan, execution_id, input_data, resume, priority, user_id)
+
+
+async def _execute_batch(
+    pipeline_id: int,
+    execution_ids: List[int],
+    records: List[Dict[str, Any]],
+    plan_version: str,
+    priority: ExecutionPriority,
+    user_id: Optional[int],
+):
+    try:
+        plan = await get_plan(pipeline_id, plan_version)
+    except PlanCompilationError as e:
+        await worker_executor().mark_failed(execution_ids, str(e))
+        return
+    await worker_executor().run_batch(plan, execution_ids, records, priority, user_id)
+
+
+@celery_app.task(name="pipelines.execute")
+def execute_pipeline_task(
+    pipeline_id: int,
+    execution_id: int,
+    input_data: Dict[str, Any],
+    plan_version: str,
+    resume: bool = False,
+    priority: str = ExecutionPriority.INTERACTIVE.value,
+    user_id: Optional[int] = None,
+):
+    """Run a single pipeline execution on a worker."""
+    run_async(
+        _execute(
+            pipeline_id,
+            execution_id,
+            input_data,
+            plan_version,
+            resume,
+            ExecutionPriority(priority),
+            user_id,
+        )
+    )
+
+
+@celery_app.task(name="pipelines.execute_batch")
+def execute_pipeline_batch_task(
+    pipeline_id: int,
+    execution_ids: List[int],
+    records: List[Dict[str, Any]],
+    plan_version: str,
+    priority: str = ExecutionPriority.BATCH.value,
+    user_id: Optional[int] = None,
+):
+    """Run a batch of pipeline executions on a worker."""
+    run_async(
+        _execute_batch(
+            pipeline_id,
+            execution_ids,
+            records,
+            plan_version,
+            ExecutionPriority(priority),
+            user_id,
+        )
+    )
+
+
+async def _run_retention():
+    await _local.retention.run()
+
+
+@celery_app.task(name="retention.run")
+def run_retention_task():
+    """Archive the executions and events past their retention period."""
+    run_async(_run_retention())
@@ -0,0 +1,114 @@
+"""
+Per-record cost of ValidatorAgent against the number of rules.
+
+Compares the rule interpreter the compiled checks replaced, the compiled
+checks run record by record, and columnar batch validation with NumPy.
+Run from the backend directory:
+
+    python -m benchmarks.validator_rules [--records N] [--repeat N]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from app.agents.base_agent import ValidatorAgent
+
+RULE_COUNTS = (1, 4, 16, 64, 256)
+
+
+def interpret(data: Dict[str, Any], rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The interpreter that ran before rules were compiled, for comparison."""
+    errors = []
+    for rule in rules:
+        field = rule.get("field")
+        rule_type = rule.get("type")
+        if field not in data:
+            errors.append(f"Missing required field: {field}")
+            continue
+        value = data[field]
+        if rule_type == "required" and not value:
+            errors.append(f"Field {field} is required")
+        elif rule_type == "type":
+            expected_type = rule.get("expected")
+            if expected_type == "string" and not isinstance(value, str):
+                errors.append(f"Field {field} must be a string")
+            elif expected_type == "number" and not isinstance(value, (int, float)):
+                errors.append(f"Field {field} must be a number")
+        elif rule_type == "range":
+            min_val = rule.get("min")
+            max_val = rule.get("max")
+            if isinstance(value, (int, float)):
+                if min_val is not None and value < min_val:
+                    errors.append(f"Field {field} must be >= {min_val}")
+                if max_val is not None and value > max_val:
+                    errors.append(f"Field {field} must be <= {max_val}")
+    return {"valid": not errors, "errors": errors, "data": data}
+
+
+def make_rules(count: int) -> List[Dict[str, Any]]:
+    """Required, type and range rules, three to a field."""
+    kinds = [
+        lambda field: {"field": field, "type": "required"},
+        lambda field: {"field": field, "type": "type", "expected": "number"},
+        lambda field: {"field": field, "type": "range", "min": 0, "max": 100},
+    ]
+    return [kinds[i % len(kinds)](f"f{i // len(kinds)}") for i in range(count)]
+
+
+def make_records(count: int, fields: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Records whose values fail their rules about one time in ten."""
+    rng = random.Random(seed)
+
+    def value() -> Any:
+        if rng.random() < 0.9:
+            return rng.randint(1, 100)
+        return rng.choice([-10, 110, "", None])
+
+    return [{f"f{i}": value() for i in range(fields)} for _ in range(count)]
+
+
+def best_of(repeat: int, run: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rules':>6} {'interpreted':>12} {'compiled':>9} {'columnar':>9}  (us per record)")
+    loop = asyncio.new_event_loop()
+    for count in RULE_COUNTS:
+        rules = make_rules(count)
+        records = make_records(args.records, (count + 2) // 3)
+        per_record = ValidatorAgent(config={"rules": rules, "columnar": False})
+        columnar = ValidatorAgent(config={"rules": rules})
+
+        # Results must not change with compilation or with columns
+        expected = [interpret(record, rules) for record in records]
+        assert loop.run_until_complete(per_record.execute_batch(records)) == expected
+        assert loop.run_until_complete(columnar.execute_batch(records)) == expected
+
+        timings = [
+            best_of(args.repeat, lambda: [interpret(record, rules) for record in records]),
+            best_of(
+                args.repeat, lambda: loop.run_until_complete(per_record.execute_batch(records))
+            ),
+            best_of(args.repeat, lambda: loop.run_until_complete(columnar.execute_batch(records))),
+        ]
+        interpreted, compiled, by_columns = (seconds / args.records * 1e6 for seconds in timings)
+        print(f"{count:>6} {interpreted:>12.2f} {compiled:>9.2f} {by_columns:>9.2f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
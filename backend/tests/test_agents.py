@@ -2,7 +2,13 @@
 Test cases for the agent module.
 """
 import pytest
-from app.agents.base_agent import BaseAgent, ValidatorAgent, AnalyzerAgent
+from app.agents.base_agent import (
+    AnalyzerAgent,
+    BaseAgent,
+    EnricherAgent,
+    TransformerAgent,
+    ValidatorAgent,
+)
 from app.agents.registry import agent_registry
 
 
@@ -125,3 +131,49 @@ class TestAgentRegistry:
         agent = agent_registry.create_agent("custom")
         assert agent is not None
         assert isinstance(agent, CustomAgent)
+
+
+class TestExecuteBatch:
+    """Test cases for batch execution."""
+
+    @pytest.mark.asyncio
+    async def test_default_batch_calls_execute(self):
+        """Test the default execute_batch falls back to execute per record."""
+        class TestAgent(BaseAgent):
+            async def execute(self, data):
+                return {"double": data["value"] * 2}
+
+        results = await TestAgent().execute_batch([{"value": 1}, {"value": 2}])
+
+        assert results == [{"double": 2}, {"double": 4}]
+
+    @pytest.mark.asyncio
+    async def test_builtin_batches_match_execute(self):
+        """Test built-in batch implementations produce per-record results."""
+        records = [{"name": "John", "age": 30}, {"age": "x"}, {"name": "", "age": 150}]
+        agents = [
+            ValidatorAgent(
+                config={
+                    "rules": [
+                        {"field": "name", "type": "required"},
+                        {"field": "age", "type": "range", "min": 0, "max": 120},
+                    ]
+                }
+            ),
+            TransformerAgent(config={"mappings": {"age": "years"}, "copy_unmapped": True}),
+        ]
+
+        for agent in agents:
+            expected = [await agent.execute(record) for record in records]
+            assert await agent.execute_batch(records) == expected
+
+    @pytest.mark.asyncio
+    async def test_enricher_batch_shares_timestamp(self):
+        """Test enrichment metadata is generated once per batch."""
+        agent = EnricherAgent(config={"rules": [{"add_field": "source", "value": "api"}]})
+
+        results = await agent.execute_batch([{"a": 1}, {"b": 2}])
+
+        assert results[0]["source"] == results[1]["source"] == "api"
+        assert results[0]["_enrichment"] == results[1]["_enrichment"]
+        assert results[0]["_enrichment"] is not results[1]["_enrichment"]
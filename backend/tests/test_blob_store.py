@@ -0,0 +1,148 @@
+"""
+Test cases for the blob store.
+"""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.agents.record import Record
+from app.models import AgentType, ExecutionStatus
+from app.services.blob_store import (
+    BlobBackend,
+    BlobError,
+    BlobNotFoundError,
+    BlobStore,
+    LocalBlobBackend,
+    blob_size,
+    is_blob_ref,
+)
+from app.services.pipeline_executor import PipelineExecutor
+from app.services.pipeline_plan import compile_plan
+from tests.conftest import TestSessionLocal
+from tests.test_pipeline_executor import create_execution, create_pipeline
+
+
+class TestBlobStore:
+    """Test cases for BlobStore."""
+
+    @pytest.mark.asyncio
+    async def test_small_payloads_stay_inline(self, tmp_path):
+        """Test payloads under the threshold are stored as they are."""
+        blobs = BlobStore(LocalBlobBackend(str(tmp_path)), threshold_bytes=100)
+
+        assert await blobs.offload({"a": 1}) == {"a": 1}
+        assert await blobs.offload(None) is None
+        assert not any(tmp_path.iterdir())
+
+    @pytest.mark.asyncio
+    async def test_large_payloads_round_trip(self, tmp_path):
+        """Test large payloads become references that load back unchanged."""
+        blobs = BlobStore(LocalBlobBackend(str(tmp_path)), threshold_bytes=100)
+        payload = {"text": "x" * 1000, "items": list(range(50))}
+
+        reference = await blobs.offload(Record({"text": "x" * 1000}, {"items": list(range(50))}))
+
+        assert is_blob_ref(reference)
+        assert reference["$blob"]["stored_size"] < reference["$blob"]["size"]
+        assert await blobs.load(reference) == payload
+        # Identical payloads share a blob
+        assert await blobs.offload(payload) == reference
+        assert len(list(tmp_path.rglob("*.gzip"))) == 1
+
+    @pytest.mark.asyncio
+    async def test_threshold_applies_to_the_encoded_size(self, tmp_path):
+        """Test payloads whose encoding is large are offloaded even if their text is short."""
+        blobs = BlobStore(LocalBlobBackend(str(tmp_path)), threshold_bytes=100)
+        payload = {"text": "é" * 20}
+
+        reference = await blobs.offload(payload)
+
+        assert blob_size(reference) >= 100
+        assert await blobs.load(reference) == payload
+
+    def test_backends_implement_every_operation(self):
+        """Test a backend missing an operation cannot be created."""
+
+        class PartialBackend(BlobBackend):
+            async def get(self, key):
+                return b""
+
+        with pytest.raises(TypeError):
+            PartialBackend()
+
+    @pytest.mark.asyncio
+    async def test_payloads_shaped_like_references_stay_payloads(self, tmp_path):
+        """Test only offload() makes references, whatever keys a payload uses."""
+        blobs = BlobStore(LocalBlobBackend(str(tmp_path)), threshold_bytes=1000)
+        reference = await BlobStore(LocalBlobBackend(str(tmp_path)), threshold_bytes=10).offload(
+            {"text": "x" * 100}
+        )
+        payloads = [
+            reference,
+            {"$blob": "0" * 64, "codec": "gzip"},
+            {"$literal": 1},
+            {"$literal": {"$blob": {}}},
+        ]
+
+        for payload in payloads:
+            stored = await blobs.offload(payload)
+            assert not is_blob_ref(stored)
+            assert await blobs.load(stored) == payload
+
+    @pytest.mark.asyncio
+    async def test_missing_and_corrupt_blobs_fail(self, tmp_path):
+        """Test loading raises when the blob is gone or does not match its hash."""
+        backend = LocalBlobBackend(str(tmp_path))
+        blobs = BlobStore(backend, threshold_bytes=10, codec="gzip")
+        reference = await blobs.offload({"text": "y" * 100})
+
+        other = await blobs.offload({"text": "z" * 100})
+        (path,) = tmp_path.rglob(f"{other['$blob']['sha256']}.gzip")
+        path.rename(next(tmp_path.rglob(f"{reference['$blob']['sha256']}.gzip")))
+        with pytest.raises(BlobError):
+            await blobs.load(reference)
+
+        await backend.delete(f"{reference['$blob']['sha256']}.gzip")
+        with pytest.raises(BlobNotFoundError):
+            await blobs.load(reference)
+
+    @pytest.mark.asyncio
+    async def test_invalid_references_fail_without_touching_files(self, tmp_path):
+        """Test references are checked before their digest and codec reach a path."""
+        blobs = BlobStore(LocalBlobBackend(str(tmp_path / "blobs")), threshold_bytes=10)
+        (tmp_path / "secret").write_bytes(b"x")
+        digest = "a" * 64
+        references = [
+            {"sha256": "../../secret", "codec": "gzip"},
+            {"sha256": "ab/." + "a" * 60, "codec": "gzip"},
+            {"sha256": digest.upper(), "codec": "gzip"},
+            {"sha256": digest},
+            {"sha256": digest, "codec": "../x"},
+        ]
+
+        for reference in references:
+            with pytest.raises(BlobError):
+                await blobs.load({"$blob": reference})
+        with pytest.raises(BlobError):
+            await blobs.backend.get("../../secret")
+
+        await blobs.backend.put(f"{digest}.gzip", b"not gzip")
+        with pytest.raises(BlobError):
+            await blobs.load({"$blob": {"sha256": digest, "codec": "gzip"}})
+
+    @pytest.mark.asyncio
+    async def test_executor_offloads_large_outputs(self, db_session: AsyncSession, tmp_path):
+        """Test the execution row keeps a reference to a large output."""
+        pipeline = await create_pipeline(
+            db_session, [(AgentType.TRANSFORMER, {"mappings": {"a": "b"}}, {})]
+        )
+        execution = await create_execution(db_session, pipeline, {"a": "v" * 500})
+        blobs = BlobStore(LocalBlobBackend(str(tmp_path)), threshold_bytes=100)
+
+        plan = await compile_plan(db_session, pipeline.id)
+        executor = PipelineExecutor(session_factory=TestSessionLocal, blobs=blobs)
+        await executor.submit(plan, execution.id, execution.input_data)
+
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.SUCCESS
+        assert is_blob_ref(execution.output_data)
+        assert await blobs.load(execution.output_data) == {"b": "v" * 500}
@@ -0,0 +1,643 @@
+"""
+Test cases for the pipeline execution engine.
+"""
+import asyncio
+import time
+from dataclasses import replace
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.agents.base_agent import BaseAgent
+from app.api.pipelines import _read_ndjson
+from app.models import (
+    Agent,
+    AgentStatus,
+    AgentType,
+    ExecutionCheckpoint,
+    ExecutionStatus,
+    Pipeline,
+    PipelineExecution,
+    PipelineStatus,
+    PipelineStep,
+)
+from app.services.agent_process_pool import (
+    AGENT_NOT_LOADED,
+    AgentProcessPool,
+    agent_key,
+    run_in_worker,
+)
+from app.services.pipeline_executor import PipelineExecutionError, PipelineExecutor
+from app.services.pipeline_plan import (
+    ExecutionPlan,
+    PlanCache,
+    PlanCompilationError,
+    PlanStep,
+    compile_plan,
+)
+from app.services.progress import ExecutionProgress
+from tests.conftest import TestSessionLocal
+
+
+async def create_pipeline(db: AsyncSession, steps, config=None) -> Pipeline:
+    """Create an active pipeline with one step per (agent_type, agent_config, step_config)."""
+    pipeline = Pipeline(name="test_pipeline", status=PipelineStatus.ACTIVE, config=config or {})
+    db.add(pipeline)
+    await db.flush()
+
+    for order, (agent_type, agent_config, step_config) in enumerate(steps):
+        agent = Agent(
+            name=f"agent_{order}",
+            agent_type=agent_type,
+            status=AgentStatus.ACTIVE,
+            config=agent_config,
+        )
+        db.add(agent)
+        await db.flush()
+        db.add(
+            PipelineStep(
+                pipeline_id=pipeline.id, agent_id=agent.id, order=order, config=step_config
+            )
+        )
+
+    await db.commit()
+    return pipeline
+
+
+async def create_execution(db: AsyncSession, pipeline: Pipeline, input_data) -> PipelineExecution:
+    """Create a pending execution."""
+    execution = PipelineExecution(
+        pipeline_id=pipeline.id, status=ExecutionStatus.PENDING, input_data=input_data
+    )
+    db.add(execution)
+    await db.commit()
+    return execution
+
+
+class SleepAgent(BaseAgent):
+    """Agent that waits, then tags its output with its own key."""
+
+    async def execute(self, data):
+        await asyncio.sleep(self.config.get("delay", 0))
+        return {**data, self.config["key"]: True}
+
+
+def plan_step(step_id, depends_on=(), delay=0.0, timeout=None) -> PlanStep:
+    """Build a plan step around a SleepAgent."""
+    config = {"key": f"step_{step_id}", "delay": delay}
+    return PlanStep(
+        step_id=step_id,
+        order=step_id,
+        agent_id=step_id,
+        agent_name=f"sleep_{step_id}",
+        registry_name="sleep",
+        config=config,
+        agent=SleepAgent(config=config),
+        depends_on=tuple(depends_on),
+        timeout=timeout,
+    )
+
+
+def dag_plan(*steps: PlanStep) -> ExecutionPlan:
+    """Build a plan whose last step is the only sink."""
+    return ExecutionPlan(
+        pipeline_id=1,
+        status=PipelineStatus.ACTIVE,
+        version=datetime.utcnow(),
+        steps=steps,
+        sinks=(steps[-1].step_id,),
+    )
+
+
+class TestPipelineExecutor:
+    """Test cases for PipelineExecutor."""
+
+    @pytest.mark.asyncio
+    async def test_steps_are_chained(self, db_session: AsyncSession):
+        """Test each step receives the previous step's output."""
+        pipeline = await create_pipeline(
+            db_session,
+            [
+                (AgentType.TRANSFORMER, {"mappings": {"a": "b"}}, {"copy_unmapped": True}),
+                (AgentType.ENRICHER, {}, {"rules": [{"add_field": "source", "value": "test"}]}),
+            ],
+        )
+        execution = await create_execution(db_session, pipeline, {"a": 1, "c": 2})
+
+        plan = await compile_plan(db_session, pipeline.id)
+        executor = PipelineExecutor(session_factory=TestSessionLocal, max_concurrency=2)
+        await executor.submit(plan, execution.id, execution.input_data)
+
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.SUCCESS
+        assert execution.output_data["b"] == 1
+        assert execution.output_data["c"] == 2
+        assert execution.output_data["source"] == "test"
+        assert execution.completed_at is not None
+
+    @pytest.mark.asyncio
+    async def test_failed_step_marks_execution_failed(self, db_session: AsyncSession):
+        """Test a failing step records the error on the execution."""
+        pipeline = await create_pipeline(
+            db_session, [(AgentType.TRANSFORMER, {"mappings": ["not", "a", "dict"]}, {})]
+        )
+        execution = await create_execution(db_session, pipeline, {"a": 1})
+
+        plan = await compile_plan(db_session, pipeline.id)
+        executor = PipelineExecutor(session_factory=TestSessionLocal, max_concurrency=2)
+        await executor.submit(plan, execution.id, execution.input_data)
+
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.FAILED
+        assert execution.error_message.startswith("Step 0 (agent_0) failed")
+        assert execution.completed_at is not None
+
+    @pytest.mark.asyncio
+    async def test_resume_reuses_checkpoints(self, db_session: AsyncSession):
+        """Test a resumed execution skips checkpointed steps and drops them on success."""
+        pipeline = await create_pipeline(
+            db_session,
+            [
+                (AgentType.TRANSFORMER, {"mappings": {"a": "b"}}, {}),
+                (AgentType.TRANSFORMER, {"mappings": ["not", "a", "dict"]}, {}),
+            ],
+            config={"fusion": False},
+        )
+        execution = await create_execution(db_session, pipeline, {"a": 1})
+        executor = PipelineExecutor(session_factory=TestSessionLocal)
+
+        plan = await compile_plan(db_session, pipeline.id)
+        await executor.run(plan, execution.id, execution.input_data)
+
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.FAILED
+        checkpoint = (await db_session.execute(select(ExecutionCheckpoint))).scalar_one()
+        assert checkpoint.output_data == {"b": 1}
+
+        # Mark the checkpoint so the test can tell it was reused, then fix the failing step
+        checkpoint.output_data = {"b": 99}
+        failing_step = (
+            await db_session.execute(select(PipelineStep).where(PipelineStep.order == 1))
+        ).scalar_one()
+        failing_step.config = {"mappings": {"b": "c"}}
+        execution.status = ExecutionStatus.PENDING
+        await db_session.commit()
+
+        plan = await compile_plan(db_session, pipeline.id)
+        await executor.run(plan, execution.id, execution.input_data, resume=True)
+
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.SUCCESS
+        assert execution.output_data == {"c": 99}
+        assert (await db_session.execute(select(ExecutionCheckpoint))).first() is None
+
+    @pytest.mark.asyncio
+    async def test_independent_branches_run_concurrently(self):
+        """Test branches of a DAG overlap and merge at the join step."""
+        plan = ExecutionPlan(
+            pipeline_id=1,
+            status=PipelineStatus.ACTIVE,
+            version=datetime.utcnow(),
+            steps=(
+                plan_step(1),
+                plan_step(2, depends_on=[1], delay=0.2),
+                plan_step(3, depends_on=[1], delay=0.2),
+                plan_step(4, depends_on=[2, 3]),
+            ),
+            sinks=(4,),
+        )
+        assert not plan.is_chain
+
+        started = time.monotonic()
+        output = await PipelineExecutor(max_concurrency=1).run_plan(plan, {"input": 1})
+
+        assert time.monotonic() - started < 0.35
+        assert output == {
+            "input": 1,
+            "step_1": True,
+            "step_2": True,
+            "step_3": True,
+            "step_4": True,
+        }
+
+    @pytest.mark.asyncio
+    async def test_batch_records_fail_independently(self, db_session: AsyncSession):
+        """Test a batch writes a status per record and isolates failures."""
+        pipeline = await create_pipeline(
+            db_session, [(AgentType.TRANSFORMER, {"mappings": {"a": "b"}}, {})]
+        )
+        records = [{"a": 1}, None, {"a": 3}]
+        executions = [await create_execution(db_session, pipeline, {}) for _ in records]
+
+        plan = await compile_plan(db_session, pipeline.id)
+        executor = PipelineExecutor(session_factory=TestSessionLocal, max_concurrency=2)
+        await executor.submit_batch(plan, [execution.id for execution in executions], records)
+
+        for execution in executions:
+            await db_session.refresh(execution)
+        assert [execution.status for execution in executions] == [
+            ExecutionStatus.SUCCESS,
+            ExecutionStatus.FAILED,
+            ExecutionStatus.SUCCESS,
+        ]
+        assert executions[0].output_data == {"b": 1}
+        assert executions[2].output_data == {"b": 3}
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_not_rerun_for_other_agents(self):
+        """Test a failing batch of a non-deterministic agent fails every record once."""
+        calls = []
+
+        class OnceAgent(SleepAgent):
+            async def execute_batch(self, records):
+                calls.append(len(records))
+                raise ValueError("boom")
+
+        step = plan_step(1)
+        step = replace(step, agent=OnceAgent(config=step.config))
+
+        results = await PipelineExecutor().run_plan_batch(dag_plan(step), [{}, {}, {}])
+
+        assert calls == [3]
+        assert [str(result) for result in results] == ["Step 1 (sleep_1) failed: boom"] * 3
+
+    @pytest.mark.asyncio
+    async def test_ndjson_lines_are_bounded(self):
+        """Test NDJSON lines split across chunks are parsed and overlong lines fail alone."""
+
+        class Body:
+            def __init__(self, *chunks):
+                self.chunks = chunks
+
+            async def stream(self):
+                for chunk in self.chunks:
+                    yield chunk
+
+        body = Body(
+            b'{"a": 1}\n{"a"',
+            b": 2}\n\n" + b"x" * 30,
+            b"x" * 30,
+            b'x\n{"a": 3}\n' + b"y" * 25 + b"\n[1]",
+        )
+        results = [result async for result in _read_ndjson(body, max_line_bytes=20)]
+
+        assert results[:2] == [{"a": 1}, {"a": 2}]
+        assert str(results[2]) == "Record exceeds the 20 byte line limit"
+        assert results[3] == {"a": 3}
+        assert str(results[4]) == "Record exceeds the 20 byte line limit"
+        assert str(results[5]) == "Record must be a JSON object"
+        assert len(results) == 6
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_results_in_order(self, db_session: AsyncSession):
+        """Test streamed records come back in order and the summary is stored."""
+        pipeline = await create_pipeline(
+            db_session, [(AgentType.TRANSFORMER, {"mappings": {"a": "b"}}, {})]
+        )
+        execution = await create_execution(db_session, pipeline, None)
+
+        async def records():
+            for value in range(5):
+                yield {"a": value}
+            yield PipelineExecutionError("Invalid JSON record")
+
+        plan = await compile_plan(db_session, pipeline.id)
+        executor = PipelineExecutor(session_factory=TestSessionLocal, max_concurrency=2)
+        results = [
+            result async for result in executor.stream(plan, execution.id, records(), window_size=2)
+        ]
+
+        assert results[:5] == [{"b": value} for value in range(5)]
+        assert isinstance(results[5], PipelineExecutionError)
+
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.SUCCESS
+        assert execution.output_data == {"records": 6, "succeeded": 5, "failed": 1}
+
+
+class TestExecutionPlan:
+    """Test cases for plan compilation and caching."""
+
+    @pytest.mark.asyncio
+    async def test_plan_merges_configs_in_order(self, db_session: AsyncSession):
+        """Test steps are ordered and step config overrides agent config."""
+        pipeline = await create_pipeline(
+            db_session,
+            [
+                (AgentType.VALIDATOR, {"rules": []}, {}),
+                (AgentType.TRANSFORMER, {"mappings": {"a": "b"}}, {"mappings": {"a": "c"}}),
+            ],
+        )
+
+        plan = await compile_plan(db_session, pipeline.id)
+
+        assert [step.registry_name for step in plan.steps] == ["validator", "transformer"]
+        assert plan.steps[1].config["mappings"] == {"a": "c"}
+        assert plan.steps[1].agent.config["mappings"] == {"a": "c"}
+        assert plan.key == (pipeline.id, plan.version)
+
+    @pytest.mark.asyncio
+    async def test_unregistered_agent_fails_compilation(self, db_session: AsyncSession):
+        """Test plugin agents missing from the registry are rejected."""
+        pipeline = await create_pipeline(db_session, [(AgentType.CUSTOM, {}, {})])
+        agent = (await db_session.execute(select(Agent))).scalar_one()
+        agent.is_plugin = True
+        await db_session.commit()
+
+        with pytest.raises(PlanCompilationError):
+            await compile_plan(db_session, pipeline.id)
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_and_invalidation(self, db_session: AsyncSession):
+        """Test cached plans are reused without database reads until invalidated."""
+        pipeline = await create_pipeline(db_session, [(AgentType.ENRICHER, {}, {})])
+        cache = PlanCache(ttl_seconds=60, redis_url=None)
+
+        plan = await cache.get_or_compile(db_session, pipeline.id)
+        assert await cache.get_or_compile(None, pipeline.id) is plan
+
+        cache.invalidate_agent(plan.steps[0].agent_id)
+        assert cache.get(pipeline.id) is None
+
+        await cache.get_or_compile(db_session, pipeline.id)
+        cache.invalidate(pipeline.id)
+        assert cache.get(pipeline.id) is None
+
+    @pytest.mark.asyncio
+    async def test_invalidations_are_broadcast(self, db_session: AsyncSession):
+        """Test invalidations are published and applied by the caches of other processes."""
+        pipeline = await create_pipeline(db_session, [(AgentType.ENRICHER, {}, {})])
+        caches = [PlanCache(ttl_seconds=60) for _ in range(2)]
+        published = []
+
+        async def publish(message):
+            published.append(message)
+
+        for cache in caches:
+            await cache.get_or_compile(db_session, pipeline.id)
+        agent_id = caches[0].get(pipeline.id).steps[0].agent_id
+
+        with patch.object(caches[0], "_publish", publish):
+            caches[0].invalidate_agent(agent_id)
+            await asyncio.sleep(0)
+        (message,) = published
+        assert message["agent_id"] == agent_id
+
+        caches[0]._apply(message)
+        assert caches[1].get(pipeline.id) is not None
+        caches[1]._apply(message)
+        assert caches[1].get(pipeline.id) is None
+
+    @pytest.mark.asyncio
+    async def test_dependencies_are_scheduled_topologically(self, db_session: AsyncSession):
+        """Test declared dependencies override step order and sinks are found."""
+        pipeline = await create_pipeline(
+            db_session,
+            [
+                (AgentType.ENRICHER, {}, {}),
+                (AgentType.ANALYZER, {}, {}),
+                (AgentType.VALIDATOR, {}, {}),
+            ],
+        )
+        steps = (await db_session.execute(select(PipelineStep))).scalars().all()
+        first, second, third = sorted(steps, key=lambda step: step.order)
+        first.depends_on = [third.id]
+        second.depends_on = [third.id]
+        third.depends_on = []
+        await db_session.commit()
+
+        plan = await compile_plan(db_session, pipeline.id)
+
+        assert [step.step_id for step in plan.steps] == [third.id, first.id, second.id]
+        assert plan.sinks == (first.id, second.id)
+
+    @pytest.mark.asyncio
+    async def test_cycles_are_rejected(self, db_session: AsyncSession):
+        """Test cyclic dependencies fail compilation."""
+        pipeline = await create_pipeline(
+            db_session, [(AgentType.ENRICHER, {}, {}), (AgentType.ANALYZER, {}, {})]
+        )
+        first, second = (await db_session.execute(select(PipelineStep))).scalars().all()
+        first.depends_on = [second.id]
+        await db_session.commit()
+
+        with pytest.raises(PlanCompilationError, match="cycle"):
+            await compile_plan(db_session, pipeline.id)
+
+
+class TestConcurrencyLimits:
+    """Test cases for agent concurrency limits and step timeouts."""
+
+    @pytest.mark.asyncio
+    async def test_agent_limit_serializes_branches(self):
+        """Test branches sharing a limited agent type queue for it."""
+        plan = dag_plan(
+            plan_step(1),
+            plan_step(2, depends_on=[1], delay=0.2),
+            plan_step(3, depends_on=[1], delay=0.2),
+            plan_step(4, depends_on=[2, 3]),
+        )
+        executor = PipelineExecutor(agent_limits={"sleep": 1})
+
+        started = time.monotonic()
+        await executor.run_plan(plan, {})
+
+        assert time.monotonic() - started >= 0.4
+
+    @pytest.mark.asyncio
+    async def test_step_timeout_fails_records(self):
+        """Test a step over its timeout fails every record with a clear error."""
+        plan = dag_plan(plan_step(1, delay=1, timeout=0.05))
+
+        results = await PipelineExecutor().run_plan_batch(plan, [{}, {}])
+
+        assert all(isinstance(result, PipelineExecutionError) for result in results)
+        assert str(results[0]) == "Step 1 (sleep_1) timed out after 0.05s"
+
+    @pytest.mark.asyncio
+    async def test_step_timeout_comes_from_step_config(self, db_session: AsyncSession):
+        """Test timeout_seconds in the step config overrides the default."""
+        pipeline = await create_pipeline(
+            db_session, [(AgentType.ENRICHER, {}, {"timeout_seconds": 5})]
+        )
+
+        plan = await compile_plan(db_session, pipeline.id)
+
+        assert plan.steps[0].timeout == 5.0
+
+
+class TestCancellation:
+    """Test cases for cancelling executions."""
+
+    @pytest.mark.asyncio
+    async def test_cancel_keeps_completed_steps(self, db_session: AsyncSession):
+        """Test a cancelled execution records the outputs of the steps it finished."""
+        pipeline = await create_pipeline(db_session, [(AgentType.ENRICHER, {}, {})])
+        execution = await create_execution(db_session, pipeline, {"input": 1})
+        plan = dag_plan(plan_step(1), plan_step(2, depends_on=[1], delay=5))
+        executor = PipelineExecutor(session_factory=TestSessionLocal)
+
+        task = executor.submit(plan, execution.id, execution.input_data)
+        await asyncio.sleep(0.2)
+        assert executor.cancel(execution.id)
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.CANCELLED
+        assert execution.output_data == {"completed_steps": {"1": {"input": 1, "step_1": True}}}
+        assert not executor.cancel(execution.id)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_execution_is_not_started(self, db_session: AsyncSession):
+        """Test an execution cancelled while pending is skipped by the executor."""
+        pipeline = await create_pipeline(db_session, [(AgentType.ENRICHER, {}, {})])
+        execution = await create_execution(db_session, pipeline, {})
+        execution.status = ExecutionStatus.CANCELLED
+        await db_session.commit()
+
+        plan = await compile_plan(db_session, pipeline.id)
+        await PipelineExecutor(session_factory=TestSessionLocal).run(plan, execution.id, {})
+
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.CANCELLED
+        assert execution.started_at is None
+
+
+class RecordingProgress(ExecutionProgress):
+    """Progress publisher keeping events in memory instead of sending them to Redis."""
+
+    def __init__(self):
+        super().__init__(redis_url=None)
+        self.events = []
+
+    def publish(self, event):
+        self.events.append(event)
+
+
+class TestProgressEvents:
+    """Test cases for execution progress events."""
+
+    @pytest.mark.asyncio
+    async def test_events_follow_the_execution(self, db_session: AsyncSession):
+        """Test step and execution events are published in order."""
+        pipeline = await create_pipeline(
+            db_session,
+            [
+                (AgentType.TRANSFORMER, {"mappings": {"a": "b"}}, {}),
+                (AgentType.ENRICHER, {}, {}),
+            ],
+            config={"fusion": False},
+        )
+        execution = await create_execution(db_session, pipeline, {"a": 1})
+        progress = RecordingProgress()
+        executor = PipelineExecutor(session_factory=TestSessionLocal, progress=progress)
+
+        plan = await compile_plan(db_session, pipeline.id)
+        await executor.run(plan, execution.id, execution.input_data)
+
+        assert [(event["event"], event.get("step_id")) for event in progress.events] == [
+            ("step-started", plan.steps[0].step_id),
+            ("step-finished", plan.steps[0].step_id),
+            ("step-started", plan.steps[1].step_id),
+            ("step-finished", plan.steps[1].step_id),
+            ("execution-finished", None),
+        ]
+        assert all(event["execution_id"] == execution.id for event in progress.events)
+        assert progress.events[-1]["status"] == "success"
+
+    @pytest.mark.asyncio
+    async def test_subscriptions_end_when_redis_is_unreachable(self):
+        """Test listeners get an ended iterator instead of an error when subscribing fails."""
+        progress = ExecutionProgress(redis_url="redis://127.0.0.1:1/0")
+
+        for _ in range(2):
+            async with progress.subscribe("progress:execution:1", heartbeat=5) as events:
+                assert [event async for event in events] == []
+
+        assert progress._listeners == {}
+        assert progress._reader is None
+        await progress.close()
+
+
+class SquareAgent(BaseAgent):
+    """CPU-bound agent squaring a value."""
+
+    cpu_bound = True
+
+    async def execute(self, data):
+        time.sleep(self.config.get("delay", 0))
+        return {"value": data["value"] ** self.config.get("power", 2)}
+
+
+class TestAgentProcessPool:
+    """Test cases for running CPU-bound agents in the process pool."""
+
+    def test_agent_is_shipped_once_per_process(self):
+        """Test workers ask for the agent spec only on first use."""
+        agent = SquareAgent(config={"power": 3})
+        key = agent_key(agent)
+
+        assert run_in_worker(key, [{"value": 2}]) == AGENT_NOT_LOADED
+        assert run_in_worker(key, [{"value": 2}], (SquareAgent, agent.config)) == [{"value": 8}]
+        assert run_in_worker(key, [{"value": 3}]) == [{"value": 27}]
+
+    def test_workers_keep_recent_agents_only(self):
+        """Test worker processes drop their least recently used agents."""
+        agents = [SquareAgent(config={"power": power}) for power in (1, 2, 3)]
+        keys = [agent_key(agent) for agent in agents]
+
+        with patch("app.services.agent_process_pool.settings.process_pool_max_agents", 2):
+            for agent, key in zip(agents[:2], keys):
+                run_in_worker(key, [{"value": 2}], (SquareAgent, agent.config))
+            run_in_worker(keys[0], [{"value": 2}])
+            run_in_worker(keys[2], [{"value": 2}], (SquareAgent, agents[2].config))
+
+            assert run_in_worker(keys[1], [{"value": 2}]) == AGENT_NOT_LOADED
+            assert run_in_worker(keys[0], [{"value": 2}]) == [{"value": 2}]
+            assert run_in_worker(keys[2], [{"value": 2}]) == [{"value": 8}]
+
+    @pytest.mark.asyncio
+    async def test_cpu_bound_step_runs_in_pool(self):
+        """Test the executor routes CPU-bound agents through the pool."""
+        agent = SquareAgent()
+        step = PlanStep(
+            step_id=1,
+            order=0,
+            agent_id=1,
+            agent_name="square",
+            registry_name="square",
+            config=agent.config,
+            agent=agent,
+        )
+        plan = ExecutionPlan(
+            pipeline_id=1,
+            status=PipelineStatus.ACTIVE,
+            version=datetime.utcnow(),
+            steps=(step,),
+            sinks=(1,),
+        )
+        pool = AgentProcessPool(max_workers=1, max_queue=2)
+
+        with patch("app.services.pipeline_executor.agent_process_pool", pool):
+            results = await PipelineExecutor().run_plan_batch(plan, [{"value": 2}, {"value": 4}])
+        pool.shutdown()
+
+        assert results == [{"value": 4}, {"value": 16}]
+
+    @pytest.mark.asyncio
+    async def test_abandoned_calls_keep_their_slot(self):
+        """Test a call that timed out holds its pool slot until its worker finishes it."""
+        pool = AgentProcessPool(max_workers=1, max_queue=1)
+        slow = SquareAgent(config={"delay": 0.5})
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.execute_batch(slow, [{"value": 2}]), 0.2)
+        assert pool._slots.locked()
+
+        assert await pool.execute_batch(SquareAgent(), [{"value": 3}]) == [{"value": 9}]
+        assert not pool._slots.locked()
+        pool.shutdown()
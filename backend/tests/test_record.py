@@ -0,0 +1,141 @@
+"""
+Test cases for copy-on-write records.
+"""
+import pickle
+from datetime import datetime
+
+import pytest
+
+from app.agents.base_agent import BaseAgent, EnricherAgent, TransformerAgent, ValidatorAgent
+from app.agents.record import Record, materialize
+from app.models import PipelineStatus
+from app.services.pipeline_executor import PipelineExecutor
+from app.services.pipeline_plan import ExecutionPlan, PlanStep
+
+
+class MutatingAgent(BaseAgent):
+    """Agent written against plain dicts that changes its input in place."""
+
+    async def execute(self, data):
+        data["mutated"] = True
+        for value in data.values():
+            if isinstance(value, list):
+                value.append("mutated")
+        return data
+
+
+def chain_plan(*agents: BaseAgent) -> ExecutionPlan:
+    """Build a plan running agents one after the other."""
+    steps = tuple(
+        PlanStep(
+            step_id=index + 1,
+            order=index,
+            agent_id=index + 1,
+            agent_name=type(agent).__name__,
+            registry_name=type(agent).__name__,
+            config=agent.config,
+            agent=agent,
+            depends_on=(index,) if index else (),
+        )
+        for index, agent in enumerate(agents)
+    )
+    return ExecutionPlan(
+        pipeline_id=1,
+        status=PipelineStatus.ACTIVE,
+        version=datetime.utcnow(),
+        steps=steps,
+        sinks=(len(steps),),
+    )
+
+
+class TestRecord:
+    """Test cases for Record."""
+
+    def test_overlay_matches_dict_semantics(self):
+        """Test an overlay reads like a copy of the base with the changes applied."""
+        base = {"a": 1, "b": 2, "c": 3}
+        record = Record.overlay(base, {"b": 20, "d": 4}, removed=["c"])
+
+        assert record == {"a": 1, "b": 20, "d": 4}
+        assert list(record) == ["a", "b", "d"]
+        assert len(record) == 3
+        assert "c" not in record
+        assert base == {"a": 1, "b": 2, "c": 3}
+
+    def test_overlays_share_one_base(self):
+        """Test overlaying a Record merges changes instead of stacking layers."""
+        base = {"a": 1}
+        first = Record.overlay(base, {"b": 2})
+        second = Record.overlay(first, {"a": 10}, removed=["b"])
+
+        assert second._base is base
+        assert second == {"a": 10}
+        assert first == {"a": 1, "b": 2}
+
+    def test_materialize_and_pickle_give_plain_dicts(self):
+        """Test Records nested in outputs turn into plain dicts."""
+        record = Record.overlay({"a": 1}, {"b": 2})
+        output = {"valid": True, "data": record}
+
+        plain = materialize(output)
+        assert type(plain["data"]) is dict
+        assert plain == {"valid": True, "data": {"a": 1, "b": 2}}
+        assert type(pickle.loads(pickle.dumps(record))) is dict
+
+        untouched = {"a": [1, {"b": 2}]}
+        assert materialize(untouched) is untouched
+
+        copied = materialize(untouched, copy=True)
+        assert copied == untouched
+        assert copied["a"] is not untouched["a"] and copied["a"][1] is not untouched["a"][1]
+
+
+class TestCopyOnWritePipeline:
+    """Test cases for passing Records through the executor."""
+
+    @pytest.mark.asyncio
+    async def test_steps_share_the_input(self):
+        """Test built-in agents write deltas and the result is a plain dict."""
+        data = {"name": "John", "age": 30}
+        plan = chain_plan(
+            EnricherAgent(config={"rules": [{"add_field": "source", "value": "api"}]}),
+            TransformerAgent(config={"mappings": {"age": "years"}, "copy_unmapped": True}),
+            ValidatorAgent(config={"rules": [{"field": "name", "type": "required"}]}),
+        )
+        executor = PipelineExecutor(result_cache=None, progress=None)
+
+        result = await executor.run_plan(plan, data)
+
+        assert type(result) is dict and type(result["data"]) is dict
+        assert result["valid"] is True
+        assert result["data"]["years"] == 30
+        assert "age" not in result["data"]
+        assert result["data"]["source"] == "api"
+        assert data == {"name": "John", "age": 30}
+
+    @pytest.mark.asyncio
+    async def test_plain_agents_get_private_copies(self):
+        """Test agents that mutate their input never see a shared Record."""
+        data = {"name": "John", "tags": ["a"]}
+        plan = chain_plan(EnricherAgent(), MutatingAgent())
+        executor = PipelineExecutor(result_cache=None, progress=None)
+
+        result = await executor.run_plan(plan, data)
+
+        assert result["mutated"] is True
+        assert result["tags"] == ["a", "mutated"]
+        assert data == {"name": "John", "tags": ["a"]}
+
+    @pytest.mark.asyncio
+    async def test_public_calls_return_plain_dicts(self):
+        """Test Records only reach the executor, not callers of execute and execute_batch."""
+        data = {"name": "John", "age": 30}
+        enricher = EnricherAgent(config={"rules": [{"add_field": "source", "value": "api"}]})
+        transformer = TransformerAgent(config={"mappings": {"age": "years"}, "copy_unmapped": True})
+
+        for agent in (enricher, transformer):
+            assert type(await agent.execute(data)) is dict
+            assert all(type(result) is dict for result in await agent.execute_batch([data]))
+            assert all(
+                isinstance(result, Record) for result in await agent.execute_overlays([data])
+            )
@@ -0,0 +1,159 @@
+"""
+Test cases for execution and event retention.
+"""
+import gzip
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ArchiveMember, Event, ExecutionStatus, PipelineExecution, RetentionArchive
+from app.services.blob_store import BlobStore, LocalBlobBackend
+from app.services.retention import RetentionService
+from tests.conftest import TestSessionLocal, test_engine
+from tests.test_pipeline_executor import create_pipeline
+
+
+class TestRetentionService:
+    """Test cases for RetentionService."""
+
+    @pytest.mark.asyncio
+    async def test_old_rows_move_to_archive_files(self, db_session: AsyncSession, tmp_path):
+        """Test finished executions past retention are archived in chunks and stay readable."""
+        now = datetime(2024, 6, 30, 12)
+        pipeline = await create_pipeline(db_session, [])
+        pipeline.retention_days = 10
+        executions = [
+            PipelineExecution(
+                pipeline_id=pipeline.id,
+                status=status,
+                input_data={"index": index},
+                created_at=now - timedelta(days=days),
+            )
+            for index, (status, days) in enumerate(
+                [
+                    (ExecutionStatus.SUCCESS, 20),
+                    (ExecutionStatus.FAILED, 20),
+                    (ExecutionStatus.SUCCESS, 15),
+                    (ExecutionStatus.RUNNING, 15),
+                    (ExecutionStatus.SUCCESS, 1),
+                ]
+            )
+        ]
+        db_session.add_all(executions)
+        db_session.add(
+            Event(event_type="test", source="test", payload={}, created_at=now - timedelta(days=60))
+        )
+        await db_session.commit()
+
+        service = RetentionService(
+            session_factory=TestSessionLocal,
+            archive_path=str(tmp_path),
+            batch_size=2,
+            event_retention_days=30,
+        )
+        archived = await service.run(now=now)
+
+        assert archived == {"executions": 3, "events": 1}
+        result = await db_session.execute(select(PipelineExecution.id))
+        assert sorted(result.scalars()) == [executions[3].id, executions[4].id]
+
+        result = await db_session.execute(
+            select(RetentionArchive).where(RetentionArchive.kind == "execution")
+        )
+        summaries = result.scalars().all()
+        assert sum(summary.rows for summary in summaries) == 3
+        assert {summary.path.split("/")[2] for summary in summaries} == {
+            "date=2024-06-10",
+            "date=2024-06-15",
+        }
+        assert all((tmp_path / summary.path).exists() for summary in summaries)
+
+        row = await service.find(db_session, "execution", executions[2].id)
+        assert row["input_data"] == {"index": 2}
+        assert row["status"] == ExecutionStatus.SUCCESS.value
+        assert await service.find(db_session, "execution", executions[4].id) is None
+
+    @pytest.mark.asyncio
+    async def test_rows_are_found_by_offset_with_their_blobs(
+        self, db_session: AsyncSession, tmp_path
+    ):
+        """Test offloaded payloads are copied into the archive and rows are read by offset."""
+        now = datetime(2024, 6, 30, 12)
+        blobs = BlobStore(LocalBlobBackend(str(tmp_path / "blobs")), threshold_bytes=100)
+        pipeline = await create_pipeline(db_session, [])
+        pipeline.retention_days = 1
+        executions = [
+            PipelineExecution(
+                pipeline_id=pipeline.id,
+                status=ExecutionStatus.SUCCESS,
+                input_data={"index": index},
+                output_data=await blobs.offload({"text": str(index) * 200}),
+                created_at=now - timedelta(days=5),
+            )
+            for index in range(5)
+        ]
+        executions[0].input_data = await blobs.offload({"$blob": "x" * 200})
+        db_session.add_all(executions)
+        await db_session.commit()
+
+        service = RetentionService(
+            session_factory=TestSessionLocal, archive_path=str(tmp_path / "archive"), blobs=blobs
+        )
+        with patch("app.services.retention.ARCHIVE_BLOCK_ROWS", 2):
+            assert (await service.run(now=now))["executions"] == 5
+
+        (summary,) = (await db_session.execute(select(RetentionArchive))).scalars().all()
+        result = await db_session.execute(
+            select(ArchiveMember.first_id, ArchiveMember.last_id).order_by(ArchiveMember.offset)
+        )
+        ids = [execution.id for execution in executions]
+        assert result.all() == [(ids[0], ids[1]), (ids[2], ids[3]), (ids[4], ids[4])]
+        with gzip.open(tmp_path / "archive" / summary.path, "rt") as f:
+            assert len(f.readlines()) == 5
+
+        for index, execution in enumerate(executions):
+            row = await service.find(db_session, "execution", execution.id)
+            assert row["output_data"] == {"text": str(index) * 200}
+        row = await service.find(db_session, "execution", executions[0].id)
+        assert await blobs.load(row["input_data"]) == {"$blob": "x" * 200}
+
+    @pytest.mark.asyncio
+    async def test_rows_changed_after_selection_are_kept(self, db_session: AsyncSession, tmp_path):
+        """Test the delete checks the status again, so a resumed execution stays live."""
+        now = datetime(2024, 6, 30, 12)
+        pipeline = await create_pipeline(db_session, [])
+        pipeline.retention_days = 1
+        executions = [
+            PipelineExecution(
+                pipeline_id=pipeline.id,
+                status=ExecutionStatus.FAILED,
+                input_data={"index": index},
+                created_at=now - timedelta(days=5),
+            )
+            for index in range(2)
+        ]
+        db_session.add_all(executions)
+        await db_session.commit()
+        resumed = executions[1].id
+
+        def resume(conn, cursor, statement, parameters, context, executemany):
+            # Another request resumes the execution between the select and the delete
+            if statement.startswith("DELETE FROM pipeline_execution"):
+                cursor.execute(
+                    "UPDATE pipeline_execution SET status = 'PENDING' WHERE id = ?", (resumed,)
+                )
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", resume)
+        try:
+            service = RetentionService(session_factory=TestSessionLocal, archive_path=str(tmp_path))
+            assert (await service.run(now=now))["executions"] == 1
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", resume)
+
+        result = await db_session.execute(select(PipelineExecution.id))
+        assert list(result.scalars()) == [resumed]
+        assert await service.find(db_session, "execution", resumed) is None
+        assert (await service.find(db_session, "execution", executions[0].id)) is not None
@@ -0,0 +1,146 @@
+"""
+Test cases for the fair-share execution scheduler.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import AgentType, ExecutionPriority, ExecutionStatus, PipelineExecution
+from app.services import scheduler as scheduler_module
+from app.services.scheduler import AdmissionError, FairShareScheduler, check_admission
+from tests.test_pipeline_executor import create_pipeline
+
+INTERACTIVE = ExecutionPriority.INTERACTIVE
+BATCH = ExecutionPriority.BATCH
+BACKFILL = ExecutionPriority.BACKFILL
+
+
+async def run_in_order(scheduler: FairShareScheduler, submissions):
+    """Queue submissions behind a held slot and return the order they ran in."""
+    order = []
+    gate = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot(INTERACTIVE, 0, 0):
+            await gate.wait()
+
+    async def run(name, priority, user_id, pipeline_id):
+        async with scheduler.slot(priority, user_id, pipeline_id):
+            order.append(name)
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    tasks = []
+    for submission in submissions:
+        tasks.append(asyncio.create_task(run(*submission)))
+        await asyncio.sleep(0)
+
+    gate.set()
+    await asyncio.gather(holder, *tasks)
+    return order
+
+
+class TestFairShareScheduler:
+    """Test cases for FairShareScheduler."""
+
+    @pytest.mark.asyncio
+    async def test_users_are_interleaved(self):
+        """Test a user with a backlog does not delay another user's work."""
+        scheduler = FairShareScheduler(max_concurrency=1)
+
+        order = await run_in_order(
+            scheduler,
+            [
+                ("a1", BATCH, 1, 1),
+                ("a2", BATCH, 1, 1),
+                ("a3", BATCH, 1, 1),
+                ("b1", BATCH, 2, 2),
+            ],
+        )
+
+        assert order.index("b1") < order.index("a2")
+
+    @pytest.mark.asyncio
+    async def test_interactive_goes_before_backfill(self):
+        """Test higher priority classes get their turn first."""
+        scheduler = FairShareScheduler(max_concurrency=1)
+
+        order = await run_in_order(
+            scheduler,
+            [
+                ("backfill", BACKFILL, 1, 1),
+                ("interactive", INTERACTIVE, 2, 2),
+            ],
+        )
+
+        assert order == ["interactive", "backfill"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_its_place(self):
+        """Test cancelling a queued execution does not leak a slot."""
+        scheduler = FairShareScheduler(max_concurrency=1)
+
+        async with scheduler.slot(INTERACTIVE, 1, 1):
+            waiter = asyncio.create_task(scheduler.slot(BATCH, 2, 2).__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+
+        async with scheduler.slot(BATCH, 3, 3):
+            assert scheduler.queued == 0
+
+
+class TestAdmissionControl:
+    """Test cases for admission control."""
+
+    @pytest.mark.asyncio
+    async def test_pending_limit_per_class(self, db_session: AsyncSession, monkeypatch):
+        """Test executions over the pending limit of their class are refused."""
+        monkeypatch.setattr(
+            scheduler_module.settings, "scheduler_max_pending", "interactive=2,batch=10"
+        )
+        pipeline = await create_pipeline(db_session, [(AgentType.ENRICHER, {}, {})])
+        db_session.add(
+            PipelineExecution(
+                pipeline_id=pipeline.id,
+                status=ExecutionStatus.PENDING,
+                priority=INTERACTIVE,
+            )
+        )
+        await db_session.commit()
+
+        await check_admission(db_session, INTERACTIVE, None)
+        await check_admission(db_session, BATCH, None, records=10)
+        with pytest.raises(AdmissionError):
+            await check_admission(db_session, INTERACTIVE, None, records=2)
+
+    @pytest.mark.asyncio
+    async def test_admissions_lock_on_postgres(self, monkeypatch):
+        """Test the class and then the user lock is taken before counting on PostgreSQL."""
+        monkeypatch.setattr(scheduler_module.settings, "scheduler_max_pending", "batch=10")
+        monkeypatch.setattr(scheduler_module.settings, "scheduler_max_pending_per_user", 5)
+        statements = []
+
+        class PostgresSession:
+            def get_bind(self):
+                return SimpleNamespace(dialect=postgresql.dialect())
+
+            async def execute(self, statement):
+                statements.append(str(statement.compile(dialect=postgresql.dialect())))
+
+            async def scalar(self, statement):
+                statements.append("count")
+                return 0
+
+        await check_admission(PostgresSession(), BATCH, 7)
+
+        assert [statement.split("(")[0] for statement in statements] == [
+            "SELECT pg_advisory_xact_lock",
+            "count",
+            "SELECT pg_advisory_xact_lock",
+            "count",
+        ]
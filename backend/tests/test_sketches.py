@@ -0,0 +1,124 @@
+"""
+Test cases for streaming sketches and streaming analysis.
+"""
+import pickle
+import random
+
+import pytest
+
+from app.agents.base_agent import AnalyzerAgent
+from app.agents.sketches import (
+    CountMinSketch,
+    HyperLogLog,
+    KLLSketch,
+    StreamSketches,
+    hash64,
+    token,
+)
+from app.services.sketch_store import SketchStore, SketchStream
+
+
+def without_redis(agent):
+    agent._sketches = SketchStream(agent._sketches.stream, store=SketchStore(redis_url=None))
+    return agent
+
+
+class TestSketches:
+    """Test cases for the sketches and their merges."""
+
+    def test_hyperloglog_counts_distinct_values(self):
+        """Test distinct counts are close and merging equals sketching the union."""
+        whole, left, right = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for i in range(20000):
+            hashed = hash64(token(i % 10000))
+            whole.add(hashed)
+            (left if i % 3 else right).add(hashed)
+        left.merge(right)
+
+        assert abs(whole.estimate() - 10000) < 500
+        assert left.registers == whole.registers
+
+    def test_kll_ranks_and_quantiles(self):
+        """Test ranks and quantiles stay within a few percent, also after a merge."""
+        rng = random.Random(3)
+        values = [rng.uniform(0, 1000) for _ in range(50000)]
+        whole, left, right = KLLSketch(), KLLSketch(), KLLSketch()
+        for i, value in enumerate(values):
+            whole.add(value)
+            (left if i % 2 else right).add(value)
+        left.merge(right)
+
+        ordered = sorted(values)
+        for sketch in (whole, left):
+            assert sketch.count == len(values)
+            assert sum(map(len, sketch.levels)) < 1000
+            for fraction in (0.05, 0.5, 0.95):
+                exact = ordered[int(fraction * len(values))]
+                assert sketch.rank(exact) == pytest.approx(fraction, abs=0.02)
+            median = sketch.quantiles([0.5])[0]
+            assert abs(sum(v <= median for v in values) / len(values) - 0.5) < 0.02
+
+    def test_count_min_finds_heavy_hitters(self):
+        """Test frequent values are kept as candidates with close counts."""
+        rng = random.Random(5)
+        left, right = CountMinSketch(), CountMinSketch()
+        for i in range(20000):
+            value = rng.choice(["a", 1, True]) if i % 4 == 0 else rng.randrange(10**6)
+            (left if i % 2 else right).add(token(value), hash64(token(value)))
+        left.merge(right)
+
+        top = dict(left.heavy_hitters()[:3])
+        assert set(top) == {"a", 1, True}
+        assert all(abs(count - 5000 / 3) < 200 for count in top.values())
+
+    def test_serialization_round_trip(self):
+        """Test sketches survive dumps and loads and reject other data."""
+        sketches = StreamSketches(max_fields=2)
+        for i in range(500):
+            sketches.observe({"n": i, "s": f"v{i % 7}", "ignored": i})
+
+        loaded = StreamSketches.loads(sketches.dumps(), max_fields=2)
+
+        assert list(loaded.fields) == ["n", "s"]
+        assert loaded.summary() == sketches.summary()
+        assert loaded.summary()["s"]["distinct"] == 7
+        with pytest.raises(ValueError):
+            StreamSketches.loads(b"not sketches", max_fields=2)
+
+
+class TestStreamingAnalyzer:
+    """Test cases for AnalyzerAgent with streaming sketches."""
+
+    @pytest.mark.asyncio
+    async def test_records_are_compared_with_earlier_records(self):
+        """Test each record is compared with the records before it only."""
+        agent = without_redis(AnalyzerAgent(config={"streaming": {"stream": "orders"}}))
+
+        results = await agent.execute_batch(
+            [{"amount": amount, "kind": "a", "items": [1]} for amount in range(1, 101)]
+        )
+        last = await agent.execute({"amount": 50.5, "kind": "b"})
+
+        assert results[0]["analysis"]["streaming"]["amount"] == {
+            "seen": 0,
+            "distinct": 0,
+            "frequency": 0.0,
+        }
+        assert results[-1]["analysis"]["streaming"]["kind"]["frequency"] == 1.0
+        assert "items" not in results[-1]["analysis"]["streaming"]
+        assert last["analysis"]["streaming"]["amount"]["rank"] == pytest.approx(0.5)
+        assert last["analysis"]["streaming"]["kind"] == {"seen": 100, "distinct": 1, "frequency": 0}
+        assert agent.streaming_summary()["kind"]["heavy_hitters"] == [("a", 100), ("b", 1)]
+
+    @pytest.mark.asyncio
+    async def test_streaming_is_opt_in_and_copies_start_fresh(self):
+        """Test agents only sketch when configured, and pickled copies do not share deltas."""
+        assert AnalyzerAgent().streaming_summary() is None
+        assert "streaming" not in (await AnalyzerAgent().execute({"a": 1}))["analysis"]
+
+        agent = without_redis(AnalyzerAgent(config={"streaming": True}))
+        await agent.execute({"a": 1})
+        copy = pickle.loads(pickle.dumps(agent))
+
+        assert copy._sketches.stream == agent._sketches.stream
+        assert copy.streaming_summary() == {}
@@ -0,0 +1,76 @@
+"""
+Test cases for batch statistics and AnalyzerAgent sizing.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from app.agents.base_agent import AnalyzerAgent
+from app.agents.record import Record
+from app.agents.statistics import batch_statistics
+
+
+class TestBatchStatistics:
+    """Test cases for batch_statistics."""
+
+    def test_numeric_fields_match_numpy(self):
+        """Test statistics of numeric values, ignoring missing and non-numeric values."""
+        records = [
+            {"a": 1, "b": "x"},
+            Record({"a": 2.5, "b": None}),
+            {"a": "n/a"},
+            {"a": 10, "b": ""},
+            {"a": float("nan"), "c": True},
+            "not a record",
+        ]
+
+        statistics = batch_statistics(records, quantiles=[0.5, 1])
+
+        values = np.array([1, 2.5, 10])
+        assert statistics["a"] == {
+            "count": 5,
+            "null_ratio": 0.2,
+            "numeric_count": 3,
+            "min": 1.0,
+            "max": 10.0,
+            "mean": pytest.approx(values.mean()),
+            "std": pytest.approx(values.std()),
+            "quantiles": {"0.5": 2.5, "1": 10.0},
+        }
+        assert statistics["b"] == {"count": 3, "null_ratio": 0.8}
+        assert statistics["c"]["numeric_count"] == 1
+        assert list(statistics) == ["a", "b", "c"]
+
+    def test_empty_batches_and_bad_quantiles(self):
+        """Test edge cases."""
+        assert batch_statistics([]) == {}
+        with pytest.raises(ValueError):
+            batch_statistics([{"a": 1}], quantiles=[1.5])
+        with pytest.raises(ValueError):
+            AnalyzerAgent(config={"quantiles": ["median"]})
+
+
+class TestAnalyzerAgent:
+    """Test cases for AnalyzerAgent sizing and batch statistics."""
+
+    @pytest.mark.asyncio
+    async def test_data_size_estimates_json_size(self):
+        """Test the reported size is the compact JSON size, without stringifying."""
+        data = {"name": "abc", "tags": [1, 2.5, None], "nested": {"ok": True}}
+
+        result = await AnalyzerAgent().execute(data)
+
+        assert result["analysis"]["data_size"] == len(json.dumps(data, separators=(",", ":")))
+
+    @pytest.mark.asyncio
+    async def test_batch_statistics_are_opt_in(self):
+        """Test batches report statistics only when configured."""
+        records = [{"x": value} for value in range(10)]
+
+        plain = await AnalyzerAgent().execute_batch(records)
+        summarized = await AnalyzerAgent(config={"batch_statistics": True}).execute_batch(records)
+
+        assert "batch_statistics" not in plain[0]["analysis"]
+        assert summarized[0]["analysis"]["batch_statistics"]["x"]["mean"] == 4.5
+        assert summarized[-1]["analysis"]["batch_statistics"]["x"]["quantiles"]["0.5"] == 4.5
@@ -0,0 +1,131 @@
+"""
+Test cases for the step result cache.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.agents.base_agent import BaseAgent, TransformerAgent
+from app.models import PipelineStatus
+from app.services.pipeline_executor import PipelineExecutor
+from app.services.pipeline_plan import ExecutionPlan, PlanStep
+from app.services.step_cache import StepResultCache, step_cache_key
+
+
+class CountingAgent(BaseAgent):
+    """Deterministic agent counting how many records it has run."""
+
+    deterministic = True
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.calls = 0
+
+    async def execute(self, data):
+        self.calls += 1
+        return {"value": data["value"] * 2}
+
+
+def single_step_plan(agent: BaseAgent) -> ExecutionPlan:
+    """Build a plan with one step around an agent."""
+    step = PlanStep(
+        step_id=1,
+        order=0,
+        agent_id=1,
+        agent_name="counting",
+        registry_name="counting",
+        config=agent.config,
+        agent=agent,
+    )
+    return ExecutionPlan(
+        pipeline_id=1,
+        status=PipelineStatus.ACTIVE,
+        version=datetime.utcnow(),
+        steps=(step,),
+        sinks=(1,),
+    )
+
+
+class TestStepResultCache:
+    """Test cases for StepResultCache."""
+
+    def test_key_covers_config_and_input(self):
+        """Test keys are stable and change with the config or the input."""
+        agent = TransformerAgent(config={"mappings": {"a": "b"}})
+        key = step_cache_key(agent, {"a": 1, "c": 2})
+
+        assert key == step_cache_key(agent, {"c": 2, "a": 1})
+        assert key != step_cache_key(agent, {"a": 2, "c": 2})
+        assert key != step_cache_key(TransformerAgent(config={"mappings": {"a": "c"}}), {"a": 1})
+
+    @pytest.mark.asyncio
+    async def test_repeated_records_skip_the_agent(self):
+        """Test a deterministic step runs each distinct record only once."""
+        agent = CountingAgent()
+        plan = single_step_plan(agent)
+        executor = PipelineExecutor(result_cache=StepResultCache(redis_url=None))
+
+        first = await executor.run_plan_batch(plan, [{"value": 1}, {"value": 2}])
+        second = await executor.run_plan_batch(plan, [{"value": 2}, {"value": 1}])
+
+        assert first == [{"value": 2}, {"value": 4}]
+        assert second == [{"value": 4}, {"value": 2}]
+        assert agent.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_local_tier_is_bounded(self):
+        """Test the least recently used entries are evicted first."""
+        cache = StepResultCache(redis_url=None, local_max_entries=2)
+
+        await cache.put_many({"a": {"n": 1}, "b": {"n": 2}})
+        await cache.get_many(["a"])
+        await cache.put_many({"c": {"n": 3}})
+
+        assert await cache.get_many(["a", "b", "c"]) == {"a": {"n": 1}, "c": {"n": 3}}
+
+    @pytest.mark.asyncio
+    async def test_unreachable_redis_degrades_to_local(self):
+        """Test Redis errors are swallowed and the local tier keeps working."""
+        cache = StepResultCache(redis_url="redis://127.0.0.1:1/0")
+
+        await cache.put_many({"a": {"n": 1}})
+
+        assert await cache.get_many(["a", "b"]) == {"a": {"n": 1}}
+
+    @pytest.mark.asyncio
+    async def test_only_exact_values_are_cached(self):
+        """Test outputs and inputs that JSON would change are neither cached nor keyed."""
+        cache = StepResultCache(redis_url=None)
+        agent = TransformerAgent()
+
+        await cache.put_many({"tuple": {"n": (1, 2)}, "int-key": {1: "a"}, "list": {"n": [1, 2]}})
+
+        assert await cache.get_many(["tuple", "int-key", "list"]) == {"list": {"n": [1, 2]}}
+        assert step_cache_key(agent, {1: "a"}) is None
+        assert step_cache_key(agent, {"n": (1, 2)}) is None
+        assert step_cache_key(agent, {"n": [1, 2]}) is not None
+
+    @pytest.mark.asyncio
+    async def test_subclasses_are_not_deterministic_unless_declared(self):
+        """Test a subclass of a deterministic agent runs every record until it opts in."""
+
+        class PluginTransformer(TransformerAgent):
+            calls = 0
+
+            async def execute_batch(self, records):
+                PluginTransformer.calls += len(records)
+                return await super().execute_batch(records)
+
+        class DeclaredTransformer(PluginTransformer):
+            deterministic = True
+
+        assert TransformerAgent().is_deterministic()
+        assert not PluginTransformer().is_deterministic()
+        assert DeclaredTransformer().is_deterministic()
+
+        executor = PipelineExecutor(result_cache=StepResultCache(redis_url=None))
+        plan = single_step_plan(PluginTransformer())
+        await executor.run_plan_batch(plan, [{"value": 1}])
+        await executor.run_plan_batch(plan, [{"value": 1}])
+
+        assert PluginTransformer.calls == 2
@@ -0,0 +1,124 @@
+"""
+Test cases for fusing built-in steps.
+"""
+import asyncio
+import random
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.agents.base_agent import EnricherAgent, TransformerAgent
+from app.models import AgentType
+from app.services.pipeline_executor import PipelineExecutor
+from app.services.pipeline_plan import compile_plan, fuse_steps
+from tests.test_pipeline_executor import create_pipeline
+from tests.test_record import chain_plan
+
+FIELDS = ["a", "b", "c", "d", "_enrichment"]
+
+
+def random_agent(rng: random.Random):
+    """Build a random transformer or enricher over a small set of fields."""
+    if rng.random() < 0.4:
+        rules = [
+            {"add_field": rng.choice(FIELDS), "value": rng.choice([0, 1, "x"])}
+            for _ in range(rng.randint(0, 2))
+        ]
+        return EnricherAgent(config={"rules": rules})
+
+    sources = rng.sample(FIELDS, rng.randint(0, 3))
+    mappings = {source: rng.choice(FIELDS) for source in sources}
+    return TransformerAgent(config={"mappings": mappings, "copy_unmapped": rng.random() < 0.6})
+
+
+def random_record(rng: random.Random):
+    """Build a random record over the same fields."""
+    return {field: rng.choice([None, 0, 7, "v"]) for field in rng.sample(FIELDS, rng.randint(0, 5))}
+
+
+def without_timestamps(value):
+    """Blank enrichment timestamps, which differ between any two runs."""
+    if isinstance(value, dict):
+        return {
+            key: None if key == "timestamp" else without_timestamps(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [without_timestamps(item) for item in value]
+    return value
+
+
+class TestStepFusion:
+    """Test cases for step fusion."""
+
+    @pytest.mark.asyncio
+    async def test_fused_chains_match_unfused(self):
+        """Test random transformer and enricher chains give the same results fused."""
+        rng = random.Random(1234)
+        executor = PipelineExecutor(result_cache=None, progress=None)
+
+        for _ in range(300):
+            plan = chain_plan(*[random_agent(rng) for _ in range(rng.randint(2, 5))])
+            fused_plan = type(plan)(
+                pipeline_id=plan.pipeline_id,
+                status=plan.status,
+                version=plan.version,
+                steps=fuse_steps(plan.steps),
+                sinks=plan.sinks,
+            )
+            assert len(fused_plan.steps) == 1
+            records = [random_record(rng) for _ in range(5)]
+
+            expected = await executor.run_plan_batch(plan, records)
+            actual = await executor.run_plan_batch(fused_plan, records)
+
+            assert without_timestamps(actual) == without_timestamps(expected), plan.steps
+
+    @pytest.mark.asyncio
+    async def test_compile_fuses_unless_disabled(self, db_session: AsyncSession):
+        """Test the compiler fuses runs and the pipeline flag turns it off."""
+        steps = [
+            (AgentType.TRANSFORMER, {"mappings": {"a": "b"}, "copy_unmapped": True}, {}),
+            (AgentType.ENRICHER, {"rules": [{"add_field": "source", "value": "api"}]}, {}),
+            (AgentType.VALIDATOR, {"rules": [{"field": "b", "type": "required"}]}, {}),
+        ]
+        pipeline = await create_pipeline(db_session, steps)
+        fused_plan = await compile_plan(db_session, pipeline.id)
+
+        pipeline.config = {"fusion": False}
+        await db_session.commit()
+        unfused_plan = await compile_plan(db_session, pipeline.id)
+
+        assert [step.registry_name for step in fused_plan.steps] == ["fused", "validator"]
+        assert fused_plan.agent_ids == {step.agent_id for step in fused_plan.steps[0].fused} | {
+            fused_plan.steps[1].agent_id
+        }
+        assert len(unfused_plan.steps) == 3
+
+        executor = PipelineExecutor(result_cache=None, progress=None)
+        expected = await executor.run_plan(unfused_plan, {"a": 1, "c": 2})
+        actual = await executor.run_plan(fused_plan, {"a": 1, "c": 2})
+        assert without_timestamps(actual) == without_timestamps(expected)
+
+    @pytest.mark.asyncio
+    async def test_fused_steps_respect_each_agent_limit(self):
+        """Test a fused step waits for the limited agent types it contains."""
+        plan = chain_plan(TransformerAgent(config={"mappings": {"a": "b"}}), EnricherAgent())
+        (fused,) = fuse_steps(plan.steps)
+        fused_plan = type(plan)(
+            pipeline_id=plan.pipeline_id,
+            status=plan.status,
+            version=plan.version,
+            steps=(fused,),
+            sinks=plan.sinks,
+        )
+        executor = PipelineExecutor(
+            result_cache=None, progress=None, agent_limits={"TransformerAgent": 1}
+        )
+
+        assert fused.limit_keys == ("EnricherAgent", "TransformerAgent")
+        async with executor.agent_limiter.slot("TransformerAgent"):
+            run = asyncio.create_task(executor.run_plan(fused_plan, {"a": 1}))
+            await asyncio.sleep(0.05)
+            assert not run.done()
+        assert (await run)["b"] == 1
@@ -0,0 +1,59 @@
+"""
+Test cases for step statistics and plan explanations.
+"""
+import pytest
+
+from app.agents.base_agent import TransformerAgent
+from app.services.pipeline_executor import PipelineExecutor
+from app.services.plan_explain import explain_plan
+from app.services.step_stats import StepStatistics, summarize
+from tests.test_pipeline_executor import dag_plan, plan_step
+from tests.test_record import chain_plan
+
+
+class TestStepStatistics:
+    """Test cases for StepStatistics."""
+
+    def test_summary_separates_call_and_record_costs(self):
+        """Test the fitted model splits fixed and per-record time."""
+        summary = summarize([(1, 0.011), (10, 0.02), (100, 0.11)])
+
+        assert summary["calls"] == 3
+        assert summary["seconds_per_call"] == pytest.approx(0.01, abs=1e-3)
+        assert summary["seconds_per_record"] == pytest.approx(0.001, abs=1e-4)
+
+    @pytest.mark.asyncio
+    async def test_executor_records_agent_calls(self):
+        """Test every agent call is recorded under its step fingerprint."""
+        statistics = StepStatistics(redis_url=None)
+        plan = chain_plan(TransformerAgent(config={"mappings": {"a": "b"}}))
+        executor = PipelineExecutor(result_cache=None, progress=None, statistics=statistics)
+
+        await executor.run_plan_batch(plan, [{"a": 1}, {"a": 2}])
+        await executor.run_plan_batch(plan, [{"a": 3}])
+
+        summary = (await statistics.get_many([plan.steps[0].fingerprint]))[
+            plan.steps[0].fingerprint
+        ]
+        assert summary["calls"] == 2
+        assert summary["records"] == 3
+
+
+class TestExplainPlan:
+    """Test cases for explain_plan."""
+
+    @pytest.mark.asyncio
+    async def test_estimate_follows_the_critical_path(self):
+        """Test parallel branches count once and unknown steps are listed."""
+        plan = dag_plan(plan_step(1), plan_step(2), plan_step(3, depends_on=(1, 2)))
+        statistics = StepStatistics(redis_url=None)
+        for step, seconds in zip(plan.steps[:2], (1.0, 3.0)):
+            statistics.record(step.fingerprint, 10, seconds * 10)
+        executor = PipelineExecutor(result_cache=None, progress=None, statistics=statistics)
+
+        explanation = await explain_plan(plan, executor, statistics, records=100, batch_size=10)
+
+        estimates = [step["estimated_seconds"] for step in explanation["steps"]]
+        assert estimates[:2] == [pytest.approx(100.0), pytest.approx(300.0)]
+        assert explanation["estimated_seconds"] == pytest.approx(300.0)
+        assert explanation["unestimated_steps"] == [3]
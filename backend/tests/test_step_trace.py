@@ -0,0 +1,76 @@
+"""
+Test cases for step traces.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.sizing import estimate_size, estimate_total_size
+from app.models import AgentType, StepTrace
+from app.services.pipeline_executor import PipelineExecutor
+from app.services.pipeline_plan import compile_plan
+from app.services.step_trace import StepTraceWriter, percentile, step_latencies
+from tests.conftest import TestSessionLocal
+from tests.test_pipeline_executor import create_pipeline
+
+
+class TestSizing:
+    """Test cases for size estimates."""
+
+    def test_matches_compact_json(self):
+        """Test ASCII values are sized like their compact JSON encoding."""
+        value = {"a": [1, 2.5, None, True, False], "bb": {"c": "text", "d": []}, "e": -3}
+
+        assert estimate_size(value) == len(json.dumps(value, separators=(",", ":")))
+
+    def test_sample_scales_to_all_values(self):
+        """Test a sample of equal values gives the exact total."""
+        values = [{"a": "x" * 10}] * 1000
+
+        assert estimate_total_size(values, sample=10) == 1000 * estimate_size(values[0])
+
+
+class TestStepTraces:
+    """Test cases for tracing step runs."""
+
+    def test_percentile_interpolates(self):
+        """Test percentiles interpolate between neighbouring values."""
+        assert percentile([10.0, 20.0, 30.0, 40.0], 0.5) == 25.0
+        assert percentile([5.0], 0.99) == 5.0
+
+    @pytest.mark.asyncio
+    async def test_traces_are_written_and_summarized(self, db_session: AsyncSession):
+        """Test every step run is traced and summarized per step."""
+        pipeline = await create_pipeline(
+            db_session,
+            [
+                (AgentType.TRANSFORMER, {"mappings": {"a": "b"}}, {}),
+                (AgentType.ANALYZER, {}, {}),
+            ],
+        )
+        plan = await compile_plan(db_session, pipeline.id)
+        writer = StepTraceWriter(session_factory=TestSessionLocal)
+        executor = PipelineExecutor(result_cache=None, progress=None, tracer=writer)
+
+        await executor.run_plan_batch(plan, [{"a": 1}, {"a": 2}])
+        await executor.run_plan_batch(plan, [{"a": 1}])
+        await writer.close()
+
+        traces = (await db_session.execute(select(StepTrace))).scalars().all()
+        assert len(traces) == 4
+        assert {trace.records for trace in traces} == {1, 2}
+        assert all(trace.input_bytes > 0 and trace.output_bytes > 0 for trace in traces)
+
+        now = datetime.utcnow()
+        summaries = await step_latencies(
+            db_session, pipeline.id, now - timedelta(hours=1), now + timedelta(hours=1)
+        )
+        assert [summary["step_id"] for summary in summaries] == [
+            step.step_id for step in plan.steps
+        ]
+        for summary in summaries:
+            assert summary["runs"] == 2 and summary["records"] == 3
+            assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"]
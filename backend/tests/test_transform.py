@@ -0,0 +1,181 @@
+"""
+Test cases for compiled transformer configurations.
+"""
+import pickle
+
+import pytest
+
+from app.agents.base_agent import TransformerAgent
+from app.agents.record import Record
+from app.agents.transform import compile_transform, parse_path
+from app.services.step_fusion import is_fusible
+
+
+class TestCompileTransform:
+    """Test cases for compile_transform."""
+
+    def test_parse_path(self):
+        """Test paths split into keys and list indices."""
+        assert parse_path("a.b[0].c") == ["a", "b", 0, "c"]
+        assert parse_path("items[-1]") == ["items", -1]
+        for path in ["", ".a", "a..b", "a[x]", "a[0"]:
+            with pytest.raises(ValueError):
+                parse_path(path)
+
+    def test_mappings_rename_present_fields(self):
+        """Test mappings keep their original behavior."""
+        transform = compile_transform({"a": "x", "b": "y", "c": "x"})
+
+        assert transform({"a": 1, "b": None}) == {"x": 1, "y": None}
+        assert transform({"a": 1, "c": 3}) == {"x": 3}
+
+    def test_paths_and_defaults(self):
+        """Test nested paths fall back to their default or are left out."""
+        transform = compile_transform(
+            fields={
+                "city": "address.city",
+                "first": {"path": "items[0].sku", "default": "none"},
+                "last": "items[-1].sku",
+            }
+        )
+        data = {"address": {"city": "Oslo"}, "items": [{"sku": "a"}, {"sku": "b"}]}
+
+        assert transform(data) == {"city": "Oslo", "first": "a", "last": "b"}
+        assert transform({"address": "flat", "items": []}) == {"first": "none"}
+
+    def test_expressions(self):
+        """Test expressions read fields and fall back to their default."""
+        transform = compile_transform(
+            fields={
+                "total": {"expr": "price * qty if qty else 0", "default": None},
+                "label": {"expr": "str(name) + '-' + str(len(tags))"},
+                "ratio": {"expr": "round(a / b, 2)", "default": -1},
+            }
+        )
+
+        assert transform(
+            Record({"price": 2.5, "qty": 4, "name": "x", "tags": [1], "a": 1, "b": 3})
+        ) == {"total": 10.0, "label": "x-1", "ratio": 0.33}
+        assert transform({"qty": 1, "a": 1, "b": 0}) == {"total": None, "ratio": -1}
+
+    @pytest.mark.parametrize(
+        "expr",
+        [
+            "__import__('os')",
+            "a.__class__",
+            "2 ** 1000",
+            "[x for x in a]",
+            "lambda: 1",
+            "len",
+            "max(a, key=b)",
+            "a +",
+        ],
+    )
+    def test_unsafe_or_invalid_expressions_fail_to_compile(self, expr):
+        """Test expressions outside the allowed subset are rejected."""
+        with pytest.raises(ValueError):
+            compile_transform(fields={"x": {"expr": expr}})
+
+    def test_container_defaults_are_not_shared(self):
+        """Test each output gets its own copy of a list or dict default."""
+        fields = {"tags": {"path": "missing", "default": {"items": []}}}
+
+        first = compile_transform(fields=fields)({})
+        first["tags"]["items"].append(1)
+
+        assert compile_transform(fields=fields)({}) == {"tags": {"items": []}}
+
+    def test_repetition_is_bounded(self):
+        """Test * cannot build huge strings or lists, whether from constants or fields."""
+        transform = compile_transform(
+            fields={
+                "constant": {"expr": "'x' * 1000000000", "default": None},
+                "field": {"expr": "items * n", "default": []},
+                "swapped": {"expr": "n * name", "default": ""},
+                "small": {"expr": "name * 3"},
+                "number": {"expr": "n * n"},
+            }
+        )
+
+        assert transform({"items": [0], "n": 10**9, "name": "ab"}) == {
+            "constant": None,
+            "field": [],
+            "swapped": "",
+            "small": "ababab",
+            "number": 10**18,
+        }
+
+    def test_nested_and_accumulated_sequences_are_bounded(self):
+        """Test nested repetition, concatenation, sum() and % formatting count every item."""
+        transform = compile_transform(
+            fields={
+                "nested": {"expr": "[[0] * 100000] * 100000", "default": None},
+                "shared": {"expr": "[items] * 100000", "default": None},
+                "concatenated": {"expr": "name * 60000 + name * 60000", "default": None},
+                "flattened": {"expr": "sum([[0]] * 100000 + [[0]], [])", "default": None},
+                "tuples": {"expr": "sum([(0, 1)] * 3, ())"},
+                "lists": {"expr": "sum([items, items], [])"},
+                "numbers": {"expr": "sum(items)"},
+                "padded": {"expr": "'%0100000000d' % n", "default": None},
+                "starred": {"expr": "'%*d' % (n, 1)", "default": None},
+                "formatted": {"expr": "'%s-%%5000000d-%05d' % (name, 7)"},
+            }
+        )
+
+        assert transform({"items": [1, 2], "n": 10**9, "name": "a"}) == {
+            "nested": None,
+            "shared": None,
+            "concatenated": None,
+            "flattened": None,
+            "tuples": (0, 1, 0, 1, 0, 1),
+            "lists": [1, 2, 1, 2],
+            "numbers": 3,
+            "padded": None,
+            "starred": None,
+            "formatted": "a-%5000000d-00007",
+        }
+
+    def test_compiled_once_per_config(self):
+        """Test equal configs share one compiled function."""
+        config = {"fields": {"x": {"expr": "a + 1"}}, "mappings": {"a": "b"}}
+
+        assert (
+            TransformerAgent(config=config)._function
+            is TransformerAgent(config=dict(config))._function
+        )
+        assert compile_transform({"a": "b", "c": "d"}) is not compile_transform(
+            {"c": "d", "a": "b"}
+        )
+
+
+class TestTransformerAgent:
+    """Test cases for TransformerAgent with computed fields."""
+
+    @pytest.mark.asyncio
+    async def test_copy_unmapped_with_fields(self):
+        """Test computed fields overlay the input and only mapped sources are removed."""
+        agent = TransformerAgent(
+            config={
+                "mappings": {"id": "key"},
+                "fields": {"city": "address.city"},
+                "copy_unmapped": True,
+            }
+        )
+
+        result = await agent.execute({"id": 1, "address": {"city": "Oslo"}})
+
+        assert result == {"key": 1, "address": {"city": "Oslo"}, "city": "Oslo"}
+        assert type(result) is dict
+
+    @pytest.mark.asyncio
+    async def test_survives_pickling(self):
+        """Test agents shipped to worker processes recompile their config."""
+        agent = TransformerAgent(config={"fields": {"n": {"expr": "len(items)", "default": 0}}})
+        copy = pickle.loads(pickle.dumps(agent))
+
+        assert await copy.execute_batch([{"items": [1, 2]}, {}]) == [{"n": 2}, {"n": 0}]
+
+    def test_fields_are_not_fused(self):
+        """Test only plain renames are fused."""
+        assert is_fusible(TransformerAgent(config={"mappings": {"a": "b"}}))
+        assert not is_fusible(TransformerAgent(config={"fields": {"b": "a.b"}}))
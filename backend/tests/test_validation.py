@@ -0,0 +1,156 @@
+"""
+Test cases for compiled validation rules.
+"""
+import pickle
+import random
+
+import pytest
+
+from app.agents.base_agent import ValidatorAgent
+from app.agents.columnar import COLUMNAR_MIN_BATCH
+from app.agents.record import Record
+from app.agents.validation import compile_rules, run_checks
+
+
+def errors_of(rules, data):
+    return run_checks(data, compile_rules(rules))
+
+
+class TestCompiledRules:
+    """Test cases for compile_rules."""
+
+    def test_original_rules_keep_their_messages(self):
+        """Test required, type and range rules report as they always did."""
+        rules = [
+            {"field": "name", "type": "required"},
+            {"field": "age", "type": "type", "expected": "number"},
+            {"field": "score", "type": "range", "min": 0, "max": 10},
+            {"field": "id", "type": "unknown"},
+        ]
+
+        assert errors_of(rules, {"name": "", "age": "x", "score": 11}) == [
+            "Field name is required",
+            "Field age must be a number",
+            "Field score must be <= 10",
+            "Missing required field: id",
+        ]
+        assert errors_of(rules, {"name": "a", "age": 1, "score": 5, "id": 1}) == []
+
+    def test_new_rule_types(self):
+        """Test regex, enum, length and compare rules."""
+        rules = [
+            {"field": "code", "type": "regex", "pattern": r"^[A-Z]{3}$"},
+            {"field": "kind", "type": "enum", "values": ["a", 1, [2]]},
+            {"field": "tags", "type": "length", "min": 1, "max": 2},
+            {"field": "start", "type": "compare", "op": "<", "other": "end"},
+        ]
+
+        assert (
+            errors_of(rules, {"code": "ABC", "kind": [2], "tags": ["x"], "start": 1, "end": 2})
+            == []
+        )
+        assert errors_of(
+            rules, {"code": "abc", "kind": True, "tags": [], "start": 3, "end": 2}
+        ) == [
+            "Field code must match ^[A-Z]{3}$",
+            "Field kind must be one of ['a', 1, [2]]",
+            "Field tags must have a length >= 1",
+            "Field start must be < end",
+        ]
+        assert errors_of(rules[3:], {"start": 1}) == ["Missing required field: end"]
+
+    def test_nested_paths(self):
+        """Test paths reach into nested objects, records and lists."""
+        rules = [
+            {"path": "address.city", "type": "required"},
+            {"path": "items.1.qty", "type": "range", "min": 1},
+            {"path": "items.0.qty", "type": "compare", "op": "<=", "other": "limits.qty"},
+        ]
+        data = Record(
+            {"address": {"city": "Oslo"}, "items": [{"qty": 5}, {"qty": 0}]}, {"limits": {"qty": 4}}
+        )
+
+        assert errors_of(rules, data) == [
+            "Field items.1.qty must be >= 1",
+            "Field items.0.qty must be <= limits.qty",
+        ]
+        assert errors_of(rules[:1], {"address": {}}) == ["Missing required field: address.city"]
+
+    def test_malformed_rules_fail_to_compile(self):
+        """Test bad rules are rejected when the agent is created."""
+        with pytest.raises(ValueError):
+            ValidatorAgent(config={"rules": [{"field": "a", "type": "regex", "pattern": "("}]})
+        with pytest.raises(ValueError):
+            ValidatorAgent(config={"rules": [{"field": "a", "type": "compare", "op": "~"}]})
+
+    @pytest.mark.asyncio
+    async def test_validator_survives_pickling(self):
+        """Test agents shipped to worker processes recompile their rules."""
+        agent = ValidatorAgent(config={"rules": [{"field": "a", "type": "enum", "values": [1]}]})
+        copy = pickle.loads(pickle.dumps(agent))
+
+        assert (await copy.execute({"a": 2}))["errors"] == ["Field a must be one of [1]"]
+
+
+class TestColumnarValidation:
+    """Test cases for ColumnarValidator."""
+
+    VALUES = [
+        None,
+        True,
+        False,
+        0,
+        1,
+        -5,
+        2.5,
+        float("nan"),
+        2**60,
+        -(2**70),
+        10**400,
+        "",
+        "a",
+        "b",
+        "x" * 5,
+        [],
+        [1],
+        {},
+        {"k": 1},
+    ]
+
+    def make_rules(self, rng):
+        fields = ["a", "b", "c"]
+        kinds = [
+            lambda f: {"field": f, "type": "required"},
+            lambda f: {
+                "field": f,
+                "type": "type",
+                "expected": rng.choice(["string", "number", "x"]),
+            },
+            lambda f: {"field": f, "type": "range", "min": rng.choice([None, 0, -1.5, 2**60])},
+            lambda f: {"field": f, "type": "range", "max": rng.choice([1, 2**61, 10**30])},
+            lambda f: {"field": f, "type": "enum", "values": rng.sample(["a", "b", "c"], 2)},
+            lambda f: {"field": f, "type": "enum", "values": [1, True]},
+            lambda f: {"field": f, "type": "length", "max": 1},
+        ]
+        return [rng.choice(kinds)(rng.choice(fields)) for _ in range(rng.randint(1, 8))]
+
+    @pytest.mark.asyncio
+    async def test_columns_match_per_record_checks(self):
+        """Test columnar batches report exactly what per-record checks report."""
+        rng = random.Random(7)
+        for _ in range(100):
+            rules = self.make_rules(rng)
+            records = [
+                {field: rng.choice(self.VALUES) for field in "abc" if rng.random() < 0.8}
+                for _ in range(COLUMNAR_MIN_BATCH)
+            ]
+            records[0] = Record(records[0])
+
+            columnar = await ValidatorAgent(config={"rules": rules}).execute_batch(records)
+            per_record = await ValidatorAgent(
+                config={"rules": rules, "columnar": False}
+            ).execute_batch(records)
+
+            assert [result["errors"] for result in columnar] == [
+                result["errors"] for result in per_record
+            ], rules
@@ -0,0 +1,131 @@
+"""
+Test cases for distributed execution through Celery.
+"""
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import AgentType, ExecutionStatus
+from app.services.pipeline_dispatch import dispatch_execution, settings
+from app.services.pipeline_executor import pipeline_executor
+from app.services.pipeline_plan import compile_plan, plan_cache
+from app.worker import (
+    celery_app,
+    execute_pipeline_batch_task,
+    execute_pipeline_task,
+    partition_queue,
+    run_async,
+    worker_executor,
+)
+from tests.conftest import TestSessionLocal
+from tests.test_pipeline_executor import create_execution, create_pipeline
+
+
+@pytest.fixture
+def eager_worker(monkeypatch):
+    """Run tasks in-process against the test database."""
+    monkeypatch.setitem(celery_app.conf, "task_always_eager", True)
+    monkeypatch.setattr("app.worker.create_worker_session_factory", lambda: TestSessionLocal)
+    plan_cache.clear()
+    yield
+    plan_cache.clear()
+
+
+class TestWorker:
+    """Test cases for the Celery worker tasks."""
+
+    def test_partition_queue_is_stable(self):
+        """Test executions of one pipeline always go to the same queue."""
+        assert partition_queue(7) == partition_queue(7)
+        assert partition_queue(7).startswith("pipelines.")
+
+    @pytest.mark.asyncio
+    async def test_task_writes_status_back(self, db_session: AsyncSession, eager_worker):
+        """Test a worker task runs the plan and updates the execution."""
+        pipeline = await create_pipeline(
+            db_session, [(AgentType.TRANSFORMER, {"mappings": {"a": "b"}}, {})]
+        )
+        execution = await create_execution(db_session, pipeline, {"a": 1})
+        plan = await compile_plan(db_session, pipeline.id)
+
+        await asyncio.to_thread(
+            execute_pipeline_task.delay,
+            pipeline.id,
+            execution.id,
+            {"a": 1},
+            plan.version.isoformat(),
+        )
+
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.SUCCESS
+        assert execution.output_data == {"b": 1}
+
+    @pytest.mark.asyncio
+    async def test_batch_task_for_missing_pipeline_fails(
+        self, db_session: AsyncSession, eager_worker
+    ):
+        """Test executions of a pipeline that no longer exists are failed."""
+        pipeline = await create_pipeline(db_session, [(AgentType.ENRICHER, {}, {})])
+        executions = [await create_execution(db_session, pipeline, {}) for _ in range(2)]
+        plan = await compile_plan(db_session, pipeline.id)
+
+        await asyncio.to_thread(
+            execute_pipeline_batch_task.delay,
+            pipeline.id + 1,
+            [execution.id for execution in executions],
+            [{}, {}],
+            plan.version.isoformat(),
+        )
+
+        for execution in executions:
+            await db_session.refresh(execution)
+            assert execution.status == ExecutionStatus.FAILED
+            assert execution.error_message == "Pipeline not found"
+
+    @pytest.mark.asyncio
+    async def test_eager_mode_dispatches_in_process(self, db_session: AsyncSession, eager_worker):
+        """Test eager mode runs executions on the API's executor instead of a worker loop."""
+        pipeline = await create_pipeline(db_session, [(AgentType.ENRICHER, {}, {})])
+        plan = await compile_plan(db_session, pipeline.id)
+
+        with patch.object(settings, "execution_backend", "celery"), patch.object(
+            pipeline_executor, "submit"
+        ) as submit, patch.object(execute_pipeline_task, "apply_async") as apply_async:
+            await dispatch_execution(plan, 1, {"a": 1})
+
+        submit.assert_called_once()
+        apply_async.assert_not_called()
+
+    def test_each_worker_loop_has_its_own_engine(self, monkeypatch):
+        """Test worker threads do not share executors or database pools."""
+        factories = []
+
+        def create_session_factory():
+            factories.append(object())
+            return factories[-1]
+
+        monkeypatch.setitem(celery_app.conf, "task_always_eager", True)
+        monkeypatch.setattr("app.worker.create_worker_session_factory", create_session_factory)
+
+        async def current():
+            return worker_executor()
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append([run_async(current()) for _ in range(2)])
+            )
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        first, second = results
+
+        assert first[0] is first[1]
+        assert first[0] is not second[0]
+        assert {first[0].session_factory, second[0].session_factory} == set(factories)